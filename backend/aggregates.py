@@ -0,0 +1,167 @@
+"""
+WASTE IQ – City Aggregates
+Running counters for the city dashboards, kept in a single Firestore
+document (stats/city) and updated incrementally on every write path, so
+/reports/city-summary is one read instead of full-collection scans.
+
+Counters only drift if a write bypasses these hooks (console edits, a
+crash between the write and the counter bump). `rebuild()` recomputes
+everything from scratch for drift repair:
+
+    python aggregates.py            # reconcile counters
+"""
+
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import firestore_client as fc
+
+STATS_COLLECTION = "stats"
+CITY_DOC         = "city"
+
+
+def _bump(increments: Dict) -> None:
+    """Apply counter increments; never let a counter failure break the caller's write."""
+    try:
+        fc.increment_fields(STATS_COLLECTION, CITY_DOC, increments)
+    except Exception as e:
+        print(f"⚠️  Counter update failed ({e}) — run aggregates.rebuild() to reconcile")
+
+
+def _ward(ward_id: Optional[str]) -> str:
+    return ward_id or "unknown"
+
+
+# ── Write-path hooks ─────────────────────────────────────────
+
+def record_classification(category: str) -> None:
+    _bump({"total_classifications": 1, "waste_by_category": {category: 1}})
+
+
+def record_classifications(categories: List[str]) -> None:
+    """One counter write for a whole batch of classifications."""
+    if categories:
+        _bump({"total_classifications": len(categories),
+               "waste_by_category": dict(Counter(categories))})
+
+
+def record_complaint(ward_id: Optional[str], status: str = "open") -> None:
+    ward = {"total": 1}
+    if status == "resolved":
+        ward["resolved"] = 1
+    _bump({"total_complaints": 1,
+           "complaints_by_status": {status: 1},
+           "complaints_by_ward": {_ward(ward_id): ward}})
+
+
+def record_complaint_status(ward_id: Optional[str], old: str, new: str) -> None:
+    if old == new:
+        return
+    increments = {"complaints_by_status": {old: -1, new: 1}}
+    if "resolved" in (old, new):
+        increments["complaints_by_ward"] = {_ward(ward_id): {"resolved": 1 if new == "resolved" else -1}}
+    _bump(increments)
+
+
+def record_bin_created(status: str = "active") -> None:
+    _bump({"total_bins": 1, "bins_by_status": {status: 1}})
+
+
+def record_bin_deleted(status: str = "active") -> None:
+    _bump({"total_bins": -1, "bins_by_status": {status: -1}})
+
+
+def record_bin_status(old: Optional[str], new: Optional[str]) -> None:
+    if not old or not new or old == new:
+        return
+    _bump({"bins_by_status": {old: -1, new: 1}})
+
+
+def record_user(role: str) -> None:
+    _bump({"total_users": 1, "users_by_role": {role: 1}})
+
+
+def record_user_role(old: Optional[str], new: str) -> None:
+    if not old or old == new:
+        return
+    _bump({"users_by_role": {old: -1, new: 1}})
+
+
+# ── Reads ────────────────────────────────────────────────────
+
+def get_counters() -> Dict:
+    """
+    Current counters. Rebuilds on first use: a doc without `rebuilt_at` was
+    only ever incremented and doesn't account for pre-existing data.
+    """
+    counters = fc.get_doc(STATS_COLLECTION, CITY_DOC)
+    if not counters or not counters.get("rebuilt_at"):
+        counters = rebuild()
+    return counters
+
+
+def get_summary() -> Dict:
+    """City summary in the /reports/city-summary response shape."""
+    c = get_counters()
+    ward_ranking = sorted([
+        {"ward_id": w, "total": s.get("total", 0), "resolved": s.get("resolved", 0),
+         "resolution_rate": round(s.get("resolved", 0) / max(s.get("total", 0), 1) * 100, 1)}
+        for w, s in c.get("complaints_by_ward", {}).items()
+    ], key=lambda x: -x["resolution_rate"])
+
+    return {
+        "total_users":           c.get("total_users", 0),
+        "total_bins":            c.get("total_bins", 0),
+        "total_classifications": c.get("total_classifications", 0),
+        "total_complaints":      c.get("total_complaints", 0),
+        "waste_by_category":     _nonzero(c.get("waste_by_category", {})),
+        "bins_by_status":        _nonzero(c.get("bins_by_status", {})),
+        "complaints_by_status":  _nonzero(c.get("complaints_by_status", {})),
+        "users_by_role":         _nonzero(c.get("users_by_role", {})),
+        "ward_ranking":          ward_ranking,
+        "rebuilt_at":            c.get("rebuilt_at"),
+    }
+
+
+def _nonzero(counts: Dict) -> Dict:
+    return {k: v for k, v in counts.items() if v}
+
+
+# ── Reconciliation ───────────────────────────────────────────
+
+def rebuild() -> Dict:
+    """Recompute every counter from the source collections and overwrite stats/city."""
+    logs       = fc.query_collection("waste_logs", fields=["waste_category"])
+    bins       = fc.query_collection("bins",       fields=["status"])
+    complaints = fc.query_collection("complaints", fields=["status", "ward_id"])
+    users      = fc.query_collection("users",      fields=["role"])
+
+    complaints_by_ward: Dict[str, Dict[str, int]] = {}
+    for c in complaints:
+        ward = complaints_by_ward.setdefault(_ward(c.get("ward_id")), {"total": 0, "resolved": 0})
+        ward["total"] += 1
+        if c.get("status") == "resolved":
+            ward["resolved"] += 1
+
+    counters = {
+        "total_classifications": len(logs),
+        "waste_by_category":     dict(Counter(l.get("waste_category", "Unknown") for l in logs)),
+        "total_bins":            len(bins),
+        "bins_by_status":        dict(Counter(b.get("status", "active") for b in bins)),
+        "total_complaints":      len(complaints),
+        "complaints_by_status":  dict(Counter(c.get("status", "open") for c in complaints)),
+        "complaints_by_ward":    complaints_by_ward,
+        "total_users":           len(users),
+        "users_by_role":         dict(Counter(u.get("role", "household") for u in users)),
+        "rebuilt_at":            datetime.now(timezone.utc).isoformat(),
+    }
+    fc.set_doc(STATS_COLLECTION, CITY_DOC, counters)
+    return counters
+
+
+if __name__ == "__main__":
+    print("🔄 Rebuilding city counters...")
+    result = rebuild()
+    print(f"✅ Counters rebuilt: {result['total_classifications']} logs, {result['total_bins']} bins, "
+          f"{result['total_complaints']} complaints, {result['total_users']} users")
@@ -0,0 +1,83 @@
+"""
+WASTE IQ – Concurrency Load Benchmark
+Measures request throughput of read-heavy endpoints at increasing
+concurrency on a single uvicorn worker. With the async Firestore path,
+throughput should scale ~linearly until the Firestore I/O pool
+(FIRESTORE_IO_THREADS) saturates.
+
+Run against the Firestore emulator:
+
+    firebase emulators:start --only firestore,auth
+    export FIRESTORE_EMULATOR_HOST=localhost:8080
+    export FIREBASE_AUTH_EMULATOR_HOST=localhost:9099
+    cd backend && uvicorn main:app --workers 1 --port 8000
+    python benchmarks/load_firestore.py --token <ID_TOKEN> --path /gamification/me
+
+Usage: python benchmarks/load_firestore.py [--levels 1,2,4,8,16,32] [--requests 200]
+"""
+
+import argparse
+import asyncio
+import time
+
+import httpx
+
+
+async def _run_level(client: httpx.AsyncClient, url: str, headers: dict,
+                     concurrency: int, total: int) -> dict:
+    sem = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def one():
+        nonlocal errors
+        async with sem:
+            t0 = time.perf_counter()
+            try:
+                resp = await client.get(url, headers=headers)
+                if resp.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - t0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "rps":         total / elapsed,
+        "p50_ms":      latencies[len(latencies) // 2] * 1000,
+        "p95_ms":      latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "errors":      errors,
+    }
+
+
+async def main(args) -> None:
+    url = f"{args.base_url}{args.path}"
+    headers = {"Authorization": f"Bearer {args.token}"} if args.token else {}
+    levels = [int(x) for x in args.levels.split(",")]
+
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+    async with httpx.AsyncClient(timeout=30, limits=limits) as client:
+        await client.get(url, headers=headers)  # warm connection + caches
+        baseline = None
+        print(f"{'conc':>5} {'req/s':>9} {'scaling':>8} {'p50 ms':>8} {'p95 ms':>8} {'err':>5}")
+        for level in levels:
+            r = await _run_level(client, url, headers, level, args.requests)
+            baseline = baseline or r["rps"] / level
+            scaling = r["rps"] / (baseline * level)
+            print(f"{r['concurrency']:>5} {r['rps']:>9.1f} {scaling:>7.0%} "
+                  f"{r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['errors']:>5}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--path", default="/gamification/me")
+    parser.add_argument("--token", default="")
+    parser.add_argument("--levels", default="1,2,4,8,16,32")
+    parser.add_argument("--requests", type=int, default=200)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,116 @@
+"""
+WASTE IQ – Category Matcher Micro-Benchmark
+Maps every ImageNet label (the full 1,000-class YOLO vocabulary) through
+the old linear-scan code and through matcher.KeywordMatcher, checks that
+both give identical answers, and reports time per label for:
+
+  • yolo      ImageNet table (key in label / label in key) + WASTE_MAP keyword scan
+  • category  _map_to_category local path (exact → fuzzy → substring scans)
+
+Labels come from the ONNX model metadata if it has been exported, else
+from ultralytics, else from a text file (one label per line).
+
+Usage: python benchmarks/matcher_bench.py [--labels FILE] [--repeat 5]
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from matcher import KeywordMatcher                          # noqa: E402
+from waste_classifier import WASTE_MAP, _IMAGENET_WASTE     # noqa: E402
+
+
+def _labels(path: str = None):
+    if path:
+        return [l.strip().lower() for l in Path(path).read_text().splitlines() if l.strip()]
+    try:
+        from yolo_onnx import OnnxClassifier
+        return [n.lower() for n in OnnxClassifier().names.values()]
+    except Exception:
+        pass
+    from ultralytics import YOLO
+    return [n.lower() for n in YOLO("yolov8n-cls.pt").names.values()]
+
+
+# ── Previous implementation (linear scans), kept here as the baseline ──
+
+def legacy_yolo(label: str):
+    for key, (display, cat) in _IMAGENET_WASTE.items():
+        if key in label or label in key:
+            return cat
+    for keyword, cat in WASTE_MAP.items():
+        if keyword in label:
+            return cat
+    return "General Waste"
+
+
+def legacy_category(label: str):
+    from rapidfuzz import process, fuzz
+    if label in WASTE_MAP:
+        return WASTE_MAP[label]
+    match = process.extractOne(label, list(WASTE_MAP.keys()), scorer=fuzz.WRatio, score_cutoff=75)
+    if match:
+        return WASTE_MAP[match[0]]
+    for keyword, category in WASTE_MAP.items():
+        if keyword in label:
+            return category
+    for keyword, category in WASTE_MAP.items():
+        if label in keyword:
+            return category
+    return "General Waste"
+
+
+# ── Matcher ──
+
+def matcher_yolo(imagenet: KeywordMatcher, waste: KeywordMatcher, label: str):
+    i = imagenet.related(label)
+    if i is not None:
+        return imagenet.values[i][1]
+    i = waste.contained_in(label)
+    return waste.values[i] if i is not None else "General Waste"
+
+
+def _bench(fn, labels, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        out = [fn(l) for l in labels]
+    return out, (time.perf_counter() - t0) / (repeat * len(labels)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--labels", default=None)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    labels = _labels(args.labels)
+    t0 = time.perf_counter()
+    imagenet, waste = KeywordMatcher(_IMAGENET_WASTE), KeywordMatcher(WASTE_MAP)
+    build_ms = (time.perf_counter() - t0) * 1000
+    print(f"\n📊 {len(labels)} labels · {len(WASTE_MAP)} waste keywords · "
+          f"{len(_IMAGENET_WASTE)} ImageNet keys · matchers built in {build_ms:.1f} ms")
+    print(f"   {'path':<28}{'µs/label':>10}")
+
+    old, t_old = _bench(legacy_yolo, labels, args.repeat)
+    new, t_new = _bench(lambda l: matcher_yolo(imagenet, waste, l), labels, args.repeat)
+    assert old == new, "yolo mapping changed"
+    print(f"   {'yolo   legacy scan':<28}{t_old:>10.2f}")
+    print(f"   {'yolo   matcher':<28}{t_new:>10.2f}   ({t_old / t_new:.1f}×)")
+
+    old, t_old = _bench(legacy_category, labels, 1)
+    waste.lookup.cache_clear()
+    new, t_cold = _bench(lambda l: waste.lookup(l) or "General Waste", labels, 1)
+    _, t_warm = _bench(lambda l: waste.lookup(l) or "General Waste", labels, args.repeat)
+    assert old == new, "category mapping changed"
+    print(f"   {'category legacy':<28}{t_old:>10.2f}")
+    print(f"   {'category matcher (cold)':<28}{t_cold:>10.2f}   ({t_old / t_cold:.1f}×)")
+    print(f"   {'category matcher (memoized)':<28}{t_warm:>10.2f}   ({t_old / t_warm:.0f}×)")
+    print("\n✅ Identical results on every label")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+WASTE IQ – Overflow Batch Scoring Benchmark
+Scores N synthetic bins two ways and checks they agree:
+
+  • per-bin     model.predict() once per bin (the old batch_predict loop)
+  • vectorized  bin_features() + one predict_many() call
+
+Firestore is not touched — this times feature extraction and scoring only.
+The per-bin path is timed on a sample and extrapolated to N.
+
+Usage: python benchmarks/overflow_batch_bench.py [--bins 10000] [--sample 500]
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from overflow_model import OverflowModel, bin_features   # noqa: E402
+
+
+def _bins(n: int, now: datetime):
+    rng = np.random.default_rng(7)
+    bins = []
+    for i in range(n):
+        b = {
+            "_id":                f"bin-{i:05d}",
+            "fill_level":         float(rng.uniform(0, 100)),
+            "population_density": float(rng.uniform(500, 50000)),
+            "avg_daily_waste_kg": float(rng.uniform(0.5, 10)),
+        }
+        if i % 10:   # every 10th bin has never been collected
+            b["last_collected"] = (now - timedelta(hours=float(rng.uniform(0, 168)))).isoformat()
+        bins.append(b)
+    return bins
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bins", type=int, default=10000)
+    parser.add_argument("--sample", type=int, default=500)
+    args = parser.parse_args()
+
+    model = OverflowModel()
+    now = datetime.now(timezone.utc)
+    bins = _bins(args.bins, now)
+    sample = bins[:args.sample]
+
+    t0 = time.perf_counter()
+    _, Xs = bin_features(sample, now)
+    old = [model.predict(*row) for row in Xs.tolist()]
+    t_old = (time.perf_counter() - t0) / len(sample) * len(bins)
+
+    t0 = time.perf_counter()
+    _, X = bin_features(bins, now)
+    t_feat = time.perf_counter() - t0
+    new = model.predict_many(X)
+    t_new = time.perf_counter() - t0
+
+    mismatches = sum(a != b for a, b in zip(old, new))
+    print(f"\n📊 {len(bins)} bins")
+    print(f"   per-bin    {t_old * 1000:>9.0f} ms  (extrapolated from {len(sample)})")
+    print(f"   vectorized {t_new * 1000:>9.0f} ms  (features {t_feat * 1000:.0f} ms)   "
+          f"({t_old / t_new:.0f}×)")
+    print(f"\n{'✅' if not mismatches else '⚠️ '} {mismatches} mismatches over {len(sample)} sampled bins")
+
+
+if __name__ == "__main__":
+    main()
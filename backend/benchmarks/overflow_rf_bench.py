@@ -0,0 +1,62 @@
+"""
+WASTE IQ – Overflow Forest Size/Depth Benchmark
+Trains the overflow RandomForest over a grid of tree counts and depths
+and reports, per configuration, what it costs to serve (compact-forest
+artifact size, single-row and batch latency) against what it buys
+(test ROC AUC, accuracy, Brier score). Nothing is written to the registry.
+
+Usage: python benchmarks/overflow_rf_bench.py [--trees 25,50,100,200] [--depths 6,8,12,0]
+                                              [--samples 8000] [--bins 10000]
+"""
+
+import sys
+import time
+import argparse
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from overflow_forest import CompactForest, export                    # noqa: E402
+from overflow_training import evaluate, fit, latency_us, synthetic   # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trees", default="25,50,100,200")
+    parser.add_argument("--depths", default="6,8,12,0", help="0 = unlimited")
+    parser.add_argument("--samples", type=int, default=8000)
+    parser.add_argument("--bins", type=int, default=10000, help="rows in the batch timing")
+    args = parser.parse_args()
+
+    from sklearn.model_selection import train_test_split
+
+    X, y = synthetic(args.samples)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+    batch = X_test[np.arange(args.bins) % len(X_test)]
+
+    print(f"\n📊 {len(X_train)} train / {len(X_test)} test rows · batch timing over {args.bins} bins")
+    print(f"   {'trees':>5} {'depth':>5} {'fit s':>7} {'MB':>6} {'1 row µs':>9} "
+          f"{'batch ms':>9} {'auc':>7} {'acc':>7} {'brier':>7}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for trees in (int(t) for t in args.trees.split(",")):
+            for depth in (int(d) or None for d in args.depths.split(",")):
+                t0 = time.perf_counter()
+                pipeline = fit(X_train, y_train, trees, depth)
+                fit_s = time.perf_counter() - t0
+                path = export(pipeline, Path(tmp) / f"rf-{trees}-{depth}.npy")
+                forest = CompactForest(path)
+                lat = latency_us(forest, X_test)
+                t0 = time.perf_counter()
+                forest.predict_proba(batch)
+                batch_ms = (time.perf_counter() - t0) * 1000
+                m = evaluate(pipeline, X_test, y_test)
+                print(f"   {trees:>5} {str(depth or '∞'):>5} {fit_s:>7.2f} "
+                      f"{path.stat().st_size / 1e6:>6.2f} {lat['single_us']:>9.0f} {batch_ms:>9.1f} "
+                      f"{m.get('roc_auc', float('nan')):>7.4f} {m['accuracy']:>7.4f} {m['brier']:>7.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+WASTE IQ – YOLO ONNX Parity & Latency Benchmark
+Runs the same images through the ultralytics/torch model and the ONNX
+engine (yolo_onnx.OnnxClassifier) and reports:
+
+  • top-1 agreement and mean top-5 overlap between the two engines
+  • max absolute probability difference
+  • per-image latency (p50 / p95) for each engine, single and batched
+
+Exits non-zero if top-1 agreement falls below --min-agreement, so it can
+gate an INT8 export before it is deployed.
+
+    cd backend
+    python yolo_onnx.py export --int8
+    python benchmarks/yolo_onnx_parity.py --images ../samples --onnx yolov8n-cls.int8.onnx
+
+Usage: python benchmarks/yolo_onnx_parity.py --images DIR [--onnx PATH] [--runs 20] [--batch 8]
+"""
+
+import sys
+import time
+import argparse
+import statistics
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from yolo_onnx import OnnxClassifier, YOLO_ONNX_PATH   # noqa: E402
+
+
+def _pct(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def _timed(fn, runs):
+    times = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", required=True, help="directory of .jpg/.png images")
+    parser.add_argument("--onnx", default=str(YOLO_ONNX_PATH))
+    parser.add_argument("--weights", default="yolov8n-cls.pt")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--batch", type=int, default=8)
+    parser.add_argument("--min-agreement", type=float, default=0.95)
+    args = parser.parse_args()
+
+    paths = sorted(p for p in Path(args.images).iterdir() if p.suffix.lower() in (".jpg", ".jpeg", ".png"))
+    if not paths:
+        sys.exit(f"No images in {args.images}")
+    imgs = [Image.open(p).convert("RGB") for p in paths]
+
+    from ultralytics import YOLO
+    torch_model = YOLO(args.weights)
+    onnx_model = OnnxClassifier(args.onnx)
+
+    # ── Parity ──
+    torch_probs = np.stack([r.probs.data.cpu().numpy() for r in torch_model(imgs, verbose=False)])
+    onnx_probs = onnx_model.probs(imgs)
+
+    t_top5 = np.argsort(-torch_probs, axis=1)[:, :5]
+    o_top5 = np.argsort(-onnx_probs, axis=1)[:, :5]
+    agreement = float(np.mean(t_top5[:, 0] == o_top5[:, 0]))
+    overlap = float(np.mean([len(set(a) & set(b)) / 5 for a, b in zip(t_top5, o_top5)]))
+    max_diff = float(np.max(np.abs(torch_probs - onnx_probs)))
+
+    print(f"\n📊 Parity over {len(imgs)} images ({Path(args.onnx).name})")
+    print(f"   top-1 agreement   {agreement:.1%}")
+    print(f"   top-5 overlap     {overlap:.1%}")
+    print(f"   max |Δprob|       {max_diff:.4f}")
+    for i in np.where(t_top5[:, 0] != o_top5[:, 0])[0][:10]:
+        print(f"   ≠ {paths[i].name}: torch={torch_model.names[t_top5[i, 0]]} onnx={onnx_model.names[o_top5[i, 0]]}")
+
+    # ── Latency ──
+    one = imgs[0]
+    batch = (imgs * args.batch)[:args.batch]
+    torch_model(one, verbose=False)            # warm both engines
+    onnx_model.probs([one])
+
+    rows = [
+        ("torch  single", _timed(lambda: torch_model(one, verbose=False), args.runs), 1),
+        ("onnx   single", _timed(lambda: onnx_model.probs([one]), args.runs), 1),
+        (f"torch  batch{args.batch}", _timed(lambda: torch_model(batch, verbose=False), args.runs), args.batch),
+        (f"onnx   batch{args.batch}", _timed(lambda: onnx_model.probs(batch), args.runs), args.batch),
+    ]
+    print(f"\n⏱  Latency over {args.runs} runs (ms per image)")
+    print(f"   {'engine':<16}{'p50':>8}{'p95':>8}{'mean':>8}")
+    for name, times, n in rows:
+        per = [t / n for t in times]
+        print(f"   {name:<16}{_pct(per, 0.5):>8.1f}{_pct(per, 0.95):>8.1f}{statistics.mean(per):>8.1f}")
+
+    if agreement < args.min_agreement:
+        sys.exit(f"\n❌ top-1 agreement {agreement:.1%} below {args.min_agreement:.0%}")
+    print("\n✅ Parity OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+WASTE IQ – Streaming Data Export
+Generators that walk a collection page-by-page with a Firestore cursor and
+yield encoded chunks (CSV, NDJSON or Parquet), so an export of any size
+streams in constant memory with no row cap.
+
+Every report type has a declared, stable column list (the union of the
+fields its writers produce). Fields outside that list are kept, not
+dropped: they are serialized as JSON into a trailing `extra` column.
+"""
+
+import io
+import csv
+import json
+import zlib
+from typing import Dict, Iterator, List, Optional
+
+import firestore_client as fc
+
+PAGE_SIZE = 500
+
+EXPORT_SCHEMAS: Dict[str, List[str]] = {
+    "waste_logs": [
+        "uid", "object_name", "waste_category", "confidence", "disposal_instructions",
+        "recycling_tip", "image_url", "timestamp", "mode",
+    ],
+    "bins": [
+        "bin_id", "ward_id", "location", "fill_level", "capacity_liters", "status",
+        "assigned_driver", "last_collected", "driver_uid", "created_at",
+    ],
+    "complaints": [
+        "complaint_id", "title", "description", "ward_id", "bin_id", "location", "image_url",
+        "submitted_by", "status", "created_at", "resolved_at", "resolution", "resolved_by",
+    ],
+    "gamification": [
+        "uid", "total_points", "weekly_points", "badges", "level",
+    ],
+}
+
+FORMATS = {
+    "csv":     ("text/csv",                      "csv"),
+    "ndjson":  ("application/x-ndjson",          "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+
+def columns(report_type: str) -> List[str]:
+    return ["_id", *EXPORT_SCHEMAS[report_type], "extra"]
+
+
+def _json_default(v):
+    return v.isoformat() if hasattr(v, "isoformat") else str(v)
+
+
+def _flatten(doc: Dict, report_type: str) -> Dict:
+    """Map a document onto the stable column list; nested values become JSON."""
+    known = set(EXPORT_SCHEMAS[report_type]) | {"_id"}
+    row = {}
+    for col in ["_id", *EXPORT_SCHEMAS[report_type]]:
+        v = doc.get(col)
+        row[col] = json.dumps(v, default=_json_default) if isinstance(v, (dict, list)) else v
+    extra = {k: v for k, v in doc.items() if k not in known}
+    row["extra"] = json.dumps(extra, default=_json_default) if extra else None
+    return row
+
+
+# ── Source ───────────────────────────────────────────────────
+
+def first_page(report_type: str) -> tuple:
+    """Fetch page one eagerly so callers can 404 on empty before streaming starts."""
+    docs, cursor, _ = fc.query_page(report_type, limit=PAGE_SIZE)
+    return docs, cursor
+
+
+def iter_pages(report_type: str, docs: List[Dict], cursor: Optional[str]) -> Iterator[List[Dict]]:
+    """Yield `docs`, then keep following the cursor until the collection is exhausted."""
+    yield docs
+    while cursor:
+        docs, cursor, _ = fc.query_page(report_type, limit=PAGE_SIZE, cursor=cursor)
+        if docs:
+            yield docs
+
+
+# ── Encoders ─────────────────────────────────────────────────
+
+def csv_chunks(report_type: str, pages: Iterator[List[Dict]]) -> Iterator[bytes]:
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=columns(report_type))
+    writer.writeheader()
+    for docs in pages:
+        for doc in docs:
+            writer.writerow(_flatten(doc, report_type))
+        yield buf.getvalue().encode()
+        buf.seek(0)
+        buf.truncate()
+
+
+def ndjson_chunks(report_type: str, pages: Iterator[List[Dict]]) -> Iterator[bytes]:
+    for docs in pages:
+        yield "".join(json.dumps(doc, default=_json_default) + "\n" for doc in docs).encode()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object that hands back whatever was written since the last drain."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._pos = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        data = bytes(b)
+        self._chunks.append(data)
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def drain(self) -> bytes:
+        out = b"".join(self._chunks)
+        self._chunks.clear()
+        return out
+
+
+def parquet_chunks(report_type: str, pages: Iterator[List[Dict]]) -> Iterator[bytes]:
+    """One Parquet row group per page; all columns are nullable strings for a stable schema."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    cols = columns(report_type)
+    schema = pa.schema([(c, pa.string()) for c in cols])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="snappy")
+    try:
+        for docs in pages:
+            rows = [_flatten(doc, report_type) for doc in docs]
+            table = pa.table({c: [None if r[c] is None else str(r[c]) for r in rows] for c in cols},
+                             schema=schema)
+            writer.write_table(table)
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()   # footer
+
+
+ENCODERS = {"csv": csv_chunks, "ndjson": ndjson_chunks, "parquet": parquet_chunks}
+
+
+def gzip_chunks(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)   # wbits=31 → gzip container
+    for chunk in chunks:
+        out = compressor.compress(chunk)
+        if out:
+            yield out
+    yield compressor.flush()
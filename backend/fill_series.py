@@ -0,0 +1,431 @@
+"""
+WASTE IQ – Fill-Level Time Series
+Append-only store of sensor fill readings per bin, kept on local disk in
+columnar NumPy segments instead of one Firestore document per reading:
+
+    buffer    readings accumulate in memory per worker
+    raw-*     flushed every FILL_FLUSH_INTERVAL_S (or FILL_FLUSH_ROWS):
+              one immutable segment, sorted by (bin, time)
+    hist-*    compaction merges settled raw segments into one segment
+    rollup-*  …and writes hourly rollups (mean/min/max/last/count) per day
+
+Retention: hist segments live FILL_RAW_RETENTION_H, daily rollup files
+FILL_ROLLUP_RETENTION_D. Compaction runs at most once per
+FILL_COMPACT_INTERVAL_S, from ingestion, under a file lock so only one
+uvicorn worker does it. Bins are keyed by a 64-bit hash of bin_id, so
+workers need no shared dictionary.
+
+`bins/{id}.fill_level` is still updated for the dashboard, but throttled:
+only when the reading moved FILL_DOC_DELTA points or FILL_DOC_INTERVAL_S
+has passed, all due bins in one BatchWriter.
+
+fill_rates() feeds OverflowModel: least-squares slope (% per hour) over
+each bin's readings since its last emptying (a drop of more than
+RESET_DROP points) in the recent window.
+"""
+
+import os
+import re
+import time
+import threading
+from hashlib import blake2b
+from pathlib import Path
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+BASE_DIR        = Path(__file__).parent
+FILL_SERIES_DIR = Path(os.getenv("FILL_SERIES_DIR", BASE_DIR / "fill_series"))
+
+FLUSH_INTERVAL_S    = float(os.getenv("FILL_FLUSH_INTERVAL_S", "60"))
+FLUSH_ROWS          = int(os.getenv("FILL_FLUSH_ROWS", "50000"))
+COMPACT_INTERVAL_S  = float(os.getenv("FILL_COMPACT_INTERVAL_S", "3600"))
+COMPACT_GRACE_S     = 600        # raw segments younger than this may still see late data
+RAW_RETENTION_H     = float(os.getenv("FILL_RAW_RETENTION_H", "72"))
+ROLLUP_RETENTION_D  = float(os.getenv("FILL_ROLLUP_RETENTION_D", "400"))
+DOC_DELTA           = float(os.getenv("FILL_DOC_DELTA", "5"))
+DOC_INTERVAL_S      = float(os.getenv("FILL_DOC_INTERVAL_S", "900"))
+
+RATE_WINDOW_H = 24.0   # how far back fill_rates() looks
+RESET_DROP    = 20.0   # a drop this large = bin was emptied; the rate restarts
+MIN_POINTS    = 3
+MIN_SPAN_H    = 0.5
+
+READING_DTYPE = np.dtype([("bin", "<u8"), ("ts", "<f8"), ("fill", "<f4")])
+ROLLUP_DTYPE  = np.dtype([("bin", "<u8"), ("hour", "<f8"), ("mean", "<f4"), ("min", "<f4"),
+                          ("max", "<f4"), ("last", "<f4"), ("count", "<u4")])
+
+_SEGMENT = re.compile(r"^(raw|hist)-(\d+)-(\d+)-.+\.npy$")
+
+
+def bin_key(bin_id: str) -> int:
+    return int.from_bytes(blake2b(bin_id.encode(), digest_size=8).digest(), "little")
+
+
+def _ts(value) -> Optional[float]:
+    if value is None:
+        return time.time()
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        dt = datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def _select(seg: np.ndarray, keys: np.ndarray) -> np.ndarray:
+    """Rows of a (bin, ts)-sorted segment for `keys`: binary search for a few bins, isin for many."""
+    if len(keys) > 16:
+        return seg[np.isin(seg["bin"], keys)]
+    b = seg["bin"]
+    parts = [seg[np.searchsorted(b, k):np.searchsorted(b, k, "right")] for k in keys]
+    return np.concatenate(parts) if parts else seg[:0]
+
+
+class FillSeries:
+    def __init__(self, root: Path = FILL_SERIES_DIR):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._buffer: List[Tuple[int, float, float]] = []
+        self._flushed_at = time.monotonic()
+        self._compacted_at = 0.0
+        self._seq = 0
+        self._segments: Dict[str, np.ndarray] = {}    # name → mmap (segments are immutable); under _lock
+        self._doc_state: Dict[str, Tuple[float, float]] = {}   # bin_id → (fill, ts) last written; under _lock
+        self.appended = 0
+        self.flushes = 0
+
+    # ── Write path ───────────────────────────────────────────
+
+    def append(self, bin_ids: List[str], fills: List[float], ts: List[float]) -> int:
+        rows = [(bin_key(b), float(t), float(f)) for b, f, t in zip(bin_ids, fills, ts)]
+        with self._lock:
+            self._buffer.extend(rows)
+            self.appended += len(rows)
+            due = (len(self._buffer) >= FLUSH_ROWS
+                   or time.monotonic() - self._flushed_at >= FLUSH_INTERVAL_S)
+        if due:
+            self.flush()
+        return len(rows)
+
+    def flush(self) -> Optional[Path]:
+        with self._lock:
+            rows, self._buffer = self._buffer, []
+            self._flushed_at = time.monotonic()
+            self._seq += 1
+            seq = self._seq
+        if not rows:
+            return None
+        self.flushes += 1
+        return self._write_segment("raw", np.array(rows, dtype=READING_DTYPE), f"{os.getpid()}-{seq}")
+
+    def _write_segment(self, kind: str, seg: np.ndarray, tag: str) -> Path:
+        seg = seg[np.lexsort((seg["ts"], seg["bin"]))]
+        name = f"{kind}-{int(seg['ts'].min())}-{int(np.ceil(seg['ts'].max()))}-{tag}.npy"
+        tmp = self.root / f".{name}.tmp.npy"
+        np.save(tmp, seg)
+        os.replace(tmp, self.root / name)
+        return self.root / name
+
+    # ── Read path ────────────────────────────────────────────
+
+    def _segment_files(self, since: float, until: float) -> List[Path]:
+        out, present = [], set()
+        for path in self.root.glob("*.npy"):
+            m = _SEGMENT.match(path.name)
+            if m:
+                present.add(path.name)
+                if int(m.group(3)) >= since and int(m.group(2)) <= until:
+                    out.append(path)
+        with self._lock:
+            for name in [n for n in self._segments if n not in present]:
+                self._segments.pop(name, None)   # compacted or expired (possibly by another worker)
+        return out
+
+    def _load(self, path: Path) -> Optional[np.ndarray]:
+        with self._lock:
+            seg = self._segments.get(path.name)
+        if seg is None:
+            try:
+                seg = np.load(path, mmap_mode="r")
+            except (OSError, ValueError):
+                return None   # compacted away between glob and open
+            with self._lock:
+                self._segments[path.name] = seg
+        return seg
+
+    def _forget(self, name: str) -> None:
+        with self._lock:
+            self._segments.pop(name, None)
+
+    def readings(self, keys: np.ndarray, since: float, until: float) -> np.ndarray:
+        """Readings for the given bin keys in [since, until], sorted by (bin, ts)."""
+        keys = np.asarray(keys, dtype=np.uint64)
+        parts = []
+        for path in self._segment_files(since, until):
+            seg = self._load(path)
+            if seg is not None:
+                parts.append(_select(seg, keys))
+        with self._lock:
+            if self._buffer:
+                buf = np.array(self._buffer, dtype=READING_DTYPE)
+                parts.append(buf[np.isin(buf["bin"], keys)])
+        if not parts:
+            return np.empty(0, dtype=READING_DTYPE)
+        out = np.concatenate(parts)
+        out = out[(out["ts"] >= since) & (out["ts"] <= until)]
+        return out[np.lexsort((out["ts"], out["bin"]))]
+
+    def series(self, bin_id: str, since: float, until: float = None) -> Dict[str, list]:
+        r = self.readings(np.array([bin_key(bin_id)], dtype=np.uint64), since, until or time.time())
+        return {"ts": r["ts"].tolist(), "fill_level": np.round(r["fill"], 1).tolist()}
+
+    def rollups(self, bin_id: str, since: float, until: float = None) -> List[Dict]:
+        """Hourly rollups for one bin; rows written by separate compactions are merged."""
+        until = until or time.time()
+        key = np.uint64(bin_key(bin_id))
+        hours: Dict[float, Dict] = {}
+        for path in sorted(self.root.glob("rollup-*.npy")):
+            day = datetime.strptime(path.stem.split("-")[1], "%Y%m%d").replace(tzinfo=timezone.utc).timestamp()
+            if day + 86400 < since or day > until:
+                continue
+            r = np.load(path, mmap_mode="r")
+            r = r[(r["bin"] == key) & (r["hour"] >= since - 3600) & (r["hour"] <= until)]
+            for row in r.tolist():
+                _, hour, mean, lo, hi, last, count = row
+                h = hours.get(hour)
+                if h is None:
+                    hours[hour] = {"mean": mean, "min": lo, "max": hi, "last": last, "count": count}
+                else:
+                    total = h["count"] + count
+                    h.update(mean=(h["mean"] * h["count"] + mean * count) / total,
+                             min=min(h["min"], lo), max=max(h["max"], hi), last=last, count=total)
+        return [{"hour": datetime.fromtimestamp(hr, timezone.utc).isoformat(),
+                 **{k: round(v, 1) if k != "count" else v for k, v in h.items()}}
+                for hr, h in sorted(hours.items())]
+
+    def fill_rates(self, bin_ids: List[str], now: float = None,
+                   window_h: float = RATE_WINDOW_H) -> np.ndarray:
+        """
+        Fill rate (% per hour) per bin, NaN where the series is too short.
+        One pass for all bins: readings grouped by bin, only the run after
+        the last emptying kept, slope from grouped least-squares sums.
+        """
+        now = now or time.time()
+        keys = np.array([bin_key(b) for b in bin_ids], dtype=np.uint64)
+        rates = np.full(len(keys), np.nan)
+        r = self.readings(keys, now - window_h * 3600, now)
+        if len(r) == 0:
+            return rates
+
+        uniq, g = np.unique(r["bin"], return_inverse=True)
+        t = (r["ts"] - now) / 3600.0
+        f = r["fill"].astype(np.float64)
+        same = np.r_[False, g[1:] == g[:-1]]
+        reset = same & (np.r_[0.0, np.diff(f)] < -RESET_DROP)
+        run = np.cumsum(reset)
+        last_row = np.r_[np.nonzero(g[1:] != g[:-1])[0], len(g) - 1]
+        keep = run == run[last_row][g]
+        g, t, f = g[keep], t[keep], f[keep]
+
+        k = len(uniq)
+        n   = np.bincount(g, minlength=k).astype(float)
+        st  = np.bincount(g, t, k)
+        sf  = np.bincount(g, f, k)
+        stt = np.bincount(g, t * t, k)
+        stf = np.bincount(g, t * f, k)
+        hi, lo = np.full(k, -np.inf), np.full(k, np.inf)
+        np.maximum.at(hi, g, t)
+        np.minimum.at(lo, g, t)
+        span = hi - lo
+        with np.errstate(divide="ignore", invalid="ignore"):
+            slope = (n * stf - st * sf) / (n * stt - st * st)
+        slope[(n < MIN_POINTS) | (span < MIN_SPAN_H)] = np.nan
+
+        pos = {int(key): i for i, key in enumerate(uniq.tolist())}
+        for i, key in enumerate(keys.tolist()):
+            j = pos.get(int(key))
+            if j is not None:
+                rates[i] = slope[j]
+        return rates
+
+    # ── Compaction & retention ───────────────────────────────
+
+    def maybe_compact(self) -> None:
+        if time.monotonic() - self._compacted_at < COMPACT_INTERVAL_S:
+            return
+        self._compacted_at = time.monotonic()
+        try:
+            self.compact()
+        except Exception as e:
+            print(f"⚠️  Fill series compaction failed: {e}")
+
+    def compact(self, now: float = None) -> Dict:
+        """Merge settled raw segments, roll them up hourly, apply retention. One worker at a time."""
+        now = now or time.time()
+        try:
+            import fcntl
+        except ImportError:
+            fcntl = None
+        with open(self.root / ".compact.lock", "w") as lock:
+            if fcntl:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    return {"skipped": "another worker is compacting"}
+
+            raw = [p for p in self.root.glob("raw-*.npy")
+                   if int(_SEGMENT.match(p.name).group(3)) < now - COMPACT_GRACE_S]
+            merged = 0
+            if raw:
+                seg = np.concatenate([np.load(p) for p in raw])
+                self._write_segment("hist", seg, f"{int(now)}-{os.getpid()}")
+                self._write_rollups(seg)
+                for p in raw:
+                    p.unlink(missing_ok=True)
+                    self._forget(p.name)
+                merged = len(seg)
+
+            expired = 0
+            for p in self.root.glob("hist-*.npy"):
+                if int(_SEGMENT.match(p.name).group(3)) < now - RAW_RETENTION_H * 3600:
+                    p.unlink(missing_ok=True)
+                    self._forget(p.name)
+                    expired += 1
+            cutoff = datetime.fromtimestamp(now - ROLLUP_RETENTION_D * 86400, timezone.utc).strftime("%Y%m%d")
+            for p in self.root.glob("rollup-*.npy"):
+                if p.stem.split("-")[1] < cutoff:
+                    p.unlink(missing_ok=True)
+                    expired += 1
+        return {"raw_segments": len(raw), "readings_merged": merged, "files_expired": expired}
+
+    def _write_rollups(self, seg: np.ndarray) -> None:
+        hour = np.floor(seg["ts"] / 3600) * 3600
+        order = np.lexsort((seg["ts"], hour, seg["bin"]))
+        seg, hour = seg[order], hour[order]
+        starts = np.r_[0, np.nonzero((seg["bin"][1:] != seg["bin"][:-1]) | (hour[1:] != hour[:-1]))[0] + 1]
+        ends = np.r_[starts[1:], len(seg)]
+        fill = seg["fill"]
+        rows = np.empty(len(starts), dtype=ROLLUP_DTYPE)
+        rows["bin"], rows["hour"] = seg["bin"][starts], hour[starts]
+        rows["count"] = ends - starts
+        rows["mean"] = np.add.reduceat(fill.astype(np.float64), starts) / rows["count"]
+        rows["min"], rows["max"] = np.minimum.reduceat(fill, starts), np.maximum.reduceat(fill, starts)
+        rows["last"] = fill[ends - 1]
+
+        days = np.array([datetime.fromtimestamp(h, timezone.utc).strftime("%Y%m%d") for h in rows["hour"]])
+        for day in np.unique(days):
+            path = self.root / f"rollup-{day}.npy"
+            new = rows[days == day]
+            if path.exists():
+                new = np.concatenate([np.load(path), new])
+            tmp = self.root / f".rollup-{day}.tmp.npy"
+            np.save(tmp, new)
+            os.replace(tmp, path)
+
+    # ── Throttled bins/{id} updates ──────────────────────────
+
+    def doc_updates(self, latest: Dict[str, Tuple[float, float]]) -> Dict[str, Dict]:
+        """{bin_id: (fill, ts)} latest readings → the bin docs that are due for a write."""
+        due = {}
+        with self._lock:
+            for bid, (fill, ts) in latest.items():
+                prev = self._doc_state.get(bid)
+                if prev is not None:
+                    moved = abs(fill - prev[0])
+                    if moved < DOC_DELTA and (moved == 0 or ts - prev[1] < DOC_INTERVAL_S):
+                        continue
+                self._doc_state[bid] = (fill, ts)
+                due[bid] = {
+                    "fill_level":      round(fill, 1),
+                    "fill_updated_at": datetime.fromtimestamp(ts, timezone.utc).isoformat(),
+                }
+        return due
+
+    def forget_doc_state(self, bin_ids: List[str]) -> None:
+        """The bin-doc write failed: make the next reading for these bins due again."""
+        with self._lock:
+            for bid in bin_ids:
+                self._doc_state.pop(bid, None)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            buffered = len(self._buffer)
+        files = [p.name.split("-")[0] for p in self.root.glob("*.npy")]
+        return {
+            "appended": self.appended,
+            "buffered": buffered,
+            "flushes":  self.flushes,
+            "raw_segments":  files.count("raw"),
+            "hist_segments": files.count("hist"),
+            "rollup_days":   files.count("rollup"),
+        }
+
+
+_series: Optional[FillSeries] = None
+_series_lock = threading.Lock()
+
+
+def get_series() -> FillSeries:
+    global _series
+    with _series_lock:
+        if _series is None:
+            _series = FillSeries()
+        return _series
+
+
+def ingest(readings: List[Dict], fc) -> Dict:
+    """
+    Store sensor readings ({bin_id, fill_level, recorded_at?}) and push the
+    throttled bin-doc updates in one batch. Blocking — run via run_blocking.
+    """
+    series = get_series()
+    ids, fills, ts, rejected = [], [], [], 0
+    latest: Dict[str, Tuple[float, float]] = {}
+    for r in readings:
+        t = _ts(r.get("recorded_at"))
+        if t is None:
+            rejected += 1
+            continue
+        ids.append(r["bin_id"])
+        fills.append(float(r["fill_level"]))
+        ts.append(t)
+        if r["bin_id"] not in latest or t >= latest[r["bin_id"]][1]:
+            latest[r["bin_id"]] = (float(r["fill_level"]), t)
+    stored = series.append(ids, fills, ts)
+
+    updates = series.doc_updates(latest)
+    errors = []
+    if updates:
+        with fc.batch_writer() as writer:
+            for bid, update in updates.items():
+                writer.update("bins", bid, update)
+        errors = writer.errors
+        series.forget_doc_state([e.get("doc_id") for e in errors])   # retry on the next reading
+    series.maybe_compact()
+    return {
+        "stored":           stored,
+        "rejected":         rejected,
+        "bins":             len(latest),
+        "bin_docs_updated": len(updates) - len(errors),
+        "bin_doc_errors":   [e.get("doc_id") for e in errors],
+    }
+
+
+def record_collection(bin_id: str) -> None:
+    """Bin emptied: a 0% reading restarts its fill-rate series before the sensor reports."""
+    get_series().append([bin_id], [0.0], [time.time()])
+
+
+def stats() -> Optional[Dict]:
+    return _series.stats() if _series is not None else None
+
+
+def shutdown() -> None:
+    if _series is not None:
+        _series.flush()
@@ -0,0 +1,75 @@
+"""
+WASTE IQ – Async Firestore Client
+Awaitable mirror of firestore_client for FastAPI handlers.
+
+Every call is offloaded to a dedicated, bounded thread pool so a slow
+Firestore round-trip never blocks the event loop. The sync module stays
+the single source of truth (same client, same batching), this module
+only changes *where* the blocking happens.
+
+Blocking work that isn't Firestore I/O (Firebase Auth admin calls, route
+solving, overflow scoring, fill-series reads, aggregate rebuilds) goes
+through run_blocking on a separate pool, so a slow solve or rebuild never
+holds the threads Firestore calls are queued behind.
+"""
+
+import os
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+import firestore_client as _fc
+
+FIRESTORE_IO_THREADS = int(os.getenv("FIRESTORE_IO_THREADS", "32"))
+BLOCKING_WORK_THREADS = int(os.getenv("BLOCKING_WORK_THREADS", "8"))
+
+_executor = ThreadPoolExecutor(max_workers=FIRESTORE_IO_THREADS,
+                               thread_name_prefix="fs-io")
+_work_executor = ThreadPoolExecutor(max_workers=BLOCKING_WORK_THREADS,
+                                    thread_name_prefix="blocking-work")
+
+
+async def run_sync(fn, *args, **kwargs):
+    """Run a blocking Firestore-bound callable off the event loop, on the I/O pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(fn, *args, **kwargs))
+
+
+async def run_blocking(fn, *args, **kwargs):
+    """Run blocking non-Firestore work (Auth admin, routing, scoring, rebuilds) off the I/O pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_work_executor, functools.partial(fn, *args, **kwargs))
+
+
+def _offload(fn):
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        return await run_sync(fn, *args, **kwargs)
+    return wrapper
+
+
+# ── Core Helpers ─────────────────────────────────────────────
+
+get_doc          = _offload(_fc.get_doc)
+get_docs         = _offload(_fc.get_docs)
+set_doc          = _offload(_fc.set_doc)
+add_doc          = _offload(_fc.add_doc)
+update_doc       = _offload(_fc.update_doc)
+delete_doc       = _offload(_fc.delete_doc)
+query_collection = _offload(_fc.query_collection)
+query_page       = _offload(_fc.query_page)
+count_documents  = _offload(_fc.count_documents)
+count_by         = _offload(_fc.count_by)
+increment_field  = _offload(_fc.increment_field)
+increment_fields = _offload(_fc.increment_fields)
+
+# ── Batched Writes ───────────────────────────────────────────
+
+bulk_set    = _offload(_fc.bulk_set)
+bulk_update = _offload(_fc.bulk_update)
+bulk_add    = _offload(_fc.bulk_add)
+
+
+def shutdown() -> None:
+    _executor.shutdown(wait=False)
+    _work_executor.shutdown(wait=False)
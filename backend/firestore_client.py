@@ -3,6 +3,14 @@ WASTE IQ – Firestore Client (LOCAL VERSION)
 Uses firebase_key.json directly.
 """
 
+import os
+import copy
+import json
+import time
+import base64
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future
 from typing import Any, Dict, List, Optional
 import firebase_admin
 from firebase_admin import credentials, firestore
@@ -28,20 +36,165 @@ def _get_db():
     return _db
 
 
+# ── Document Cache ───────────────────────────────────────────
+# Read-through LRU+TTL cache for hot documents, keyed by (collection, doc_id).
+# Only collections with a TTL are cached; writes made through this module
+# invalidate the entry. Override TTLs with e.g.
+#   FIRESTORE_CACHE_TTLS="users=300,gamification=30"   (seconds, 0 disables)
+
+DEFAULT_CACHE_TTLS = {"users": 300.0, "gamification": 30.0, "leaderboards": 10.0, "stats": 10.0}
+
+
+def _parse_ttls(raw: str) -> Dict[str, float]:
+    ttls = dict(DEFAULT_CACHE_TTLS)
+    for part in raw.split(","):
+        if "=" in part:
+            name, ttl = part.split("=", 1)
+            try:
+                ttls[name.strip()] = float(ttl)
+            except ValueError:
+                pass
+    return {k: v for k, v in ttls.items() if v > 0}
+
+
+class _DocCache:
+    def __init__(self, ttls: Dict[str, float], max_entries: int):
+        self.ttls = ttls
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()  # key → (expires_at, data)
+        self._lock = threading.Lock()
+        self._epoch = 0     # bumped on every invalidation; guards stale fills
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, collection: str, what: str) -> None:
+        bucket = self._stats.setdefault(collection, {"hits": 0, "misses": 0,
+                                                     "evictions": 0, "invalidations": 0})
+        bucket[what] += 1
+
+    def enabled(self, collection: str) -> bool:
+        return collection in self.ttls
+
+    def get(self, collection: str, doc_id: str):
+        """Return (hit, data, epoch). `epoch` must be passed back to put()."""
+        key = (collection, doc_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self._count(collection, "hits")
+                return True, copy.deepcopy(entry[1]), self._epoch
+            if entry:
+                del self._entries[key]
+            self._count(collection, "misses")
+            return False, None, self._epoch
+
+    def put(self, collection: str, doc_id: str, data: Dict, epoch: int) -> None:
+        with self._lock:
+            # A write landed while we were reading — don't cache what may be stale
+            if epoch != self._epoch:
+                return
+            self._entries[(collection, doc_id)] = (time.monotonic() + self.ttls[collection],
+                                                   copy.deepcopy(data))
+            self._entries.move_to_end((collection, doc_id))
+            while len(self._entries) > self.max_entries:
+                (old_collection, _), _ = self._entries.popitem(last=False)
+                self._count(old_collection, "evictions")
+
+    def invalidate(self, collection: str, doc_id: str) -> None:
+        if collection not in self.ttls:
+            return
+        with self._lock:
+            self._epoch += 1
+            if self._entries.pop((collection, doc_id), None) is not None:
+                self._count(collection, "invalidations")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            per_collection = {}
+            for name, bucket in self._stats.items():
+                lookups = bucket["hits"] + bucket["misses"]
+                per_collection[name] = {**bucket,
+                                        "hit_rate": round(bucket["hits"] / lookups, 3) if lookups else 0.0}
+            return {"entries": len(self._entries), "max_entries": self.max_entries,
+                    "ttls": dict(self.ttls), "collections": per_collection}
+
+
+_cache = _DocCache(
+    ttls=_parse_ttls(os.getenv("FIRESTORE_CACHE_TTLS", "")),
+    max_entries=int(os.getenv("FIRESTORE_CACHE_SIZE", "4096")),
+)
+
+
+def cache_stats() -> Dict:
+    return _cache.stats()
+
+
+def clear_cache() -> None:
+    _cache.clear()
+
+
 # ── Core Helpers ─────────────────────────────────────────────
 
 def get_doc(collection: str, doc_id: str) -> Optional[Dict]:
+    cached = _cache.enabled(collection)
+    if cached:
+        hit, data, epoch = _cache.get(collection, doc_id)
+        if hit:
+            return data
+
     ref = _get_db().collection(collection).document(doc_id)
     snap = ref.get()
     if snap.exists:
         data = snap.to_dict()
         data["_id"] = snap.id
+        if cached:
+            _cache.put(collection, doc_id, data, epoch)
         return data
     return None
 
 
+def get_docs(collection: str, doc_ids: List[str]) -> Dict[str, Dict]:
+    """
+    Multi-get: fetch many documents in one batched round-trip (cache-aware).
+    Returns {doc_id: data} for the documents that exist.
+    """
+    found: Dict[str, Dict] = {}
+    wanted = [d for d in dict.fromkeys(doc_ids) if d]
+    cached = _cache.enabled(collection)
+
+    epoch = None
+    if cached:
+        missing = []
+        for doc_id in wanted:
+            hit, data, epoch_now = _cache.get(collection, doc_id)
+            if hit:
+                found[doc_id] = data
+            else:
+                missing.append(doc_id)
+                epoch = epoch_now if epoch is None else epoch
+        wanted = missing
+
+    if wanted:
+        db = _get_db()
+        refs = [db.collection(collection).document(doc_id) for doc_id in wanted]
+        for snap in db.get_all(refs):
+            if snap.exists:
+                data = snap.to_dict()
+                data["_id"] = snap.id
+                found[snap.id] = data
+                if cached:
+                    _cache.put(collection, snap.id, data, epoch)
+    return found
+
+
 def set_doc(collection: str, doc_id: str, data: Dict) -> str:
     _get_db().collection(collection).document(doc_id).set(data)
+    _cache.invalidate(collection, doc_id)
     return doc_id
 
 
@@ -52,10 +205,12 @@ def add_doc(collection: str, data: Dict) -> str:
 
 def update_doc(collection: str, doc_id: str, data: Dict) -> None:
     _get_db().collection(collection).document(doc_id).update(data)
+    _cache.invalidate(collection, doc_id)
 
 
 def delete_doc(collection: str, doc_id: str) -> None:
     _get_db().collection(collection).document(doc_id).delete()
+    _cache.invalidate(collection, doc_id)
 
 
 def query_collection(
@@ -64,9 +219,13 @@ def query_collection(
     order_by: Optional[str] = None,
     order_desc: bool = False,
     limit: Optional[int] = None,
+    fields: Optional[List[str]] = None,
 ) -> List[Dict]:
     ref = _get_db().collection(collection)
 
+    if fields:
+        ref = ref.select(fields)   # projection: only ship the fields we need
+
     if filters:
         for field, op, value in filters:
             ref = ref.where(filter=FieldFilter(field, op, value))
@@ -91,11 +250,347 @@ def query_collection(
     return docs
 
 
+# ── Cursor Pagination ────────────────────────────────────────
+# Cursors are opaque to clients: base64(JSON) of the last row's order-by
+# value + document ID (tie-breaker), plus the page number for display.
+
+def encode_cursor(value: Any, doc_id: str, page: int) -> str:
+    raw = json.dumps({"v": value, "id": doc_id, "p": page}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict:
+    """Raises ValueError on a malformed cursor."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(data, dict) or "id" not in data:
+            raise ValueError
+        return data
+    except Exception:
+        raise ValueError("Invalid pagination cursor")
+
+
+def query_page(
+    collection: str,
+    filters: Optional[List[tuple]] = None,
+    order_by: Optional[str] = None,
+    order_desc: bool = False,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+) -> tuple:
+    """
+    One page of a query using start_after on (order_by, document ID).
+    Returns (docs, next_cursor, page); next_cursor is None on the last page.
+    """
+    state = decode_cursor(cursor) if cursor else None
+    direction = firestore.Query.DESCENDING if order_desc else firestore.Query.ASCENDING
+
+    ref = _filtered(collection, filters)
+    if order_by:
+        ref = ref.order_by(order_by, direction=direction)
+    # Explicit document-ID tie-breaker (same direction → served by the same index)
+    ref = ref.order_by("__name__", direction=direction)
+
+    if state:
+        values = {"__name__": state["id"]}
+        if order_by:
+            values[order_by] = state.get("v")
+        ref = ref.start_after(values)
+
+    # Fetch one extra row to know whether another page exists
+    docs = []
+    for snap in ref.limit(limit + 1).stream():
+        d = snap.to_dict()
+        d["_id"] = snap.id
+        docs.append(d)
+
+    page = state.get("p", 1) + 1 if state else 1
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        last = docs[-1]
+        next_cursor = encode_cursor(last.get(order_by) if order_by else None, last["_id"], page)
+    return docs, next_cursor, page
+
+
+def _filtered(collection: str, filters: Optional[List[tuple]] = None):
+    ref = _get_db().collection(collection)
+    for field, op, value in filters or []:
+        ref = ref.where(filter=FieldFilter(field, op, value))
+    return ref
+
+
+def count_documents(collection: str, filters: Optional[List[tuple]] = None) -> int:
+    """Server-side COUNT() aggregation — no documents are transferred."""
+    ref = _filtered(collection, filters)
+    try:
+        return int(ref.count(alias="n").get()[0][0].value)
+    except Exception:
+        # Older SDK / emulator without aggregations: stream doc refs only
+        return sum(1 for _ in ref.select([]).stream())
+
+
+def count_by(
+    collection: str,
+    field: str,
+    values: List[str],
+    filters: Optional[List[tuple]] = None,
+) -> Dict[str, int]:
+    """
+    Count documents per value of `field` using one COUNT() aggregation per
+    value (run concurrently). Documents whose value isn't in `values` are
+    reported under "Unknown". Falls back to a projected scan if aggregation
+    queries aren't available.
+    """
+    base = list(filters or [])
+    try:
+        with ThreadPoolExecutor(max_workers=min(len(values) + 1, 8)) as pool:
+            total_f = pool.submit(lambda: int(_filtered(collection, base).count(alias="n").get()[0][0].value))
+            futures = {
+                v: pool.submit(lambda v=v: int(_filtered(collection, base + [(field, "==", v)])
+                                               .count(alias="n").get()[0][0].value))
+                for v in values
+            }
+            counts = {v: f.result() for v, f in futures.items()}
+            other = total_f.result() - sum(counts.values())
+    except Exception:
+        from collections import Counter
+        docs = query_collection(collection, filters=base or None, fields=[field])
+        known = set(values)
+        counts = dict(Counter(d.get(field) if d.get(field) in known else "Unknown" for d in docs))
+        return {k: v for k, v in counts.items() if v}
+
+    if other > 0:
+        counts["Unknown"] = other
+    return {k: v for k, v in counts.items() if v}
+
+
 def increment_field(collection: str, doc_id: str, field: str, amount: int = 1) -> None:
     _get_db().collection(collection).document(doc_id).update(
         {field: firestore.Increment(amount)}
     )
+    _cache.invalidate(collection, doc_id)
+
+
+def increment_fields(collection: str, doc_id: str, increments: Dict) -> None:
+    """
+    Atomically add to several (possibly nested) numeric fields, creating the
+    document if needed: {"total": 1, "by_status": {"open": 1}}.
+    """
+    def _wrap(node):
+        return {k: _wrap(v) if isinstance(v, dict) else firestore.Increment(v)
+                for k, v in node.items()}
+
+    _get_db().collection(collection).document(doc_id).set(_wrap(increments), merge=True)
+    _cache.invalidate(collection, doc_id)
 
 
 def server_timestamp():
-    return firestore.SERVER_TIMESTAMP
\ No newline at end of file
+    return firestore.SERVER_TIMESTAMP
+
+
+# ── Batched Writes ───────────────────────────────────────────
+
+MAX_BATCH_SIZE = 500      # Firestore hard limit per WriteBatch commit
+MAX_IN_FLIGHT  = 4        # concurrent batch commits per writer
+
+
+class BatchWriter:
+    """
+    Coalesces mutations into Firestore WriteBatches of up to 500 ops and
+    commits them on a small thread pool, so bulk jobs cost one round-trip
+    per batch instead of one per document.
+
+        with batch_writer() as w:
+            w.add("overflow_predictions", doc)
+            w.update("bins", bin_id, {"status": "overflow"})
+        w.errors  # [] if every op landed
+
+    Not all-or-nothing: when a batch commit fails its ops are replayed one
+    by one to pin the failure on the offending op(s), so the ops that can
+    land do, and `errors` holds one entry per op that didn't. Writes that
+    must land together go through commit_atomic instead.
+
+    If the `with` body raises, ops not yet handed to the commit pool are
+    dropped; batches already committing are waited for.
+    """
+
+    def __init__(self, batch_size: int = MAX_BATCH_SIZE, max_in_flight: int = MAX_IN_FLIGHT):
+        self.batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+        self.max_in_flight = max(1, max_in_flight)
+        self.errors: List[Dict] = []
+        self.committed = 0
+        self._ops: List[tuple] = []
+        self._futures: List[Future] = []
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    # ── queueing ──
+    def set(self, collection: str, doc_id: str, data: Dict, merge: bool = False) -> str:
+        self._queue(("set", collection, doc_id, data, merge))
+        return doc_id
+
+    def add(self, collection: str, data: Dict) -> str:
+        # Allocate the auto-ID client-side so callers get it before commit
+        doc_id = _get_db().collection(collection).document().id
+        self._queue(("set", collection, doc_id, data, False))
+        return doc_id
+
+    def update(self, collection: str, doc_id: str, data: Dict) -> None:
+        self._queue(("update", collection, doc_id, data, False))
+
+    def increment(self, collection: str, doc_id: str, field: str, amount: int = 1) -> None:
+        self._queue(("update", collection, doc_id, {field: firestore.Increment(amount)}, False))
+
+    def delete(self, collection: str, doc_id: str) -> None:
+        self._queue(("delete", collection, doc_id, None, False))
+
+    def _queue(self, op: tuple) -> None:
+        self._ops.append(op)
+        if len(self._ops) >= self.batch_size:
+            self.flush()
+
+    # ── committing ──
+    def flush(self) -> None:
+        """Hand the pending ops to the commit pool (non-blocking unless saturated)."""
+        if not self._ops:
+            return
+        ops, self._ops = self._ops, []
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_in_flight,
+                                            thread_name_prefix="fs-batch")
+        # Bound in-flight commits: wait for the oldest before queueing more
+        self._futures = [f for f in self._futures if not f.done()]
+        while len(self._futures) >= self.max_in_flight:
+            self._futures.pop(0).result()
+        self._futures.append(self._pool.submit(self._commit, ops))
+
+    def close(self) -> List[Dict]:
+        """Flush everything, wait for all commits, and return per-op errors."""
+        self.flush()
+        for f in self._futures:
+            f.result()
+        self._futures = []
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+        return self.errors
+
+    def abort(self) -> None:
+        """Drop queued ops, cancel commits not yet started, wait for the rest."""
+        self._ops = []
+        for f in self._futures:
+            f.cancel()
+        self._futures = []
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    def _commit(self, ops: List[tuple]) -> None:
+        try:
+            self._commit_ops(ops)
+        finally:
+            # Invalidate after the writes settle, whether or not they landed
+            for _, collection, doc_id, _, _ in ops:
+                _cache.invalidate(collection, doc_id)
+
+    def _commit_ops(self, ops: List[tuple]) -> None:
+        db = _get_db()
+        batch = db.batch()
+        for op in ops:
+            _apply_op(db, batch, op)
+        try:
+            batch.commit()
+            with self._lock:
+                self.committed += len(ops)
+            return
+        except Exception:
+            pass
+
+        # Atomic batch failed — retry each op alone to report exactly which failed
+        for op in ops:
+            try:
+                single = db.batch()
+                _apply_op(db, single, op)
+                single.commit()
+                with self._lock:
+                    self.committed += 1
+            except Exception as e:
+                kind, collection, doc_id, _, _ = op
+                with self._lock:
+                    self.errors.append({
+                        "op":         kind,
+                        "collection": collection,
+                        "doc_id":     doc_id,
+                        "error":      str(e),
+                    })
+
+    def __enter__(self) -> "BatchWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        if exc_type is not None:
+            self.abort()   # the caller gave up — don't commit half of what it queued
+        else:
+            self.close()
+        return False
+
+
+def _apply_op(db, batch, op: tuple) -> None:
+    kind, collection, doc_id, data, merge = op
+    ref = db.collection(collection).document(doc_id)
+    if kind == "set":
+        batch.set(ref, data, merge=merge)
+    elif kind == "update":
+        batch.update(ref, data)
+    else:
+        batch.delete(ref)
+
+
+def batch_writer(batch_size: int = MAX_BATCH_SIZE, max_in_flight: int = MAX_IN_FLIGHT) -> BatchWriter:
+    return BatchWriter(batch_size=batch_size, max_in_flight=max_in_flight)
+
+
+def commit_atomic(ops: List[tuple]) -> List[str]:
+    """
+    Write (kind, collection, doc_id, data) ops in one batch: all land or none
+    do. kind is "set", "update" or "delete"; doc_id None on a set means an
+    auto-ID. Raises on failure — no per-op replay. Returns the doc ids.
+    """
+    db = _get_db()
+    batch = db.batch()
+    ids = []
+    for kind, collection, doc_id, data in ops:
+        doc_id = doc_id or db.collection(collection).document().id
+        _apply_op(db, batch, (kind, collection, doc_id, data, False))
+        ids.append(doc_id)
+    try:
+        batch.commit()
+    finally:
+        for (_, collection, _, _), doc_id in zip(ops, ids):
+            _cache.invalidate(collection, doc_id)
+    return ids
+
+
+def bulk_set(collection: str, docs: Dict[str, Dict], merge: bool = False) -> List[Dict]:
+    """Set many documents ({doc_id: data}). Returns per-op errors (empty on success)."""
+    with batch_writer() as w:
+        for doc_id, data in docs.items():
+            w.set(collection, doc_id, data, merge=merge)
+    return w.errors
+
+
+def bulk_update(collection: str, updates: Dict[str, Dict]) -> List[Dict]:
+    """Update many documents ({doc_id: fields}). Returns per-op errors."""
+    with batch_writer() as w:
+        for doc_id, data in updates.items():
+            w.update(collection, doc_id, data)
+    return w.errors
+
+
+def bulk_add(collection: str, docs: List[Dict]) -> tuple:
+    """Add many auto-ID documents. Returns (ids, errors)."""
+    with batch_writer() as w:
+        ids = [w.add(collection, data) for data in docs]
+    return ids, w.errors
\ No newline at end of file
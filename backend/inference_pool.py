@@ -0,0 +1,117 @@
+"""
+WASTE IQ – Inference Pool
+Runs classification off the event loop on a dedicated, bounded thread pool
+(Gemini calls are network I/O; YOLO itself is sent on to a process pool by
+waste_classifier). Admission is bounded: when the pool and its queue are
+full, requests are rejected immediately (503) instead of piling up, and a
+single user can't hold more than a few slots (429).
+
+    CLASSIFY_THREADS       concurrent classifications          (default 4)
+    CLASSIFY_MAX_QUEUE     waiting requests beyond that        (default 16)
+    CLASSIFY_MAX_PER_USER  in-flight requests per user         (default 2)
+"""
+
+import os
+import time
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict
+
+
+class PoolSaturated(Exception):
+    """Pool and queue are full — caller should shed load (HTTP 503)."""
+
+
+class UserBusy(Exception):
+    """This user already has the maximum in-flight requests (HTTP 429)."""
+
+
+class InferencePool:
+    def __init__(self, threads: int = None, max_queue: int = None, max_per_user: int = None):
+        self.threads      = threads or int(os.getenv("CLASSIFY_THREADS", "4"))
+        self.max_queue    = max_queue if max_queue is not None else int(os.getenv("CLASSIFY_MAX_QUEUE", "16"))
+        self.max_per_user = max_per_user or int(os.getenv("CLASSIFY_MAX_PER_USER", "2"))
+        self._executor = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="classify")
+        self._lock = threading.Lock()
+        self._admitted = 0                      # queued + running
+        self._running = 0
+        self._per_user: Dict[str, int] = {}
+        self._counters = {"completed": 0, "failed": 0, "rejected_saturated": 0, "rejected_user": 0}
+        self._wait_total = 0.0
+
+    @property
+    def capacity(self) -> int:
+        return self.threads + self.max_queue
+
+    def _admit(self, uid: str, slots: int) -> None:
+        with self._lock:
+            if self._per_user.get(uid, 0) + slots > max(self.max_per_user, slots):
+                self._counters["rejected_user"] += 1
+                raise UserBusy()
+            if self._admitted + slots > self.capacity:
+                self._counters["rejected_saturated"] += 1
+                raise PoolSaturated()
+            self._admitted += slots
+            self._per_user[uid] = self._per_user.get(uid, 0) + slots
+
+    def _release(self, uid: str, slots: int) -> None:
+        with self._lock:
+            self._admitted -= slots
+            left = self._per_user.get(uid, 0) - slots
+            if left > 0:
+                self._per_user[uid] = left
+            else:
+                self._per_user.pop(uid, None)
+
+    def _timed(self, fn, enqueued_at: float):
+        with self._lock:
+            self._running += 1
+            self._wait_total += time.monotonic() - enqueued_at
+        try:
+            return fn()
+        finally:
+            with self._lock:
+                self._running -= 1
+
+    def submit(self, uid: str, fn, *args, slots: int = 1, **kwargs) -> "asyncio.Future":
+        """
+        Admit (or reject, raising right away) and start `fn` on the pool;
+        returns an awaitable. `slots` lets a batch reserve several workers.
+        """
+        self._admit(uid, slots)
+        return asyncio.ensure_future(self._execute(uid, slots, functools.partial(fn, *args, **kwargs)))
+
+    async def run(self, uid: str, fn, *args, slots: int = 1, **kwargs):
+        return await self.submit(uid, fn, *args, slots=slots, **kwargs)
+
+    async def _execute(self, uid: str, slots: int, call):
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(
+                self._executor, functools.partial(self._timed, call, time.monotonic()))
+            with self._lock:
+                self._counters["completed"] += 1
+            return result
+        except Exception:
+            with self._lock:
+                self._counters["failed"] += 1
+            raise
+        finally:
+            self._release(uid, slots)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            started = self._counters["completed"] + self._counters["failed"] + self._running
+            return {
+                "threads":       self.threads,
+                "max_queue":     self.max_queue,
+                "running":       self._running,
+                "queue_depth":   max(self._admitted - self._running, 0),
+                "avg_wait_ms":   round(self._wait_total / started * 1000, 1) if started else 0.0,
+                **self._counters,
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
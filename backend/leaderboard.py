@@ -0,0 +1,113 @@
+"""
+WASTE IQ – Leaderboard Snapshot
+Materialized top-N leaderboard with user names denormalized, stored as a
+single Firestore document so GET /gamification/leaderboard is one read.
+The snapshot also carries the user count, so the page total needs no
+COUNT aggregation per request.
+The snapshot is rebuilt (debounced) whenever points, names or roles change.
+"""
+
+import os
+import threading
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import firestore_client as fc
+
+SNAPSHOT_COLLECTION = "leaderboards"
+SNAPSHOT_ID         = "global"
+SNAPSHOT_SIZE       = 100
+REFRESH_DEBOUNCE_S  = float(os.getenv("LEADERBOARD_REFRESH_DEBOUNCE", "5"))
+
+_timer: Optional[threading.Timer] = None
+_timer_lock = threading.Lock()
+
+
+def _entries(gamification_docs: List[Dict], first_rank: int = 1) -> List[Dict]:
+    """Join gamification docs with user profiles (one batched fetch)."""
+    profiles = fc.get_docs("users", [e.get("uid", "") for e in gamification_docs])
+    result = []
+    for i, e in enumerate(gamification_docs):
+        profile = profiles.get(e.get("uid", ""), {})
+        result.append({
+            "rank":         first_rank + i,
+            "uid":          e.get("uid"),
+            "name":         profile.get("name", "Anonymous"),
+            "role":         profile.get("role", "household"),
+            "total_points": e.get("total_points", 0),
+            "level":        e.get("level", "Beginner"),
+            "badges_count": len(e.get("badges", [])),
+        })
+    return result
+
+
+def build_entries(limit: int) -> List[Dict]:
+    """Top-`limit` users by points: one query + one batched profile fetch."""
+    entries = fc.query_collection("gamification", order_by="total_points",
+                                  order_desc=True, limit=limit)
+    return _entries(entries)
+
+
+def get_page(limit: int, cursor: Optional[str] = None) -> tuple:
+    """
+    One leaderboard page → (entries, next_cursor, page, total). The first
+    page comes from the snapshot when it covers `limit`; later pages query
+    live. total is the snapshot's user count.
+    Raises ValueError on a malformed cursor.
+    """
+    snapshot = get_snapshot()
+    total = snapshot.get("total") if snapshot else None
+    if total is None:
+        total = fc.count_documents("gamification")   # no snapshot yet (or a pre-total one)
+    if not cursor and limit <= SNAPSHOT_SIZE:
+        if snapshot:
+            all_entries = snapshot.get("entries", [])
+            entries = all_entries[:limit]
+            more = len(all_entries) > limit or len(all_entries) >= SNAPSHOT_SIZE
+            next_cursor = None
+            if more and entries:
+                last = entries[-1]
+                next_cursor = fc.encode_cursor(last["total_points"], last["uid"], 1)
+            return entries, next_cursor, 1, total
+        schedule_refresh()  # materialize for the next request
+
+    docs, next_cursor, page = fc.query_page("gamification", order_by="total_points",
+                                            order_desc=True, limit=limit, cursor=cursor)
+    return _entries(docs, first_rank=(page - 1) * limit + 1), next_cursor, page, total
+
+
+def refresh_snapshot() -> Dict:
+    """Rebuild and persist the materialized leaderboard."""
+    snapshot = {
+        "entries":    build_entries(SNAPSHOT_SIZE),
+        "size":       SNAPSHOT_SIZE,
+        "total":      fc.count_documents("gamification"),
+        "updated_at": datetime.now(timezone.utc).isoformat(),
+    }
+    fc.set_doc(SNAPSHOT_COLLECTION, SNAPSHOT_ID, snapshot)
+    return snapshot
+
+
+def get_snapshot() -> Optional[Dict]:
+    return fc.get_doc(SNAPSHOT_COLLECTION, SNAPSHOT_ID)
+
+
+def _run_refresh() -> None:
+    global _timer
+    with _timer_lock:
+        _timer = None
+    try:
+        refresh_snapshot()
+    except Exception as e:
+        print(f"⚠️  Leaderboard refresh failed: {e}")
+
+
+def schedule_refresh() -> None:
+    """Request a snapshot rebuild; bursts of point changes coalesce into one."""
+    global _timer
+    with _timer_lock:
+        if _timer is not None:
+            return
+        _timer = threading.Timer(REFRESH_DEBOUNCE_S, _run_refresh)
+        _timer.daemon = True
+        _timer.start()
@@ -5,9 +5,11 @@ Handles all REST API routes with Firebase Authentication.
 
 from fastapi import FastAPI, Depends, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 import uvicorn
 import os
+import time
+import asyncio
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -17,8 +19,16 @@ load_dotenv(Path(__file__).parent.parent / ".env")
 # Import routers
 from routers import auth_router, bins_router, classify_router, complaints_router
 from routers import gamification_router, overflow_router, reports_router, routing_router
-from waste_classifier import WasteClassifier
+from waste_classifier import WasteClassifier, shutdown_yolo_pool
+from inference_pool import InferencePool
 from overflow_model import OverflowModel
+import firestore_async
+import firestore_client
+import report_jobs
+import warmup
+import metrics
+import fill_series
+import overflow_scheduler
 
 app = FastAPI(
     title="WASTE IQ API",
@@ -41,24 +51,41 @@ app.add_middleware(
 @app.on_event("startup")
 async def startup_event():
     print("🚀 WASTE IQ Backend starting up...")
+    app.state.inference_pool = InferencePool()
+    print(f"✅ Inference pool ready ({app.state.inference_pool.threads} threads)")
     try:
+        t0 = time.perf_counter()
         app.state.classifier = WasteClassifier()
+        warmup.record_init("classifier", (time.perf_counter() - t0) * 1000)
         print("✅ WasteClassifier loaded")
     except Exception as e:
         print(f"⚠️  WasteClassifier unavailable (TensorFlow not installed): {e}")
         app.state.classifier = None
     try:
+        t0 = time.perf_counter()
         app.state.overflow_model = OverflowModel()
+        warmup.record_init("overflow", (time.perf_counter() - t0) * 1000)
         print("✅ OverflowModel loaded")
     except Exception as e:
         print(f"⚠️  OverflowModel unavailable: {e}")
         app.state.overflow_model = None
+    app.state.overflow_scheduler = overflow_scheduler.start(app.state.overflow_model)
+    # Warm models in the background: /health is live now, /ready turns green when done.
+    # Own thread, not the Firestore executor — warmup can block for minutes.
+    app.state.warmup_task = asyncio.ensure_future(asyncio.to_thread(warmup.run, app))
     print("🟢 Backend ready — http://localhost:8000/docs")
 
 # ── Shutdown ──────────────────────────────────────────────────────────────────
 @app.on_event("shutdown")
 async def shutdown_event():
     print("🛑 WASTE IQ Backend shutting down...")
+    firestore_async.shutdown()
+    report_jobs.jobs.shutdown()
+    app.state.inference_pool.shutdown()
+    shutdown_yolo_pool()
+    fill_series.shutdown()
+    if app.state.overflow_scheduler:
+        app.state.overflow_scheduler.stop()
 
 # ── Health Check ──────────────────────────────────────────────────────────────
 @app.get("/health", tags=["system"])
@@ -66,9 +93,47 @@ async def health_check():
     return {
         "status": "healthy",
         "service": "WASTE IQ API",
-        "version": "1.0.0"
+        "version": "1.0.0",
+        "cache":   firestore_client.cache_stats(),
+        "inference": app.state.inference_pool.stats(),
+        "classify_cache": app.state.classifier.cache_stats() if app.state.classifier else None,
+        "gemini": app.state.classifier.gemini_stats() if app.state.classifier else None,
+        "overflow_model": app.state.overflow_model.version if app.state.overflow_model else None,
+        "fill_series": fill_series.stats(),
+        "overflow_scheduler": app.state.overflow_scheduler.stats() if app.state.overflow_scheduler else None,
     }
 
+@app.get("/ready", tags=["system"])
+async def readiness_check():
+    """Readiness: 200 only once every model is loaded and warm (503 until then, or if a stage failed)."""
+    state = warmup.status()
+    return JSONResponse(status_code=200 if state["ready"] else 503, content=state)
+
+@app.get("/metrics", tags=["system"], response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Prometheus scrape endpoint: pipeline stage histograms + live pool/cache/breaker gauges."""
+    pool = app.state.inference_pool.stats()
+    gauges = {
+        "wasteiq_inference_running":        (pool["running"], "Inference jobs running now."),
+        "wasteiq_inference_queue_depth":    (pool["queue_depth"], "Inference jobs admitted but waiting for a thread."),
+        "wasteiq_firestore_cache_entries":  (firestore_client.cache_stats()["entries"], "Entries in the Firestore read cache."),
+    }
+    counters = {
+        "wasteiq_inference_rejected_total": (pool["rejected_saturated"] + pool["rejected_user"],
+                                             "Inference requests rejected (pool saturated or per-user limit)."),
+    }
+    if app.state.classifier:
+        cache = app.state.classifier.cache_stats()
+        gemini = app.state.classifier.gemini_stats()
+        gauges.update({
+            "wasteiq_classify_cache_hit_ratio": (cache["hit_rate"], "Classification result cache hit ratio."),
+            "wasteiq_gemini_breaker_open":      (int(gemini["breaker"]["state"] != "closed"), "1 while the Gemini circuit breaker is open."),
+            "wasteiq_gemini_tokens_available":  (gemini["limiter"]["tokens"], "Gemini rate-limiter tokens available."),
+        })
+        counters["wasteiq_gemini_shed_total"] = (sum(gemini["shed"].values()),
+                                                 "Gemini calls shed by the breaker or rate limiter.")
+    return PlainTextResponse(metrics.render(gauges, counters), media_type="text/plain; version=0.0.4")
+
 # ── Register Routers ──────────────────────────────────────────────────────────
 app.include_router(auth_router.router,         prefix="/auth",         tags=["auth"])
 app.include_router(bins_router.router,         prefix="/bins",         tags=["bins"])
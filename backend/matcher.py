@@ -0,0 +1,113 @@
+"""
+WASTE IQ – Precompiled Keyword Matcher
+Compiles an ordered {keyword: value} map (WASTE_MAP, the ImageNet table)
+once, instead of scanning it linearly on every lookup:
+
+    exact        dict lookup
+    contained_in keywords occurring inside the text — Aho-Corasick automaton,
+                 one pass over the text regardless of how many keywords
+    containing   keywords that contain the text — one str.find over all
+                 keywords joined with a separator
+    fuzzy        rapidfuzz extractOne over a prebuilt choice list
+
+Every method returns the *first* matching keyword in map order, exactly
+like the `for keyword in MAP` loops it replaces, so results are unchanged.
+`lookup()` chains them the way _map_to_category does and is memoized per
+normalized label.
+"""
+
+from bisect import bisect_right
+from collections import deque
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+_SEP = "\x00"   # never appears in labels, so a find() can't straddle two keywords
+
+
+class KeywordMatcher:
+    def __init__(self, mapping: Dict[str, Any], fuzzy_cutoff: float = 75, cache_size: int = 4096):
+        self.keywords: List[str] = list(mapping)
+        self.values: List[Any] = [mapping[k] for k in self.keywords]
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self._exact = {k: i for i, k in enumerate(self.keywords)}
+        self._joined = _SEP.join(self.keywords)
+        self._starts, pos = [], 0
+        for k in self.keywords:
+            self._starts.append(pos)
+            pos += len(k) + 1
+        self._build_automaton()
+        self.lookup = lru_cache(maxsize=cache_size)(self._lookup)
+
+    # ── Aho-Corasick ──────────────────────────────────────────
+
+    def _build_automaton(self) -> None:
+        goto: List[Dict[str, int]] = [{}]
+        first: List[float] = [float("inf")]     # lowest keyword index ending at each state
+        for i, kw in enumerate(self.keywords):
+            state = 0
+            for ch in kw:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    first.append(float("inf"))
+                state = nxt
+            first[state] = min(first[state], i)
+
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0) if goto[f].get(ch, 0) != nxt else 0
+                # a state also "ends" every keyword its failure state ends
+                first[nxt] = min(first[nxt], first[fail[nxt]])
+        self._goto, self._fail, self._first = goto, fail, first
+
+    def contained_in(self, text: str) -> Optional[int]:
+        """Index of the first keyword (map order) that occurs in `text`."""
+        goto, fail, first = self._goto, self._fail, self._first
+        best, state = float("inf"), 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if first[state] < best:
+                best = first[state]
+        return None if best == float("inf") else int(best)
+
+    # ── Other strategies ─────────────────────────────────────
+
+    def exact(self, text: str) -> Optional[int]:
+        return self._exact.get(text)
+
+    def containing(self, text: str) -> Optional[int]:
+        """Index of the first keyword (map order) that contains `text`."""
+        if _SEP in text:
+            return None
+        pos = self._joined.find(text)
+        return None if pos < 0 else bisect_right(self._starts, pos) - 1
+
+    def related(self, text: str) -> Optional[int]:
+        """First keyword that occurs in `text` or contains it."""
+        hits = [i for i in (self.contained_in(text), self.containing(text)) if i is not None]
+        return min(hits) if hits else None
+
+    def fuzzy(self, text: str) -> Optional[int]:
+        from rapidfuzz import process, fuzz
+        match = process.extractOne(text, self.keywords, scorer=fuzz.WRatio,
+                                   score_cutoff=self.fuzzy_cutoff)
+        return match[2] if match else None
+
+    def _lookup(self, text: str) -> Optional[Any]:
+        """exact → fuzzy → keyword in text → text in keyword; None when nothing matches."""
+        for strategy in (self.exact, self.fuzzy, self.contained_in, self.containing):
+            i = strategy(text)
+            if i is not None:
+                return self.values[i]
+        return None
@@ -0,0 +1,136 @@
+"""
+WASTE IQ – Metrics
+In-process latency histograms and timing spans, exported in Prometheus
+text format at GET /metrics.
+
+    with metrics.span("gemini_detect"):
+        ...
+
+Every span is observed into wasteiq_classify_stage_seconds{stage=...}.
+Inside a `metrics.collect()` block the spans are also recorded per request,
+which is how /classify returns a `timings` block when the client sends
+`X-Debug-Timings: 1`. Collection is per thread of execution (contextvars),
+so run collect() inside the worker that does the work.
+"""
+
+import time
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Seconds, spanning a 1 ms matcher lookup to a 30 s Gemini timeout
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name, self.help, self.label_names, self.buckets = name, help_text, label_names, buckets
+        self._series: Dict[Tuple[str, ...], List] = {}     # labels → [bucket counts, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(str(labels.get(n, "")) for n in self.label_names)
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            if i < len(self.buckets):
+                series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                base = ",".join(f'{n}="{v}"' for n, v in zip(self.label_names, key))
+                sep = "," if base else ""
+                cumulative = 0
+                for bound, c in zip(self.buckets, counts):
+                    cumulative += c
+                    lines.append(f'{self.name}_bucket{{{base}{sep}le="{bound}"}} {cumulative}')
+                lines.append(f'{self.name}_bucket{{{base}{sep}le="+Inf"}} {count}')
+                label_block = f"{{{base}}}" if base else ""
+                lines.append(f"{self.name}_sum{label_block} {total:.6f}")
+                lines.append(f"{self.name}_count{label_block} {count}")
+        return lines
+
+
+_registry: Dict[str, Histogram] = {}
+_registry_lock = threading.Lock()
+
+
+def histogram(name: str, help_text: str, label_names: Tuple[str, ...] = ()) -> Histogram:
+    with _registry_lock:
+        if name not in _registry:
+            _registry[name] = Histogram(name, help_text, label_names)
+        return _registry[name]
+
+
+STAGE_SECONDS = histogram(
+    "wasteiq_classify_stage_seconds",
+    "Time spent in each classification pipeline stage.",
+    ("stage",),
+)
+
+
+# ── Spans ────────────────────────────────────────────────────
+
+_timings: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("timings", default=None)
+
+
+@contextmanager
+def span(stage: str, hist: Histogram = STAGE_SECONDS) -> Iterator[None]:
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - t0
+        hist.observe(elapsed, stage=stage)
+        record = _timings.get()
+        if record is not None:
+            record.append((stage, elapsed))
+
+
+@contextmanager
+def collect() -> Iterator[List[Tuple[str, float]]]:
+    """Record every span in this block; yields the (stage, seconds) list."""
+    record: List[Tuple[str, float]] = []
+    token = _timings.set(record)
+    try:
+        yield record
+    finally:
+        _timings.reset(token)
+
+
+def timings_ms(record: List[Tuple[str, float]]) -> Dict[str, float]:
+    """(stage, seconds) spans → {stage: ms}; repeated stages are summed."""
+    out: Dict[str, float] = {}
+    for stage, seconds in record:
+        out[stage] = round(out.get(stage, 0.0) + seconds * 1000, 1)
+    return out
+
+
+# ── Exposition ───────────────────────────────────────────────
+
+def render(gauges: Optional[Dict[str, Tuple[float, str]]] = None,
+           counters: Optional[Dict[str, Tuple[float, str]]] = None) -> str:
+    """Prometheus text format: every histogram, plus point-in-time gauges and
+    process-lifetime counters, each given as name → (value, help)."""
+    lines: List[str] = []
+    with _registry_lock:
+        hists = list(_registry.values())
+    for h in hists:
+        lines.extend(h.render())
+    for kind, series in (("gauge", gauges), ("counter", counters)):
+        for name, (value, help_text) in (series or {}).items():
+            if value is None:
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name} {float(value)}")
+    return "\n".join(lines) + "\n"
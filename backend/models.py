@@ -116,6 +116,14 @@ class BinCollectedUpdate(BaseModel):
     driver_uid: str
     notes:      Optional[str] = None
 
+class FillReading(BaseModel):
+    bin_id:      str
+    fill_level:  float = Field(ge=0, le=100)  # percentage
+    recorded_at: Optional[str] = None         # ISO timestamp; server time if omitted
+
+class FillReadingBatch(BaseModel):
+    readings: List[FillReading]
+
 
 # ═══════════════════════════════════════════════════════════════════════════════
 #  CLASSIFICATION MODELS
@@ -235,7 +243,8 @@ class APIResponse(BaseModel):
     data:    Optional[Any] = None
 
 class PaginatedResponse(BaseModel):
-    items:   List[Any]
-    total:   int
-    page:    int
-    per_page: int
+    items:       List[Any]
+    total:       Optional[int] = None   # None when not counted
+    page:        int = 1
+    per_page:    int
+    next_cursor: Optional[str] = None   # pass back as ?cursor= for the next page
@@ -0,0 +1,182 @@
+"""
+WASTE IQ – Compact Overflow Forest
+Serving format for the overflow RandomForest: every tree flattened into one
+NumPy node array, loaded with np.load(mmap_mode="r") and evaluated in pure
+NumPy — no sklearn import, no unpickling, no training at serve time. The
+file is memory-mapped, so every uvicorn worker shares the same pages.
+
+The StandardScaler is folded into the split thresholds
+(x' <= t  ⇔  x <= t·scale + mean), so raw features go straight in.
+
+    overflow_model.forest.npy    node array (feature, threshold, left, right, value)
+    overflow_model.forest.json   roots, depth, feature names, provenance
+
+Leaves point at themselves (threshold = +inf), so every sample walks
+exactly max_depth steps and all trees advance together in one gather.
+
+    python overflow_forest.py export [--pkl overflow_model.pkl]
+"""
+
+import os
+import json
+import time
+import argparse
+from pathlib import Path
+from datetime import datetime, timezone
+from typing import Dict, List
+
+import numpy as np
+
+BASE_DIR    = Path(__file__).parent
+FOREST_PATH = Path(os.getenv("OVERFLOW_FOREST_PATH", BASE_DIR / "overflow_model.forest.npy"))
+FEATURES    = ["fill_level", "hours_since_last", "population_density", "avg_daily_waste_kg"]
+
+NODE_DTYPE = np.dtype([
+    ("feature",   "<i4"),
+    ("threshold", "<f8"),
+    ("left",      "<i4"),
+    ("right",     "<i4"),
+    ("value",     "<f8"),   # P(overflow) at leaves
+])
+
+
+def _meta_path(path: Path) -> Path:
+    return Path(path).with_suffix(".json")
+
+
+# ── Inference ────────────────────────────────────────────────
+
+class CompactForest:
+    def __init__(self, path: Path = FOREST_PATH):
+        path = Path(path)
+        if not path.exists():
+            raise FileNotFoundError(f"{path} not found — run `python overflow_training.py train --promote` first")
+        # export() replaces the .npy before the .json: a node count that doesn't
+        # match the sidecar means we caught the gap between them — read again
+        for attempt in range(3):
+            nodes = np.load(path, mmap_mode="r")
+            self.meta: Dict = json.loads(_meta_path(path).read_text())
+            if self.meta.get("n_nodes", len(nodes)) == len(nodes):
+                break
+            time.sleep(0.05 * (attempt + 1))
+        else:
+            raise ValueError(f"{path}: {len(nodes)} nodes but sidecar says {self.meta['n_nodes']}")
+        self.feature, self.threshold = nodes["feature"], nodes["threshold"]
+        self.left, self.right, self.value = nodes["left"], nodes["right"], nodes["value"]
+        self.roots = np.asarray(self.meta["roots"], dtype=np.int32)
+        self.max_depth = int(self.meta["max_depth"])
+        self.n_features = int(self.meta["n_features"])
+        self.path = path
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """(n, n_features) raw features → (n, 2) [P(safe), P(overflow)], like sklearn."""
+        X = np.asarray(X, dtype=np.float64).reshape(-1, self.n_features)
+        rows = np.arange(len(X))[:, None]
+        node = np.broadcast_to(self.roots, (len(X), len(self.roots))).copy()
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[node]] <= self.threshold[node]
+            node = np.where(go_left, self.left[node], self.right[node])
+        p = self.value[node].mean(axis=1)
+        return np.column_stack([1.0 - p, p])
+
+    def stats(self) -> Dict:
+        return {
+            "path":      str(self.path),
+            "trees":     len(self.roots),
+            "nodes":     len(self.feature),
+            "max_depth": self.max_depth,
+            "bytes":     self.path.stat().st_size,
+        }
+
+
+# ── Export (offline; needs sklearn) ──────────────────────────
+
+def _flatten(pipeline) -> tuple:
+    """sklearn Pipeline(scaler, rf) or bare forest → (node array, roots, max_depth)."""
+    steps = getattr(pipeline, "named_steps", None)
+    if steps:
+        rf = list(steps.values())[-1]
+        scaler = steps.get("scaler")
+    else:
+        rf, scaler = pipeline, None
+    n_features = rf.n_features_in_
+    mean  = getattr(scaler, "mean_", None)
+    scale = getattr(scaler, "scale_", None)
+    mean  = np.zeros(n_features) if mean is None else np.asarray(mean, dtype=np.float64)
+    scale = np.ones(n_features) if scale is None else np.asarray(scale, dtype=np.float64)
+    positive = list(rf.classes_).index(1) if 1 in rf.classes_ else None
+
+    parts: List[np.ndarray] = []
+    roots: List[int] = []
+    offset, max_depth = 0, 0
+    for est in rf.estimators_:
+        t = est.tree_
+        n = t.node_count
+        nodes = np.empty(n, dtype=NODE_DTYPE)
+        leaf = t.children_left == -1
+        idx = np.arange(n, dtype=np.int32) + offset
+        feat = np.where(leaf, 0, t.feature).astype(np.int32)
+        nodes["feature"] = feat
+        nodes["threshold"] = np.where(leaf, np.inf, t.threshold * scale[feat] + mean[feat])
+        nodes["left"] = np.where(leaf, idx, t.children_left + offset)
+        nodes["right"] = np.where(leaf, idx, t.children_right + offset)
+        counts = t.value[:, 0, :]
+        totals = counts.sum(axis=1)
+        p = counts[:, positive] / np.where(totals > 0, totals, 1) if positive is not None else 0.0
+        nodes["value"] = np.where(leaf, p, 0.0)
+        parts.append(nodes)
+        roots.append(offset)
+        offset += n
+        max_depth = max(max_depth, t.max_depth)
+    return np.concatenate(parts), roots, max_depth, n_features
+
+
+def export(pipeline, path: Path = FOREST_PATH, extra_meta: Dict = None) -> Path:
+    """
+    Flatten a fitted pipeline into `path` (+ .json). Each file is replaced
+    atomically, nodes first; CompactForest checks n_nodes to catch the gap.
+    """
+    path = Path(path)
+    nodes, roots, max_depth, n_features = _flatten(pipeline)
+    meta = {
+        "format":     "wasteiq-forest-v1",
+        "features":   FEATURES[:n_features],
+        "n_features": n_features,
+        "roots":      roots,
+        "max_depth":  max_depth,
+        "n_nodes":    len(nodes),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        **(extra_meta or {}),
+    }
+    tmp = path.with_name(path.stem + ".tmp.npy")
+    meta_tmp = _meta_path(path).with_suffix(".json.tmp")
+    np.save(tmp, nodes)
+    meta_tmp.write_text(json.dumps(meta, indent=2))
+    os.replace(tmp, path)
+    os.replace(meta_tmp, _meta_path(path))
+    return path
+
+
+def parity(pipeline, forest: CompactForest, X: np.ndarray) -> float:
+    """Max |ΔP(overflow)| between sklearn and the compact forest on X."""
+    expected = pipeline.predict_proba(X)[:, list(pipeline.classes_).index(1)]
+    return float(np.abs(forest.predict_proba(X)[:, 1] - expected).max())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Overflow forest export")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("export", help="convert a pickled sklearn pipeline")
+    p.add_argument("--pkl", default=str(BASE_DIR / "overflow_model.pkl"))
+    p.add_argument("--out", default=str(FOREST_PATH))
+    args = parser.parse_args()
+
+    import pickle
+    from overflow_model import _generate_training_data
+
+    with open(args.pkl, "rb") as f:
+        pipeline = pickle.load(f)
+    out = export(pipeline, args.out, {"source": Path(args.pkl).name})
+    X, _, _ = _generate_training_data(n_samples=2000)
+    print(f"✅ Exported {out} ({out.stat().st_size / 1e6:.1f} MB) — "
+          f"max |Δp| vs sklearn {parity(pipeline, CompactForest(out), X):.2e}")
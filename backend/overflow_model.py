@@ -1,15 +1,26 @@
 """
 WASTE IQ – Overflow Prediction Model
 RandomForest-based bin overflow probability predictor.
-Trains on synthetic historical data if model file doesn't exist.
+Serves a memory-mapped compact forest (overflow_forest.py) from the model
+registry; training is offline only (overflow_training.py). A newly
+promoted version is picked up without a restart.
 """
 
 import os
+import time
 import pickle
+import threading
 import numpy as np
 from datetime import datetime, timezone
 
+import overflow_training
+from overflow_forest import CompactForest, FOREST_PATH, export
+
 MODEL_PATH = os.path.join(os.path.dirname(__file__), "overflow_model.pkl")
+RELOAD_CHECK_S = float(os.getenv("OVERFLOW_RELOAD_CHECK_S", "30"))
+LATEST_RISK_COLLECTION = "bins_latest_risk"   # materialized: latest persisted prediction per bin
+PROB_DELTA = float(os.getenv("OVERFLOW_PROB_DELTA", "0.05"))
+OPERATOR_STATUSES = {"offline"}   # never overwritten by risk scoring
 
 # ── Synthetic Training Data Generator ────────────────────────────────────────
 def _generate_training_data(n_samples: int = 5000):
@@ -45,76 +56,107 @@ def _generate_training_data(n_samples: int = 5000):
 # ── Model Class ───────────────────────────────────────────────────────────────
 class OverflowModel:
     def __init__(self):
-        if os.path.exists(MODEL_PATH):
-            print("⏳ Loading overflow model from disk...")
-            with open(MODEL_PATH, "rb") as f:
-                self.model = pickle.load(f)
-            print("✅ Overflow model loaded")
-        else:
-            print("⏳ Training overflow prediction model (first run)...")
-            self._train_and_save()
-            print("✅ Overflow model trained and saved")
-
-    def _train_and_save(self):
-        from sklearn.ensemble import RandomForestClassifier
-        from sklearn.model_selection import train_test_split
-        from sklearn.preprocessing import StandardScaler
-        from sklearn.pipeline import Pipeline
-
-        X, y, _ = _generate_training_data(n_samples=8000)
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-
-        pipeline = Pipeline([
-            ("scaler", StandardScaler()),
-            ("rf", RandomForestClassifier(
-                n_estimators=200,
-                max_depth=12,
-                min_samples_split=5,
-                min_samples_leaf=2,
-                class_weight="balanced",
-                random_state=42,
-                n_jobs=-1,
-            ))
-        ])
-
-        pipeline.fit(X_train, y_train)
-        accuracy = pipeline.score(X_test, y_test)
-        print(f"   Model accuracy: {accuracy:.3f}")
-
-        self.model = pipeline
-        with open(MODEL_PATH, "wb") as f:
-            pickle.dump(pipeline, f)
+        self._lock = threading.Lock()
+        self._checked_at = time.monotonic()
+        self.model, self.version = _load_artifact()
+        self._pointer_mtime = overflow_training.pointer_mtime()
+        print(f"✅ Overflow model {self.version} loaded ({len(self.model.roots)} trees, "
+              f"{len(self.model.feature)} nodes, memory-mapped)")
+
+    def maybe_reload(self) -> None:
+        """Cheap check, at most every RELOAD_CHECK_S: has the registry's LATEST moved?"""
+        now = time.monotonic()
+        if now - self._checked_at < RELOAD_CHECK_S:
+            return
+        self._checked_at = now
+        if overflow_training.pointer_mtime() != self._pointer_mtime:
+            self.reload()
+
+    def reload(self) -> dict:
+        """Hot-swap to the registry's LATEST version. A bad artifact keeps the current model."""
+        with self._lock:
+            self._pointer_mtime = overflow_training.pointer_mtime()
+            version = overflow_training.latest_version()
+            if version and version != self.version:
+                try:
+                    forest = overflow_training.artifact_path(version)
+                    self.model, self.version = CompactForest(forest), version
+                    print(f"🔁 Overflow model hot-swapped → {version}")
+                except Exception as e:
+                    print(f"⚠️  Overflow model {version} failed to load, keeping {self.version}: {e}")
+        return self.info()
+
+    def info(self) -> dict:
+        model = self.model
+        return {
+            "version": self.version,
+            "forest":  model.stats(),
+            "metrics": model.meta.get("metrics"),
+            "params":  model.meta.get("params"),
+            "source":  model.meta.get("source"),
+            "created_at": model.meta.get("created_at"),
+        }
 
     def predict(self, fill_level: float, hours_since_last: float,
-                population_density: float, avg_daily_waste_kg: float = 2.5) -> dict:
+                population_density: float, avg_daily_waste_kg: float = 2.5,
+                fill_rate: float = None) -> dict:
         """
         Predict overflow probability for a single bin.
         Returns: overflow_probability (0-1), risk_level, hours_to_overflow
+        fill_rate (% per hour, from the bin's fill series) replaces the
+        avg_daily_waste_kg heuristic for hours_to_overflow when known.
         """
         X = np.array([[fill_level, hours_since_last, population_density, avg_daily_waste_kg]])
-        prob = float(self.model.predict_proba(X)[0][1])
+        rates = None if fill_rate is None else [fill_rate]
+        return self.predict_many(X, rates)[0]
+
+    def predict_many(self, X: np.ndarray, fill_rates=None) -> list:
+        """
+        Vectorized predict over an (n, 4) feature matrix: one predict_proba
+        call for every row, risk levels and hours-to-overflow in NumPy.
+        fill_rates: measured % per hour per row, NaN where unknown.
+        """
+        X = np.asarray(X, dtype=float).reshape(-1, 4)
+        if len(X) == 0:
+            return []
+        self.maybe_reload()
+        prob = self.model.predict_proba(X)[:, 1]
 
         # Risk levels
-        if prob < 0.35:
-            risk_level = "Low"
-        elif prob < 0.65:
-            risk_level = "Medium"
-        else:
-            risk_level = "High"
-
-        # Estimate hours to overflow
-        fill_rate_per_hour = avg_daily_waste_kg / 24  # kg/hour
-        remaining_capacity_pct = max(0, 100 - fill_level)
-        if fill_rate_per_hour > 0 and remaining_capacity_pct > 0:
-            hours_to_overflow = remaining_capacity_pct / (fill_rate_per_hour * 5)  # normalize
-        else:
-            hours_to_overflow = None
+        risk = np.where(prob < 0.35, "Low", np.where(prob < 0.65, "Medium", "High"))
 
-        return {
-            "overflow_probability": round(prob, 4),
-            "risk_level":          risk_level,
-            "hours_to_overflow":   round(hours_to_overflow, 1) if hours_to_overflow else None,
-        }
+        # Estimate hours to overflow: measured fill rate if the series has one, else heuristic
+        rates = np.full(len(X), np.nan) if fill_rates is None else np.asarray(fill_rates, dtype=float)
+        measured = np.isfinite(rates)
+        fill_rate_per_hour = X[:, 3] / 24  # kg/hour
+        remaining_capacity_pct = np.maximum(0, 100 - X[:, 0])
+        valid = np.where(measured, rates > 0, fill_rate_per_hour > 0) & (remaining_capacity_pct > 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            hours = np.where(measured, remaining_capacity_pct / rates,
+                             remaining_capacity_pct / (fill_rate_per_hour * 5))  # normalize
+        hours = np.where(valid, hours, 0.0)
+
+        prob, hours = np.round(prob, 4).tolist(), np.round(hours, 1).tolist()
+        rates = [round(r, 2) if m else None for r, m in zip(rates.tolist(), measured.tolist())]
+        return [
+            {
+                "overflow_probability": p,
+                "risk_level":          str(r),
+                "hours_to_overflow":   h if ok and h else None,
+                "fill_rate_pct_per_hour": rate,
+            }
+            for p, r, h, ok, rate in zip(prob, risk, hours, valid.tolist(), rates)
+        ]
+
+    def score_bins(self, bins: list, now: datetime = None) -> list:
+        """
+        Score bin dicts (from Firestore) in one vectorized pass.
+        Returns [(bin_id, result, features)] with features as in _prediction_doc.
+        """
+        now = now or datetime.now(timezone.utc)
+        ids, X = bin_features(bins, now)
+        results = self.predict_many(X, _series_fill_rates(ids, now))
+        return [(bid, result, X[i].tolist()) for i, (bid, result) in enumerate(zip(ids, results))]
 
     def predict_and_save(
         self,
@@ -126,69 +168,179 @@ class OverflowModel:
         firestore_client,
     ) -> dict:
         """Predict and persist to Firestore overflow_predictions collection."""
-        result = self.predict(fill_level, hours_since_last, population_density, avg_daily_waste_kg)
-
-        doc = {
-            "bin_id":               bin_id,
-            "overflow_probability": result["overflow_probability"],
-            "risk_level":           result["risk_level"],
-            "hours_to_overflow":    result["hours_to_overflow"],
-            "input_features": {
-                "fill_level":         fill_level,
-                "hours_since_last":   hours_since_last,
-                "population_density": population_density,
-                "avg_daily_waste_kg": avg_daily_waste_kg,
-            },
-            "predicted_at": datetime.now(timezone.utc).isoformat(),
-        }
+        rates = _series_fill_rates([bin_id], datetime.now(timezone.utc))
+        result = self.predict(fill_level, hours_since_last, population_density, avg_daily_waste_kg,
+                              fill_rate=None if rates is None else rates[0])
+        doc = _prediction_doc(bin_id, result, fill_level, hours_since_last,
+                              population_density, avg_daily_waste_kg)
 
         pred_id = firestore_client.add_doc("overflow_predictions", doc)
         doc["prediction_id"] = pred_id
 
-        # Update the bin's risk status in Firestore
-        status_update = {}
-        if result["risk_level"] == "High":
-            status_update["status"] = "overflow"
-        elif result["risk_level"] == "Medium":
-            status_update["status"] = "active"
-        if status_update:
-            try:
+        # Keep the bins_latest_risk view and the bin's risk status in step
+        try:
+            previous = firestore_client.get_doc("bins", bin_id) or {}
+            firestore_client.set_doc(LATEST_RISK_COLLECTION, bin_id,
+                                     {**doc, "ward_id": previous.get("ward_id")})
+            status_update = _status_update(result["risk_level"], previous.get("status"))
+            if status_update:
                 firestore_client.update_doc("bins", bin_id, status_update)
-            except Exception:
-                pass
+                from aggregates import record_bin_status
+                record_bin_status(previous.get("status"), status_update["status"])
+        except Exception:
+            pass
 
         return doc
 
     def batch_predict(self, bins: list, firestore_client) -> list:
-        """Run predictions for a list of bin dicts (from Firestore)."""
+        """
+        Run predictions for a list of bin dicts (from Firestore).
+        Scoring is one vectorized model call for all bins; only changed
+        predictions are persisted (see score_and_persist).
+        """
+        results, _ = self.score_and_persist(bins, firestore_client)
+        return results
+
+    def score_and_persist(self, bins: list, firestore_client, previous: dict = None) -> tuple:
+        """
+        Score bins and write only what changed, all through one BatchWriter:
+          • overflow_predictions doc + bins_latest_risk view row, when the risk
+            level changed or the probability moved ≥ PROB_DELTA since the view
+          • bins.status, when the risk implies a status the bin doesn't have
+            (operator-set statuses such as offline are left alone)
+        previous: {bin_id: view row}, if the caller already read the view.
+        Returns (results for every bin, summary counts).
+        """
+        scored = self.score_bins(bins)
+        by_id = {(b.get("_id") or b.get("bin_id", "unknown")): b for b in bins}
+        if previous is None:
+            previous = firestore_client.get_docs(LATEST_RISK_COLLECTION, list(by_id))
+
         results = []
-        for b in bins:
-            bid = b.get("_id") or b.get("bin_id", "unknown")
-            fill_level = b.get("fill_level", 0.0)
+        transitions = []
+        written = 0
+        with firestore_client.batch_writer() as writer:
+            for bid, result, (fill_level, hours_since, pop_density, daily_waste) in scored:
+                pred = _prediction_doc(bid, result, fill_level, hours_since,
+                                       pop_density, daily_waste)
+                last = previous.get(bid)
+                if _changed(last, result):
+                    pred["prediction_id"] = writer.add("overflow_predictions", pred)
+                    writer.set(LATEST_RISK_COLLECTION, bid,
+                               {**pred, "ward_id": by_id[bid].get("ward_id")})
+                    written += 1
+                    pred["changed"] = True
+                else:
+                    pred["prediction_id"] = last.get("prediction_id")
+                    pred["changed"] = False
+
+                old_status = by_id[bid].get("status")
+                status_update = _status_update(result["risk_level"], old_status)
+                if status_update:
+                    writer.update("bins", bid, status_update)
+                    transitions.append((bid, old_status, status_update["status"]))
+                results.append(pred)
+
+        # Count only status changes that reached Firestore
+        failed = {e["doc_id"] for e in writer.errors if e["collection"] == "bins"}
+        transitions = [t for t in transitions if t[0] not in failed]
+        from aggregates import record_bin_status
+        for _, old, new in transitions:
+            record_bin_status(old, new)
+
+        if writer.errors:
+            print(f"⚠️  batch_predict: {len(writer.errors)} of "
+                  f"{writer.committed + len(writer.errors)} writes failed")
+        return results, {
+            "scored":              len(results),
+            "predictions_written": written,
+            "status_updates":      len(transitions),
+            "write_errors":        len(writer.errors),
+        }
+
+
+def _changed(last: dict, result: dict) -> bool:
+    if not last:
+        return True
+    if last.get("risk_level") != result["risk_level"]:
+        return True
+    return abs((last.get("overflow_probability") or 0.0) - result["overflow_probability"]) >= PROB_DELTA
+
+
+def _load_artifact() -> tuple:
+    """Registry LATEST → legacy overflow_model.forest.npy → one-time pickle conversion."""
+    version = overflow_training.latest_version()
+    if version:
+        return CompactForest(overflow_training.artifact_path(version)), version
+    if not FOREST_PATH.exists() and os.path.exists(MODEL_PATH):
+        print("⏳ Converting overflow_model.pkl to compact forest...")
+        with open(MODEL_PATH, "rb") as f:
+            export(pickle.load(f), FOREST_PATH, {"source": "overflow_model.pkl"})
+    if not FOREST_PATH.exists():
+        raise FileNotFoundError("no overflow model — run "
+                                "`python overflow_training.py train --promote` first")
+    forest = CompactForest(FOREST_PATH)
+    return forest, forest.meta.get("version", FOREST_PATH.name)
+
+
+def _series_fill_rates(bin_ids: list, now: datetime):
+    """Measured fill rates from fill_series (NaN per bin without enough readings); None if unavailable."""
+    try:
+        from fill_series import get_series
+        return get_series().fill_rates(bin_ids, now.timestamp())
+    except Exception as e:
+        print(f"⚠️  Fill series unavailable, using heuristic fill rate: {e}")
+        return None
+
+
+def _hours_since(last_collected, now: datetime) -> float:
+    # Hours since last collection
+    if not last_collected:
+        return 72.0  # No collection data = assume 3 days
+    try:
+        return (now - datetime.fromisoformat(last_collected)).total_seconds() / 3600
+    except Exception:
+        return 24.0
+
+
+def bin_features(bins: list, now: datetime) -> tuple:
+    """Bin dicts → (bin_ids, (n, 4) feature matrix) — one row per bin, one `now` for all."""
+    ids = [b.get("_id") or b.get("bin_id", "unknown") for b in bins]
+    X = np.empty((len(bins), 4), dtype=float)
+    X[:, 0] = [b.get("fill_level", 0.0) for b in bins]
+    X[:, 1] = [_hours_since(b.get("last_collected"), now) for b in bins]
+    X[:, 2] = [b.get("population_density", 10000.0) for b in bins]
+    X[:, 3] = [b.get("avg_daily_waste_kg", 2.5) for b in bins]
+    return ids, X
+
+
+def _prediction_doc(bin_id: str, result: dict, fill_level: float, hours_since_last: float,
+                    population_density: float, avg_daily_waste_kg: float) -> dict:
+    return {
+        "bin_id":               bin_id,
+        "overflow_probability": result["overflow_probability"],
+        "risk_level":           result["risk_level"],
+        "hours_to_overflow":    result["hours_to_overflow"],
+        "fill_rate_pct_per_hour": result.get("fill_rate_pct_per_hour"),
+        "input_features": {
+            "fill_level":         fill_level,
+            "hours_since_last":   hours_since_last,
+            "population_density": population_density,
+            "avg_daily_waste_kg": avg_daily_waste_kg,
+        },
+        "predicted_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def _status_update(risk_level: str, current: str = None) -> dict:
+    """Risk → bins.status change; {} when unchanged or the status was set by an operator."""
+    if current in OPERATOR_STATUSES:
+        return {}
+    if risk_level == "High":
+        status = "overflow"
+    elif risk_level == "Medium":
+        status = "active"
+    else:
+        return {}
+    return {"status": status} if status != current else {}
 
-            # Hours since last collection
-            last_collected = b.get("last_collected")
-            if last_collected:
-                try:
-                    last_dt = datetime.fromisoformat(last_collected)
-                    now = datetime.now(timezone.utc)
-                    hours_since = (now - last_dt).total_seconds() / 3600
-                except Exception:
-                    hours_since = 24.0
-            else:
-                hours_since = 72.0  # No collection data = assume 3 days
-
-            pop_density = b.get("population_density", 10000.0)
-            daily_waste = b.get("avg_daily_waste_kg", 2.5)
-
-            pred = self.predict_and_save(
-                bin_id=bid,
-                fill_level=fill_level,
-                hours_since_last=hours_since,
-                population_density=pop_density,
-                avg_daily_waste_kg=daily_waste,
-                firestore_client=firestore_client,
-            )
-            pred["bin_id"] = bid
-            results.append(pred)
-        return results
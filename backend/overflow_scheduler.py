@@ -0,0 +1,126 @@
+"""
+WASTE IQ – Scheduled Overflow Scoring
+Scores every bin city-wide every OVERFLOW_SCORE_INTERVAL_S, in the
+background, instead of only when someone calls /overflow/predict-batch.
+Each run is one bins query, one read of the bins_latest_risk view,
+one vectorized model call and one BatchWriter (see
+OverflowModel.score_and_persist): a prediction is written only when a
+bin's risk level changed or its probability moved OVERFLOW_PROB_DELTA.
+View rows for deleted bins are dropped in the same run.
+
+Every uvicorn worker runs a scheduler thread, but a run needs the lock
+file and a last-run stamp older than the interval, so one worker scores
+per interval on a host. OVERFLOW_SCORE_INTERVAL_S=0 disables it.
+"""
+
+import os
+import time
+import threading
+from pathlib import Path
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+import firestore_client as fc
+from overflow_model import LATEST_RISK_COLLECTION
+
+SCORE_INTERVAL_S = float(os.getenv("OVERFLOW_SCORE_INTERVAL_S", "900"))
+FIRST_RUN_DELAY_S = 60.0   # let warmup finish first
+LOCK_PATH = Path(os.getenv("OVERFLOW_SCHEDULER_LOCK", Path(__file__).parent / ".overflow_scheduler.lock"))
+
+BIN_FIELDS = ["bin_id", "ward_id", "status", "fill_level", "last_collected",
+              "population_density", "avg_daily_waste_kg"]
+
+
+def score_all_bins(model) -> Dict:
+    """One city-wide pass. Blocking."""
+    t0 = time.perf_counter()
+    bins = fc.query_collection("bins", fields=BIN_FIELDS)
+    # One read of the view serves both change detection and pruning
+    view = {v["_id"]: v for v in fc.query_collection(LATEST_RISK_COLLECTION)}
+    _, summary = model.score_and_persist(bins, fc, previous=view) if bins else ([], {"scored": 0})
+
+    # View rows whose bin no longer exists
+    live = {b.get("_id") for b in bins}
+    stale = [bid for bid in view if bid not in live]
+    if stale:
+        with fc.batch_writer() as writer:
+            for bid in stale:
+                writer.delete(LATEST_RISK_COLLECTION, bid)
+    summary.update(view_pruned=len(stale), duration_ms=round((time.perf_counter() - t0) * 1000, 1),
+                   finished_at=datetime.now(timezone.utc).isoformat())
+    return summary
+
+
+class OverflowScheduler:
+    def __init__(self, model, interval_s: float = SCORE_INTERVAL_S):
+        self.model = model
+        self.interval_s = interval_s
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.runs = 0
+        self.failures = 0
+        self.last: Optional[Dict] = None
+
+    def start(self) -> "OverflowScheduler":
+        self._thread = threading.Thread(target=self._loop, name="overflow-scheduler", daemon=True)
+        self._thread.start()
+        print(f"⏰ Overflow scoring every {self.interval_s:.0f}s")
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _loop(self) -> None:
+        wait = min(FIRST_RUN_DELAY_S, self.interval_s)
+        while not self._stop.wait(wait):
+            wait = self.interval_s
+            try:
+                self.run_once()
+            except Exception as e:
+                self.failures += 1
+                print(f"⚠️  Scheduled overflow scoring failed: {e}")
+
+    def run_once(self, force: bool = False) -> Optional[Dict]:
+        """Score all bins unless another worker did within the interval. None if skipped."""
+        try:
+            import fcntl
+        except ImportError:
+            fcntl = None
+        with open(LOCK_PATH, "a+") as lock:
+            if fcntl:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    return None   # another worker is scoring right now
+            lock.seek(0)
+            try:
+                last_run = float(lock.read().strip() or 0)
+            except ValueError:
+                last_run = 0.0
+            if not force and time.time() - last_run < self.interval_s * 0.9:
+                return None
+
+            summary = score_all_bins(self.model)
+            lock.seek(0)
+            lock.truncate()
+            lock.write(str(time.time()))
+            lock.flush()
+        self.runs += 1
+        self.last = summary
+        print(f"✅ Scored {summary['scored']} bins, {summary.get('predictions_written', 0)} changed "
+              f"({summary['duration_ms']:.0f} ms)")
+        return summary
+
+    def stats(self) -> Dict:
+        return {
+            "interval_s": self.interval_s,
+            "runs":       self.runs,
+            "failures":   self.failures,
+            "last":       self.last,
+        }
+
+
+def start(model) -> Optional[OverflowScheduler]:
+    if model is None or SCORE_INTERVAL_S <= 0:
+        return None
+    return OverflowScheduler(model).start()
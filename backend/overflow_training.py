@@ -0,0 +1,355 @@
+"""
+WASTE IQ – Overflow Model Training & Registry
+Offline training for the overflow RandomForest; the API only ever loads
+what this writes. Each run becomes an immutable version in the registry:
+
+    model_registry/overflow/
+        v20261018T120000Z/forest.npy    compact forest (overflow_forest.py)
+        v20261018T120000Z/forest.json   roots, params, data source, metrics
+        LATEST                          version the API serves
+
+    python overflow_training.py train                       # synthetic data
+    python overflow_training.py train --source firestore \\
+        --readings fill_readings.csv --since 2026-01-01      # real history
+    python overflow_training.py train --promote             # …and serve it
+    python overflow_training.py list
+    python overflow_training.py promote v20261018T120000Z   # or roll back
+
+Promoting rewrites LATEST; running API workers notice the new mtime
+within OVERFLOW_RELOAD_CHECK_S and swap models without a restart.
+
+Real-history labels: every overflow_predictions doc is a snapshot
+(input_features at predicted_at). It is labelled 1 if, within --horizon
+hours and before the bin's next collection (collection_logs), a fill
+reading reached --full percent or a complaint was filed against the bin;
+0 if the window holds a reading or a collection but no overflow evidence.
+Snapshots with no evidence either way are dropped.
+"""
+
+import os
+import csv
+import json
+import time
+import argparse
+from pathlib import Path
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from overflow_forest import FEATURES, CompactForest, export
+
+BASE_DIR     = Path(__file__).parent
+REGISTRY_DIR = Path(os.getenv("OVERFLOW_REGISTRY_DIR", BASE_DIR / "model_registry" / "overflow"))
+ARTIFACT     = "forest.npy"
+
+HORIZON_H     = 12.0   # label horizon, matches the synthetic "overflow within 12 h"
+OVERFLOW_FILL = 95.0   # fill % that counts as overflowing
+
+
+# ── Registry ─────────────────────────────────────────────────
+
+def _pointer() -> Path:
+    return REGISTRY_DIR / "LATEST"
+
+
+def artifact_path(version: str) -> Path:
+    return REGISTRY_DIR / version / ARTIFACT
+
+
+def latest_version() -> Optional[str]:
+    try:
+        version = _pointer().read_text().strip()
+    except OSError:
+        return None
+    return version if version and artifact_path(version).exists() else None
+
+
+def pointer_mtime() -> Optional[float]:
+    try:
+        return _pointer().stat().st_mtime
+    except OSError:
+        return None
+
+
+def list_versions() -> List[Dict]:
+    latest = latest_version()
+    out = []
+    for meta_file in sorted(REGISTRY_DIR.glob("v*/forest.json")):
+        meta = json.loads(meta_file.read_text())
+        out.append({
+            "version": meta_file.parent.name,
+            "latest":  meta_file.parent.name == latest,
+            "created_at": meta.get("created_at"),
+            "source":  meta.get("source"),
+            "params":  meta.get("params"),
+            "metrics": meta.get("metrics"),
+        })
+    return out
+
+
+def promote(version: str) -> None:
+    """Point LATEST at `version` (atomic). The artifact is load-tested first."""
+    path = artifact_path(version)
+    CompactForest(path).predict_proba(np.zeros((1, len(FEATURES))))
+    tmp = _pointer().with_suffix(".tmp")
+    tmp.write_text(version + "\n")
+    os.replace(tmp, _pointer())
+
+
+def _new_version() -> str:
+    base = "v" + datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    version, n = base, 1
+    while (REGISTRY_DIR / version).exists():
+        n += 1
+        version = f"{base}-{n}"
+    return version
+
+
+def save_version(pipeline, meta: Dict) -> str:
+    version = _new_version()
+    (REGISTRY_DIR / version).mkdir(parents=True)
+    export(pipeline, artifact_path(version), {"version": version, **meta})
+    return version
+
+
+# ── Training data ────────────────────────────────────────────
+
+def synthetic(n_samples: int = 8000) -> Tuple[np.ndarray, np.ndarray]:
+    from overflow_model import _generate_training_data
+    X, y, _ = _generate_training_data(n_samples=n_samples)
+    return X, y
+
+
+def _ts(value) -> Optional[float]:
+    """ISO string / epoch seconds → epoch seconds (naive timestamps are UTC)."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, datetime):
+        dt = value
+    else:
+        try:
+            return float(value)
+        except ValueError:
+            pass
+        try:
+            dt = datetime.fromisoformat(str(value))
+        except ValueError:
+            return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def _by_bin(rows, time_key: str, value_key: str = None) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    """rows → {bin_id: (sorted times, values)}; rows without a bin or time are skipped."""
+    grouped: Dict[str, List[Tuple[float, float]]] = {}
+    for r in rows:
+        t = _ts(r.get(time_key))
+        if r.get("bin_id") and t is not None:
+            grouped.setdefault(r["bin_id"], []).append((t, float(r.get(value_key) or 0) if value_key else 0.0))
+    out = {}
+    for bid, pairs in grouped.items():
+        pairs.sort()
+        arr = np.array(pairs, dtype=float)
+        out[bid] = (arr[:, 0], arr[:, 1])
+    return out
+
+
+def load_readings(path: str) -> List[Dict]:
+    """Fill-reading export: CSV with a header, or JSON lines — bin_id, fill_level, recorded_at."""
+    with open(path, newline="") as f:
+        if path.endswith((".jsonl", ".ndjson", ".json")):
+            return [json.loads(line) for line in f if line.strip()]
+        return list(csv.DictReader(f))
+
+
+def label_history(snapshots: List[Dict], readings: List[Dict], collections: List[Dict],
+                  complaints: List[Dict], horizon_h: float = HORIZON_H,
+                  full: float = OVERFLOW_FILL) -> Tuple[np.ndarray, np.ndarray]:
+    """Prediction snapshots + outcome events → (X, y). See the module docstring for the rule."""
+    horizon = horizon_h * 3600
+    fills = _by_bin(readings, "recorded_at", "fill_level")
+    collected = _by_bin(collections, "collected_at")
+    reported = _by_bin(complaints, "created_at")
+    empty = (np.empty(0), np.empty(0))
+
+    X, y = [], []
+    for snap in snapshots:
+        t, bid = _ts(snap.get("predicted_at")), snap.get("bin_id")
+        feats = snap.get("input_features") or {}
+        if t is None or not bid or any(feats.get(k) is None for k in FEATURES):
+            continue
+        # window ends at the horizon or the next collection, whichever is first
+        ct, _ = collected.get(bid, empty)
+        i = np.searchsorted(ct, t, side="right")
+        end = min(t + horizon, ct[i]) if i < len(ct) else t + horizon
+        was_collected = i < len(ct) and ct[i] <= t + horizon
+
+        rt, rv = fills.get(bid, empty)
+        lo, hi = np.searchsorted(rt, t, side="right"), np.searchsorted(rt, end, side="right")
+        overflowed = bool(hi > lo and rv[lo:hi].max() >= full)
+        kt, _ = reported.get(bid, empty)
+        overflowed |= bool(np.searchsorted(kt, end, side="right") > np.searchsorted(kt, t, side="right"))
+
+        if not overflowed and hi == lo and not was_collected:
+            continue   # no evidence either way
+        X.append([float(feats[k]) for k in FEATURES])
+        y.append(int(overflowed))
+    return np.array(X, dtype=float).reshape(-1, len(FEATURES)), np.array(y, dtype=int)
+
+
+def firestore_history(readings_path: Optional[str] = None, since: Optional[str] = None,
+                      horizon_h: float = HORIZON_H, full: float = OVERFLOW_FILL):
+    import firestore_client as fc
+
+    def _since(field):
+        return [(field, ">=", since)] if since else None
+
+    print("⏳ Loading overflow_predictions, collection_logs, complaints from Firestore...")
+    snapshots = fc.query_collection("overflow_predictions", filters=_since("predicted_at"),
+                                    fields=["bin_id", "predicted_at", "input_features"])
+    collections = fc.query_collection("collection_logs", filters=_since("collected_at"),
+                                      fields=["bin_id", "collected_at"])
+    complaints = [c for c in fc.query_collection("complaints", filters=_since("created_at"),
+                                                 fields=["bin_id", "created_at"]) if c.get("bin_id")]
+    readings = load_readings(readings_path) if readings_path else []
+    print(f"   {len(snapshots)} snapshots · {len(readings)} readings · "
+          f"{len(collections)} collections · {len(complaints)} bin complaints")
+    return label_history(snapshots, readings, collections, complaints, horizon_h, full)
+
+
+# ── Training ─────────────────────────────────────────────────
+
+def fit(X: np.ndarray, y: np.ndarray, trees: int = 200, depth: Optional[int] = 12,
+        seed: int = 42):
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.preprocessing import StandardScaler
+    from sklearn.pipeline import Pipeline
+
+    pipeline = Pipeline([
+        ("scaler", StandardScaler()),
+        ("rf", RandomForestClassifier(
+            n_estimators=trees,
+            max_depth=depth,
+            min_samples_split=5,
+            min_samples_leaf=2,
+            class_weight="balanced",
+            random_state=seed,
+            n_jobs=-1,          # every core
+        ))
+    ])
+    return pipeline.fit(X, y)
+
+
+def evaluate(pipeline, X_test: np.ndarray, y_test: np.ndarray) -> Dict:
+    from sklearn.metrics import accuracy_score, brier_score_loss, f1_score, precision_score, \
+        recall_score, roc_auc_score
+
+    p = pipeline.predict_proba(X_test)[:, list(pipeline.classes_).index(1)]
+    pred = (p >= 0.5).astype(int)
+    metrics = {
+        "accuracy":  accuracy_score(y_test, pred),
+        "precision": precision_score(y_test, pred, zero_division=0),
+        "recall":    recall_score(y_test, pred, zero_division=0),
+        "f1":        f1_score(y_test, pred, zero_division=0),
+        "brier":     brier_score_loss(y_test, p),
+    }
+    if len(set(y_test.tolist())) > 1:
+        metrics["roc_auc"] = roc_auc_score(y_test, p)
+    return {k: round(float(v), 4) for k, v in metrics.items()}
+
+
+def latency_us(forest: CompactForest, X: np.ndarray, batch: int = 1000, repeat: int = 20) -> Dict:
+    """Compact-forest serving latency: one row, and per row in a `batch`-row call."""
+    one, rows = X[:1], X[np.arange(batch) % len(X)]
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        forest.predict_proba(one)
+    single = (time.perf_counter() - t0) / repeat * 1e6
+    t0 = time.perf_counter()
+    forest.predict_proba(rows)
+    per_row = (time.perf_counter() - t0) / batch * 1e6
+    return {"single_us": round(single, 1), "batch_us_per_row": round(per_row, 2)}
+
+
+def train(source: str = "synthetic", samples: int = 8000, readings: str = None,
+          since: str = None, horizon_h: float = HORIZON_H, trees: int = 200,
+          depth: Optional[int] = 12, seed: int = 42, promote_after: bool = False) -> str:
+    from sklearn.model_selection import train_test_split
+
+    if source == "firestore":
+        X, y = firestore_history(readings, since, horizon_h)
+    else:
+        X, y = synthetic(samples)
+    if len(X) < 50 or len(set(y.tolist())) < 2:
+        raise SystemExit(f"❌ Not enough labelled data ({len(X)} rows, classes {sorted(set(y.tolist()))})")
+
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, random_state=seed, stratify=y)
+    print(f"⏳ Training on {len(X_train)} rows ({y_train.mean():.1%} overflow), "
+          f"{trees} trees, depth {depth}...")
+    t0 = time.perf_counter()
+    pipeline = fit(X_train, y_train, trees, depth, seed)
+    train_s = time.perf_counter() - t0
+
+    metrics = evaluate(pipeline, X_test, y_test)
+    metrics.update(n_train=len(X_train), n_test=len(X_test), train_s=round(train_s, 2))
+    version = save_version(pipeline, {
+        "source":  source if source != "firestore" else f"firestore since {since or 'beginning'}",
+        "params":  {"trees": trees, "depth": depth, "seed": seed, "horizon_h": horizon_h},
+        "metrics": metrics,
+    })
+    forest = CompactForest(artifact_path(version))
+    metrics.update(latency_us(forest, X_test))
+    _write_metrics(version, metrics)
+    print(f"✅ {version}: " + " · ".join(f"{k} {v}" for k, v in metrics.items()))
+
+    if promote_after:
+        promote(version)
+        print(f"🚀 {version} promoted — API workers will pick it up without a restart")
+    return version
+
+
+def _write_metrics(version: str, metrics: Dict) -> None:
+    meta_file = artifact_path(version).with_suffix(".json")
+    meta = json.loads(meta_file.read_text())
+    meta["metrics"] = metrics
+    tmp = meta_file.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(meta, indent=2))
+    os.replace(tmp, meta_file)   # a loading worker never reads half a sidecar
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Overflow model training & registry",
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("train")
+    p.add_argument("--source", choices=["synthetic", "firestore"], default="synthetic")
+    p.add_argument("--samples", type=int, default=8000, help="synthetic rows")
+    p.add_argument("--readings", default=None, help="fill-reading export (CSV or JSONL)")
+    p.add_argument("--since", default=None, help="ISO date; only history from here on")
+    p.add_argument("--horizon", type=float, default=HORIZON_H, help="label horizon, hours")
+    p.add_argument("--trees", type=int, default=200)
+    p.add_argument("--depth", type=int, default=12, help="0 = unlimited")
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--promote", action="store_true", help="serve this version once trained")
+    sub.add_parser("list")
+    p = sub.add_parser("promote")
+    p.add_argument("version")
+    args = parser.parse_args()
+
+    if args.cmd == "train":
+        train(args.source, args.samples, args.readings, args.since, args.horizon,
+              args.trees, args.depth or None, args.seed, args.promote)
+    elif args.cmd == "list":
+        for v in list_versions():
+            m = v["metrics"] or {}
+            print(f"{'→' if v['latest'] else ' '} {v['version']}  {v['source']}  "
+                  f"auc {m.get('roc_auc', '–')}  acc {m.get('accuracy', '–')}  "
+                  f"{(v['params'] or {}).get('trees')} trees")
+    else:
+        promote(args.version)
+        print(f"🚀 {args.version} promoted")
@@ -0,0 +1,41 @@
+"""
+WASTE IQ – Cursor Pagination Helper
+Shared by list endpoints: runs one page query (start_after cursor) and the
+COUNT() for `total` concurrently, and wraps them in PaginatedResponse.
+"""
+
+import asyncio
+from typing import List, Optional
+
+from fastapi import HTTPException
+
+from firestore_async import query_page, count_documents
+from models import PaginatedResponse
+
+MAX_PAGE_SIZE = 500
+
+
+def clamp_limit(limit: int) -> int:
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+async def paginate(
+    collection: str,
+    filters: Optional[List[tuple]] = None,
+    order_by: Optional[str] = None,
+    order_desc: bool = False,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+) -> PaginatedResponse:
+    limit = clamp_limit(limit)
+    try:
+        (docs, next_cursor, page), total = await asyncio.gather(
+            query_page(collection, filters=filters, order_by=order_by,
+                       order_desc=order_desc, limit=limit, cursor=cursor),
+            count_documents(collection, filters=filters),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return PaginatedResponse(items=docs, total=total, page=page,
+                             per_page=limit, next_cursor=next_cursor)
@@ -0,0 +1,213 @@
+"""
+WASTE IQ – Report Jobs
+Background PDF generation. A submit returns a job id immediately; a small
+worker pool renders the ReportLab document off the event loop and writes
+it to disk, keyed by a hash of the data it was built from. An identical
+request within the cache window gets the cached file straight away.
+
+The data version is a hash of the stats/city counters (see aggregates), so
+the cache is invalidated by any classification, complaint, bin or user
+change — and reports no longer scan whole collections at all.
+"""
+
+import os
+import io
+import json
+import time
+import uuid
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Optional
+
+import aggregates
+
+REPORT_CACHE_DIR = Path(os.getenv("REPORT_CACHE_DIR", Path(__file__).parent / "report_cache"))
+REPORT_CACHE_TTL = float(os.getenv("REPORT_CACHE_TTL", "600"))     # seconds
+REPORT_WORKERS   = int(os.getenv("REPORT_WORKERS", "2"))
+JOB_RETENTION_S  = 3600
+
+
+# ── Rendering ────────────────────────────────────────────────
+
+def render_city_report(summary: Dict) -> bytes:
+    """Build the city waste report PDF from a city summary (aggregates.get_summary)."""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.units import inch
+    from reportlab.lib import colors
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+
+    categories  = summary.get("waste_by_category", {})
+    bin_stats   = summary.get("bins_by_status", {})
+    comp_stats  = summary.get("complaints_by_status", {})
+    total_logs  = summary.get("total_classifications", 0)
+
+    buf = io.BytesIO()
+    doc = SimpleDocTemplate(buf, pagesize=A4, topMargin=0.75*inch, bottomMargin=0.75*inch)
+    styles  = getSampleStyleSheet()
+    elements= []
+
+    # Title
+    title_style = ParagraphStyle("Title", parent=styles["Title"], fontSize=24, textColor=colors.HexColor("#1a7a4a"), spaceAfter=6)
+    elements.append(Paragraph("WASTE IQ – City Waste Report", title_style))
+    elements.append(Paragraph(f"Generated: {datetime.now(timezone.utc).strftime('%B %d, %Y %H:%M UTC')}", styles["Normal"]))
+    elements.append(Spacer(1, 20))
+
+    # Summary table
+    summary_data = [
+        ["Metric", "Value"],
+        ["Total Classifications", str(total_logs)],
+        ["Total Bins Monitored", str(summary.get("total_bins", 0))],
+        ["Total Complaints",     str(summary.get("total_complaints", 0))],
+        ["Overflow Bins",        str(bin_stats.get("overflow", 0))],
+        ["Open Complaints",      str(comp_stats.get("open", 0))],
+        ["Resolved Complaints",  str(comp_stats.get("resolved", 0))],
+    ]
+    t = Table(summary_data, colWidths=[3*inch, 2*inch])
+    t.setStyle(TableStyle([
+        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#1a7a4a")),
+        ("TEXTCOLOR",  (0, 0), (-1, 0), colors.white),
+        ("FONTNAME",   (0, 0), (-1, 0), "Helvetica-Bold"),
+        ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.HexColor("#f0f8f4"), colors.white]),
+        ("GRID",       (0, 0), (-1, -1), 0.5, colors.grey),
+        ("FONTSIZE",   (0, 0), (-1, -1), 11),
+        ("PADDING",    (0, 0), (-1, -1), 8),
+    ]))
+    elements.append(Paragraph("Executive Summary", styles["Heading2"]))
+    elements.append(t)
+    elements.append(Spacer(1, 20))
+
+    # Waste categories breakdown
+    elements.append(Paragraph("Waste by Category", styles["Heading2"]))
+    cat_data = [["Category", "Count", "Percentage"]] + [
+        [cat, str(count), f"{round(count/max(total_logs,1)*100,1)}%"]
+        for cat, count in sorted(categories.items(), key=lambda x: -x[1])
+    ]
+    ct = Table(cat_data, colWidths=[2.5*inch, 1.5*inch, 1.5*inch])
+    ct.setStyle(TableStyle([
+        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#2d6a4f")),
+        ("TEXTCOLOR",  (0, 0), (-1, 0), colors.white),
+        ("FONTNAME",   (0, 0), (-1, 0), "Helvetica-Bold"),
+        ("GRID",       (0, 0), (-1, -1), 0.5, colors.grey),
+        ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.HexColor("#f0f8f4"), colors.white]),
+        ("PADDING",    (0, 0), (-1, -1), 8),
+    ]))
+    elements.append(ct)
+
+    doc.build(elements)
+    return buf.getvalue()
+
+
+REPORT_KINDS = {"city": render_city_report}
+
+
+def data_version(kind: str, summary: Dict) -> str:
+    payload = {k: v for k, v in summary.items() if k != "rebuilt_at"}
+    raw = json.dumps({"kind": kind, "data": payload}, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()[:16]
+
+
+# ── Job Manager ──────────────────────────────────────────────
+
+class ReportJobManager:
+    def __init__(self, cache_dir: Path = REPORT_CACHE_DIR, ttl: float = REPORT_CACHE_TTL,
+                 workers: int = REPORT_WORKERS):
+        self.cache_dir = Path(cache_dir)
+        self.ttl = ttl
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="report")
+        self._jobs: Dict[str, Dict] = {}
+        self._futures: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def _artifact(self, kind: str, version: str) -> Path:
+        return self.cache_dir / f"{kind}_{version}.pdf"
+
+    def _fresh(self, path: Path) -> bool:
+        return path.exists() and time.time() - path.stat().st_mtime < self.ttl
+
+    def submit(self, kind: str = "city") -> Dict:
+        """Queue a report (or return a cached / already-running one). Blocking: reads counters."""
+        if kind not in REPORT_KINDS:
+            raise ValueError(f"Unknown report kind: {kind}")
+        summary = aggregates.get_summary()
+        version = data_version(kind, summary)
+        path = self._artifact(kind, version)
+
+        with self._lock:
+            self._prune()
+            # Same data already rendering → share that job
+            for job in self._jobs.values():
+                if job["version"] == version and job["status"] in ("queued", "running"):
+                    return dict(job)
+
+            job = {
+                "job_id":     uuid.uuid4().hex,
+                "kind":       kind,
+                "version":    version,
+                "status":     "queued",
+                "cached":     False,
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "error":      None,
+                "_path":      str(path),
+                "_ts":        time.time(),
+            }
+            if self._fresh(path):
+                job.update(status="done", cached=True)
+            else:
+                self._futures[job["job_id"]] = self._pool.submit(self._run, job["job_id"], summary)
+            self._jobs[job["job_id"]] = job
+            return dict(job)
+
+    def _run(self, job_id: str, summary: Dict) -> None:
+        with self._lock:
+            job = self._jobs[job_id]
+            job["status"] = "running"
+        try:
+            pdf = REPORT_KINDS[job["kind"]](summary)
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp = Path(job["_path"] + ".tmp")
+            tmp.write_bytes(pdf)
+            tmp.replace(job["_path"])      # atomic: readers never see a partial file
+            status, error = "done", None
+        except ImportError:
+            status, error = "failed", "reportlab not installed"
+        except Exception as e:
+            status, error = "failed", str(e)[:200]
+        with self._lock:
+            job.update(status=status, error=error)
+            self._futures.pop(job_id, None)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def future(self, job_id: str) -> Optional[Future]:
+        with self._lock:
+            return self._futures.get(job_id)
+
+    def _prune(self) -> None:
+        """Drop old job records and expired artifacts (caller holds the lock)."""
+        now = time.time()
+        for job_id in [j for j, job in self._jobs.items()
+                       if now - job["_ts"] > JOB_RETENTION_S and job["status"] in ("done", "failed")]:
+            del self._jobs[job_id]
+        if self.cache_dir.exists():
+            live = {job["_path"] for job in self._jobs.values()}
+            for f in self.cache_dir.glob("*.pdf"):
+                if str(f) not in live and now - f.stat().st_mtime > self.ttl:
+                    f.unlink(missing_ok=True)
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False)
+
+
+def public(job: Dict) -> Dict:
+    """Job dict without internal fields."""
+    return {k: v for k, v in job.items() if not k.startswith("_")}
+
+
+jobs = ReportJobManager()
@@ -1,9 +1,11 @@
 """WASTE IQ – Auth Router"""
 from fastapi import APIRouter, Depends, HTTPException, Body
 from auth import get_current_user, set_user_role, create_user, list_all_users, require_admin, UserInfo
-from firestore_client import get_doc, set_doc, update_doc
+from firestore_async import get_doc, set_doc, update_doc, run_sync, run_blocking
 from models import SignupRequest, UserProfile, UserUpdate, APIResponse
 from datetime import datetime, timezone
+from leaderboard import schedule_refresh
+import aggregates
 
 router = APIRouter()
 
@@ -11,9 +13,9 @@ router = APIRouter()
 async def signup(payload: SignupRequest):
     """Create a new Firebase Auth user + Firestore user profile."""
     try:
-        uid = create_user(payload.email, payload.password, payload.name)
-        set_user_role(uid, payload.role.value)
-        set_doc("users", uid, {
+        uid = await run_blocking(create_user, payload.email, payload.password, payload.name)
+        await run_blocking(set_user_role, uid, payload.role.value)
+        await set_doc("users", uid, {
             "uid":        uid,
             "email":      payload.email,
             "name":       payload.name,
@@ -26,10 +28,12 @@ async def signup(payload: SignupRequest):
             "created_at": datetime.now(timezone.utc).isoformat(),
         })
         # Init gamification
-        set_doc("gamification", uid, {
+        await set_doc("gamification", uid, {
             "uid": uid, "total_points": 0, "weekly_points": 0,
             "badges": [], "level": "Beginner",
         })
+        await run_sync(aggregates.record_user, payload.role.value)
+        schedule_refresh()
         return APIResponse(success=True, message="User created successfully", data={"uid": uid})
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -37,7 +41,7 @@ async def signup(payload: SignupRequest):
 @router.get("/me", response_model=APIResponse)
 async def get_me(user: UserInfo = Depends(get_current_user)):
     """Return the current user's profile from Firestore."""
-    profile = get_doc("users", user.uid)
+    profile = await get_doc("users", user.uid)
     if not profile:
         raise HTTPException(status_code=404, detail="User profile not found")
     return APIResponse(success=True, message="OK", data=profile)
@@ -47,18 +51,23 @@ async def update_me(payload: UserUpdate, user: UserInfo = Depends(get_current_us
     """Update editable profile fields."""
     updates = {k: v for k, v in payload.dict().items() if v is not None}
     if updates:
-        update_doc("users", user.uid, updates)
+        await update_doc("users", user.uid, updates)
+        if "name" in updates:
+            schedule_refresh()  # names are denormalized into the leaderboard
     return APIResponse(success=True, message="Profile updated", data=updates)
 
 @router.get("/users", response_model=APIResponse)
 async def list_users(admin: UserInfo = Depends(require_admin)):
     """Admin: list all Firebase Auth users."""
-    users = list_all_users()
+    users = await run_blocking(list_all_users)
     return APIResponse(success=True, message=f"{len(users)} users", data=users)
 
 @router.patch("/users/{uid}/role", response_model=APIResponse)
 async def set_role(uid: str, role: str = Body(..., embed=True), admin: UserInfo = Depends(require_admin)):
     """Admin: change a user's role."""
-    set_user_role(uid, role)
-    update_doc("users", uid, {"role": role})
+    await run_blocking(set_user_role, uid, role)
+    previous = await get_doc("users", uid) or {}
+    await update_doc("users", uid, {"role": role})
+    await run_sync(aggregates.record_user_role, previous.get("role"), role)
+    schedule_refresh()
     return APIResponse(success=True, message=f"Role updated to {role}")
@@ -1,27 +1,65 @@
 """WASTE IQ – Bins Router"""
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from auth import get_current_user, require_municipal, require_admin, require_driver, UserInfo
-from firestore_client import get_doc, set_doc, add_doc, update_doc, query_collection
-from models import BinCreate, BinUpdate, BinCollectedUpdate, APIResponse
+from firestore_async import get_doc, set_doc, add_doc, update_doc, delete_doc, run_sync, run_blocking
+from models import BinCreate, BinUpdate, BinCollectedUpdate, FillReadingBatch, APIResponse
 from datetime import datetime, timezone
+import os
 import uuid
+import aggregates
+import fill_series
+from pagination import paginate
+from leaderboard import schedule_refresh
 
 router = APIRouter()
 
+FILL_INGEST_MAX = int(os.getenv("FILL_INGEST_MAX", "5000"))   # readings per request
+
 @router.get("/", response_model=APIResponse)
-async def list_bins(ward_id: str = None, user: UserInfo = Depends(get_current_user)):
+async def list_bins(ward_id: str = None, limit: int = 200, cursor: str = None,
+                    user: UserInfo = Depends(get_current_user)):
     """List bins. Household/Driver see assigned bins; Municipal/Admin see ward or all."""
     filters = []
     if ward_id:
         filters.append(("ward_id", "==", ward_id))
     if user.role == "driver":
         filters.append(("assigned_driver", "==", user.uid))
-    bins = query_collection("bins", filters=filters if filters else None)
-    return APIResponse(success=True, message=f"{len(bins)} bins", data=bins)
+    page = await paginate("bins", filters=filters if filters else None,
+                          limit=limit, cursor=cursor)
+    return APIResponse(success=True, message=f"{len(page.items)} bins", data=page)
+
+@router.post("/readings", response_model=APIResponse)
+async def ingest_fill_readings(payload: FillReadingBatch, user: UserInfo = Depends(require_municipal)):
+    """Sensor gateway: store fill readings in the fill series; bin docs are updated throttled, in one batch."""
+    if len(payload.readings) > FILL_INGEST_MAX:
+        raise HTTPException(status_code=413, detail=f"At most {FILL_INGEST_MAX} readings per request")
+    import firestore_client as fc
+    result = await run_blocking(fill_series.ingest, [r.dict() for r in payload.readings], fc)
+    return APIResponse(success=True, message=f"Stored {result['stored']} readings", data=result)
+
+@router.get("/{bin_id}/fill-history", response_model=APIResponse)
+async def fill_history(bin_id: str,
+                       hours: float = Query(24, gt=0, le=fill_series.ROLLUP_RETENTION_D * 24),
+                       resolution: str = "raw",
+                       user: UserInfo = Depends(get_current_user)):
+    """Fill readings for one bin: raw points (within raw retention) or hourly rollups."""
+    if resolution not in ("raw", "hour"):
+        raise HTTPException(status_code=400, detail="resolution must be 'raw' or 'hour'")
+    series = fill_series.get_series()
+    since = datetime.now(timezone.utc).timestamp() - hours * 3600
+    if resolution == "hour":
+        data = await run_blocking(series.rollups, bin_id, since)
+    else:
+        data = await run_blocking(series.series, bin_id, since)
+    rate = await run_blocking(series.fill_rates, [bin_id])
+    return APIResponse(success=True, message="OK", data={
+        "bin_id": bin_id, "resolution": resolution, "points": data,
+        "fill_rate_pct_per_hour": None if rate[0] != rate[0] else round(float(rate[0]), 2),
+    })
 
 @router.get("/{bin_id}", response_model=APIResponse)
 async def get_bin(bin_id: str, user: UserInfo = Depends(get_current_user)):
-    bin_doc = get_doc("bins", bin_id)
+    bin_doc = await get_doc("bins", bin_id)
     if not bin_doc:
         raise HTTPException(status_code=404, detail="Bin not found")
     return APIResponse(success=True, message="OK", data=bin_doc)
@@ -41,7 +79,8 @@ async def create_bin(payload: BinCreate, user: UserInfo = Depends(require_munici
         "last_collected":  None,
         "created_at":      datetime.now(timezone.utc).isoformat(),
     }
-    set_doc("bins", bin_id, doc)
+    await set_doc("bins", bin_id, doc)
+    await run_sync(aggregates.record_bin_created, "active")
     return APIResponse(success=True, message="Bin created", data=doc)
 
 @router.patch("/{bin_id}", response_model=APIResponse)
@@ -50,7 +89,10 @@ async def update_bin(bin_id: str, payload: BinUpdate, user: UserInfo = Depends(r
     updates = {k: v for k, v in payload.dict().items() if v is not None}
     if not updates:
         raise HTTPException(status_code=400, detail="No fields to update")
-    update_doc("bins", bin_id, updates)
+    previous = await get_doc("bins", bin_id) if "status" in updates else None
+    await update_doc("bins", bin_id, updates)
+    if previous:
+        await run_sync(aggregates.record_bin_status, previous.get("status"), updates["status"])
     return APIResponse(success=True, message="Bin updated", data=updates)
 
 @router.post("/{bin_id}/collected", response_model=APIResponse)
@@ -59,29 +101,38 @@ async def mark_collected(bin_id: str, payload: BinCollectedUpdate, user: UserInf
     if user.role not in ("driver", "admin"):
         raise HTTPException(status_code=403, detail="Only drivers can mark bins as collected")
     now = datetime.now(timezone.utc).isoformat()
-    update_doc("bins", bin_id, {
+    previous = await get_doc("bins", bin_id) or {}
+    await update_doc("bins", bin_id, {
         "fill_level":     0.0,
         "status":         "collected",
         "last_collected": now,
         "driver_uid":     user.uid,
     })
-    add_doc("collection_logs", {
+    await add_doc("collection_logs", {
         "bin_id":       bin_id,
         "driver_uid":   user.uid,
         "collected_at": now,
         "notes":        payload.notes,
     })
+    await run_sync(aggregates.record_bin_status, previous.get("status"), "collected")
+    # Emptied: restart the bin's fill-rate series even before the sensor reports
+    try:
+        await run_blocking(fill_series.record_collection, bin_id)
+    except Exception:
+        pass
     # Points
     try:
-        _award_points(user.uid, 5)
+        await run_sync(_award_points, user.uid, 5)
     except Exception:
         pass
     return APIResponse(success=True, message="Bin marked as collected", data={"bin_id": bin_id, "collected_at": now})
 
 @router.delete("/{bin_id}", response_model=APIResponse)
 async def delete_bin(bin_id: str, user: UserInfo = Depends(require_admin)):
-    from firestore_client import delete_doc
-    delete_doc("bins", bin_id)
+    previous = await get_doc("bins", bin_id)
+    await delete_doc("bins", bin_id)
+    if previous:
+        await run_sync(aggregates.record_bin_deleted, previous.get("status", "active"))
     return APIResponse(success=True, message="Bin deleted")
 
 def _award_points(uid: str, points: int):
@@ -92,3 +143,4 @@ def _award_points(uid: str, points: int):
     else:
         increment_field("gamification", uid, "total_points", points)
         increment_field("gamification", uid, "weekly_points", points)
+    schedule_refresh()
@@ -1,12 +1,40 @@
 """WASTE IQ – Classification Router"""
 
+import os
+import json
+import asyncio
+from typing import List
+
 from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from auth import get_current_user, UserInfo
-from firestore_client import query_collection
-from models import APIResponse
+from firestore_async import count_by, run_sync
+from models import APIResponse, WasteCategory
+import aggregates
+from inference_pool import PoolSaturated, UserBusy
+from waste_classifier import ImageRejected, check_image_header
+from pagination import paginate
 
 router = APIRouter()   # ← MUST BE BEFORE ANY @router decorators
 
+MAX_IMAGE_BYTES    = 10 * 1024 * 1024
+CLASSIFY_BATCH_MAX = int(os.getenv("CLASSIFY_BATCH_MAX", "50"))
+
+
+def _busy(exc: Exception) -> HTTPException:
+    """Map inference-pool backpressure onto 429 / 503 with Retry-After."""
+    if isinstance(exc, UserBusy):
+        return HTTPException(
+            status_code=429,
+            detail="You already have classifications in progress. Please wait for them to finish.",
+            headers={"Retry-After": "2"},
+        )
+    return HTTPException(
+        status_code=503,
+        detail="Classifier is at capacity. Please retry shortly.",
+        headers={"Retry-After": "5"},
+    )
+
 
 @router.post("/", response_model=APIResponse)
 async def classify_waste(
@@ -14,13 +42,18 @@ async def classify_waste(
     file: UploadFile = File(...),
     user: UserInfo = Depends(get_current_user)
 ):
+    """Send `X-Debug-Timings: 1` to get per-stage timings (ms) in the response."""
     if not file.content_type.startswith("image/"):
         raise HTTPException(status_code=400, detail="File must be an image")
 
     img_bytes = await file.read()
 
-    if len(img_bytes) > 10 * 1024 * 1024:
+    if len(img_bytes) > MAX_IMAGE_BYTES:
         raise HTTPException(status_code=400, detail="Image too large (max 10MB)")
+    try:
+        check_image_header(img_bytes)   # dimensions from the header — nothing decoded yet
+    except ImageRejected as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     classifier = request.app.state.classifier
 
@@ -30,58 +63,131 @@ async def classify_waste(
             detail="AI model not loaded. Backend warming up."
         )
 
-    try:
-        import firestore_client as fc_module
+    import firestore_client as fc_module
 
-        result = classifier.classify_and_save(
+    try:
+        result = await request.app.state.inference_pool.run(
+            user.uid,
+            classifier.classify_and_save,
             img_bytes=img_bytes,
             uid=user.uid,
             firestore_client=fc_module,
             image_url=None,
+            timings=request.headers.get("x-debug-timings", "").lower() in ("1", "true"),
+        )
+    except (UserBusy, PoolSaturated) as e:
+        raise _busy(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return APIResponse(
+        success=True,
+        message="Classification complete",
+        data=result
+    )
+
+
+@router.post("/batch")
+async def classify_batch(
+    request: Request,
+    files: List[UploadFile] = File(...),
+    user: UserInfo = Depends(get_current_user)
+):
+    """
+    Classify many images in one request. Streams NDJSON: one
+    {"type": "result", "index": i, ...} line per image as it finishes,
+    then a {"type": "summary"} line once the batched log write commits.
+    """
+    if len(files) > CLASSIFY_BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"Too many images (max {CLASSIFY_BATCH_MAX})")
+
+    images = []
+    for f in files:
+        if not (f.content_type or "").startswith("image/"):
+            raise HTTPException(status_code=400, detail=f"{f.filename}: File must be an image")
+        data = await f.read()
+        if len(data) > MAX_IMAGE_BYTES:
+            raise HTTPException(status_code=400, detail=f"{f.filename}: Image too large (max 10MB)")
+        try:
+            check_image_header(data)
+        except ImageRejected as e:
+            raise HTTPException(status_code=400, detail=f"{f.filename}: {e}")
+        images.append(data)
+
+    classifier = request.app.state.classifier
+    if classifier is None:
+        raise HTTPException(
+            status_code=503,
+            detail="AI model not loaded. Backend warming up."
         )
 
-        return APIResponse(
-            success=True,
-            message="Classification complete",
-            data=result
+    import firestore_client as fc_module
+
+    pool = request.app.state.inference_pool
+    loop = asyncio.get_running_loop()
+    results: asyncio.Queue = asyncio.Queue()
+    emit = lambda item: loop.call_soon_threadsafe(results.put_nowait, item)
+
+    try:
+        job = pool.submit(
+            user.uid,
+            classifier.classify_and_save_batch,
+            images, user.uid, fc_module,
+            on_result=emit,
         )
+    except (UserBusy, PoolSaturated) as e:
+        raise _busy(e)
+    job.add_done_callback(lambda _: results.put_nowait(None))
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    async def stream():
+        while (item := await results.get()) is not None:
+            yield json.dumps({"type": "result", **item}, default=str) + "\n"
+        try:
+            yield json.dumps({"type": "summary", **job.result()}) + "\n"
+        except Exception as e:
+            yield json.dumps({"type": "error", "detail": str(e)[:200]}) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
 
 
 @router.get("/history", response_model=APIResponse)
 async def classification_history(
     limit: int = 50,
+    cursor: str = None,
     user: UserInfo = Depends(get_current_user)
 ):
     filters = [] if user.role == "admin" else [("uid", "==", user.uid)]
 
-    logs = query_collection(
+    # Served by the (uid ASC, timestamp DESC) composite index
+    page = await paginate(
         "waste_logs",
         filters=filters if filters else None,
+        order_by="timestamp",
+        order_desc=True,
+        limit=limit,
+        cursor=cursor,
     )
 
-    logs.sort(key=lambda x: x.get("timestamp", ""), reverse=True)
-    logs = logs[:limit]
-
-    return APIResponse(success=True, message=f"{len(logs)} records", data=logs)
+    return APIResponse(success=True, message=f"{len(page.items)} records", data=page)
 
 
 @router.get("/stats", response_model=APIResponse)
 async def classification_stats(user: UserInfo = Depends(get_current_user)):
-    filters = [] if user.role in ("admin", "municipal") else [("uid", "==", user.uid)]
-
-    logs = query_collection("waste_logs", filters=filters if filters else None)
-
-    from collections import Counter
-    categories = Counter(l.get("waste_category", "Unknown") for l in logs)
+    if user.role in ("admin", "municipal"):
+        # City-wide: maintained counters, O(1) regardless of history size
+        counters = await run_sync(aggregates.get_counters)
+        by_category = {k: v for k, v in counters.get("waste_by_category", {}).items() if v}
+    else:
+        # Per-user: one server-side COUNT() per category
+        by_category = await count_by("waste_logs", "waste_category",
+                                     [c.value for c in WasteCategory],
+                                     filters=[("uid", "==", user.uid)])
 
     return APIResponse(
         success=True,
         message="Stats computed",
         data={
-            "total_classifications": len(logs),
-            "by_category": dict(categories),
+            "total_classifications": sum(by_category.values()),
+            "by_category": by_category,
         },
     )
@@ -1,10 +1,13 @@
 """WASTE IQ – Complaints Router"""
 from fastapi import APIRouter, Depends, HTTPException
 from auth import get_current_user, require_municipal, UserInfo
-from firestore_client import get_doc, add_doc, update_doc, query_collection, increment_field, get_doc
-from models import ComplaintCreate, ComplaintResolve, APIResponse
+from firestore_async import add_doc, update_doc, query_collection, count_by, run_sync
+from models import ComplaintCreate, ComplaintResolve, ComplaintStatus, APIResponse
 from datetime import datetime, timezone
 import uuid
+import aggregates
+from pagination import paginate
+from leaderboard import schedule_refresh
 
 router = APIRouter()
 
@@ -27,16 +30,18 @@ async def submit_complaint(payload: ComplaintCreate, user: UserInfo = Depends(ge
         "resolved_at":  None,
         "resolution":   None,
     }
-    add_doc("complaints", doc)
+    await add_doc("complaints", doc)
+    await run_sync(aggregates.record_complaint, payload.ward_id, "open")
     # Award +20 points for valid complaint
     try:
-        _award_points(user.uid, 20)
+        await run_sync(_award_points, user.uid, 20)
     except Exception:
         pass
     return APIResponse(success=True, message="Complaint submitted", data=doc)
 
 @router.get("/", response_model=APIResponse)
-async def list_complaints(ward_id: str = None, status: str = None, user: UserInfo = Depends(get_current_user)):
+async def list_complaints(ward_id: str = None, status: str = None, limit: int = 100,
+                          cursor: str = None, user: UserInfo = Depends(get_current_user)):
     """List complaints filtered by role."""
     filters = []
     if user.role == "household":
@@ -45,28 +50,30 @@ async def list_complaints(ward_id: str = None, status: str = None, user: UserInf
         filters.append(("ward_id", "==", ward_id))
     if status:
         filters.append(("status", "==", status))
-    complaints = query_collection("complaints", filters=filters if filters else None,
-                                  order_by="created_at", order_desc=True, limit=100)
-    return APIResponse(success=True, message=f"{len(complaints)} complaints", data=complaints)
+    page = await paginate("complaints", filters=filters if filters else None,
+                          order_by="created_at", order_desc=True, limit=limit, cursor=cursor)
+    return APIResponse(success=True, message=f"{len(page.items)} complaints", data=page)
 
 @router.patch("/{complaint_id}/resolve", response_model=APIResponse)
 async def resolve_complaint(complaint_id: str, payload: ComplaintResolve,
                             user: UserInfo = Depends(require_municipal)):
     """Municipal/Admin: resolve a complaint."""
-    complaint = query_collection("complaints", filters=[("complaint_id", "==", complaint_id)], limit=1)
+    complaint = await query_collection("complaints", filters=[("complaint_id", "==", complaint_id)], limit=1)
     if not complaint:
         raise HTTPException(status_code=404, detail="Complaint not found")
 
     now = datetime.now(timezone.utc).isoformat()
-    update_doc("complaints", complaint[0]["_id"], {
+    await update_doc("complaints", complaint[0]["_id"], {
         "status":      "resolved",
         "resolved_at": now,
         "resolution":  payload.resolution,
         "resolved_by": user.uid,
     })
+    await run_sync(aggregates.record_complaint_status, complaint[0].get("ward_id"),
+                   complaint[0].get("status", "open"), "resolved")
     # Award +10 points to municipal officer
     try:
-        _award_points(user.uid, 10)
+        await run_sync(_award_points, user.uid, 10)
     except Exception:
         pass
     return APIResponse(success=True, message="Complaint resolved")
@@ -79,13 +86,17 @@ async def complaint_stats(ward_id: str = None, user: UserInfo = Depends(get_curr
         filters.append(("ward_id", "==", ward_id))
     elif user.role == "household":
         filters.append(("submitted_by", "==", user.uid))
-    complaints = query_collection("complaints", filters=filters if filters else None)
-    from collections import Counter
-    by_status = Counter(c.get("status", "open") for c in complaints)
+    if filters:
+        by_status = await count_by("complaints", "status",
+                                   [s.value for s in ComplaintStatus], filters=filters)
+    else:
+        counters  = await run_sync(aggregates.get_counters)
+        by_status = {k: v for k, v in counters.get("complaints_by_status", {}).items() if v}
+    total = sum(by_status.values())
     return APIResponse(success=True, message="Stats", data={
-        "total": len(complaints),
-        "by_status": dict(by_status),
-        "resolution_rate": round(by_status.get("resolved", 0) / max(len(complaints), 1) * 100, 1),
+        "total": total,
+        "by_status": by_status,
+        "resolution_rate": round(by_status.get("resolved", 0) / max(total, 1) * 100, 1),
     })
 
 def _award_points(uid: str, points: int):
@@ -96,3 +107,4 @@ def _award_points(uid: str, points: int):
     else:
         increment_field("gamification", uid, "total_points", points)
         increment_field("gamification", uid, "weekly_points", points)
+    schedule_refresh()
@@ -1,8 +1,10 @@
 """WASTE IQ – Gamification Router"""
 from fastapi import APIRouter, Depends, HTTPException
 from auth import get_current_user, require_admin, UserInfo
-from firestore_client import get_doc, set_doc, query_collection
-from models import APIResponse
+from firestore_async import get_doc, set_doc, update_doc, run_sync
+import leaderboard as lb
+from models import APIResponse, PaginatedResponse
+from pagination import clamp_limit
 from datetime import datetime, timezone
 
 router = APIRouter()
@@ -34,10 +36,11 @@ def compute_level(total_points: int) -> str:
 @router.get("/me", response_model=APIResponse)
 async def my_gamification(user: UserInfo = Depends(get_current_user)):
     """Get current user's gamification profile."""
-    gam = get_doc("gamification", user.uid)
+    gam = await get_doc("gamification", user.uid)
     if not gam:
         gam = {"uid": user.uid, "total_points": 0, "weekly_points": 0, "badges": [], "level": "Beginner"}
-        set_doc("gamification", user.uid, gam)
+        await set_doc("gamification", user.uid, gam)
+        lb.schedule_refresh()
 
     # Check and award new badges
     total = gam.get("total_points", 0)
@@ -51,30 +54,24 @@ async def my_gamification(user: UserInfo = Depends(get_current_user)):
     if new_badges:
         all_badges = gam.get("badges", []) + new_badges
         level = compute_level(total)
-        from firestore_client import update_doc
-        update_doc("gamification", user.uid, {"badges": all_badges, "level": level})
+        await update_doc("gamification", user.uid, {"badges": all_badges, "level": level})
         gam["badges"] = all_badges
         gam["level"]  = level
+        lb.schedule_refresh()  # level and badge count are in the snapshot
 
     return APIResponse(success=True, message="Gamification profile", data=gam)
 
 @router.get("/leaderboard", response_model=APIResponse)
-async def leaderboard(limit: int = 20, user: UserInfo = Depends(get_current_user)):
-    """Return top-N users by points."""
-    entries = query_collection("gamification", order_by="total_points", order_desc=True, limit=limit)
-    result = []
-    for i, e in enumerate(entries):
-        user_profile = get_doc("users", e.get("uid", "")) or {}
-        result.append({
-            "rank":         i + 1,
-            "uid":          e.get("uid"),
-            "name":         user_profile.get("name", "Anonymous"),
-            "role":         user_profile.get("role", "household"),
-            "total_points": e.get("total_points", 0),
-            "level":        e.get("level", "Beginner"),
-            "badges_count": len(e.get("badges", [])),
-        })
-    return APIResponse(success=True, message=f"Top {len(result)} users", data=result)
+async def leaderboard(limit: int = 20, cursor: str = None, user: UserInfo = Depends(get_current_user)):
+    """Return top-N users by points (first page served from the materialized snapshot)."""
+    limit = clamp_limit(limit)
+    try:
+        entries, next_cursor, page, total = await run_sync(lb.get_page, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    data = PaginatedResponse(items=entries, total=total, page=page,
+                             per_page=limit, next_cursor=next_cursor)
+    return APIResponse(success=True, message=f"Top {len(entries)} users", data=data)
 
 @router.get("/rewards", response_model=APIResponse)
 async def reward_catalog(user: UserInfo = Depends(get_current_user)):
@@ -87,7 +84,7 @@ async def reward_catalog(user: UserInfo = Depends(get_current_user)):
         {"id": "r5", "name": "Composting Kit",    "points_required": 1500, "description": "Home composting starter kit",   "icon": "♻️"},
         {"id": "r6", "name": "Recycling Award",   "points_required": 2500, "description": "Official city recycling award", "icon": "🏆"},
     ]
-    gam = get_doc("gamification", user.uid) or {"total_points": 0}
+    gam = await get_doc("gamification", user.uid) or {"total_points": 0}
     user_points = gam.get("total_points", 0)
     for item in catalog:
         item["can_redeem"] = user_points >= item["points_required"]
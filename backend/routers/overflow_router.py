@@ -1,8 +1,10 @@
 """WASTE IQ – Overflow Router"""
 from fastapi import APIRouter, Depends, HTTPException, Request
-from auth import get_current_user, require_municipal, UserInfo
-from firestore_client import query_collection
+from auth import get_current_user, require_admin, require_municipal, UserInfo
+from firestore_async import query_collection, run_blocking
 from models import OverflowInput, APIResponse
+from overflow_model import LATEST_RISK_COLLECTION
+from pagination import clamp_limit, paginate
 
 router = APIRouter()
 
@@ -10,8 +12,11 @@ router = APIRouter()
 async def predict_overflow(payload: OverflowInput, request: Request, user: UserInfo = Depends(get_current_user)):
     """Predict overflow probability for a single bin."""
     model = request.app.state.overflow_model
+    if model is None:
+        raise HTTPException(status_code=503, detail="Overflow model not loaded")
     import firestore_client as fc
-    result = model.predict_and_save(
+    result = await run_blocking(
+        model.predict_and_save,
         bin_id=payload.bin_id,
         fill_level=payload.fill_level,
         hours_since_last=payload.hours_since_last,
@@ -23,36 +28,50 @@ async def predict_overflow(payload: OverflowInput, request: Request, user: UserI
 
 @router.post("/predict-batch", response_model=APIResponse)
 async def predict_overflow_batch(ward_id: str = None, request: Request = None, user: UserInfo = Depends(require_municipal)):
-    """Municipal/Admin: run predictions for all bins in a ward (or all bins)."""
+    """Municipal/Admin: run predictions for all bins in a ward (or all bins); only changes are persisted."""
+    model = request.app.state.overflow_model
+    if model is None:
+        raise HTTPException(status_code=503, detail="Overflow model not loaded")
     filters = [("ward_id", "==", ward_id)] if ward_id else None
-    bins = query_collection("bins", filters=filters)
+    bins = await query_collection("bins", filters=filters)
     if not bins:
         return APIResponse(success=True, message="No bins found", data=[])
 
-    model = request.app.state.overflow_model
     import firestore_client as fc
-    results = model.batch_predict(bins, fc)
+    results = await run_blocking(model.batch_predict, bins, fc)
     return APIResponse(success=True, message=f"Predicted {len(results)} bins", data=results)
 
 @router.get("/history", response_model=APIResponse)
-async def overflow_history(bin_id: str = None, limit: int = 50, user: UserInfo = Depends(get_current_user)):
+async def overflow_history(bin_id: str = None, limit: int = 50, cursor: str = None,
+                           user: UserInfo = Depends(get_current_user)):
     """Get overflow prediction history."""
     filters = [("bin_id", "==", bin_id)] if bin_id else None
-    preds = query_collection("overflow_predictions", filters=filters,
-                             order_by="predicted_at", order_desc=True, limit=limit)
-    return APIResponse(success=True, message=f"{len(preds)} predictions", data=preds)
+    page = await paginate("overflow_predictions", filters=filters,
+                          order_by="predicted_at", order_desc=True, limit=limit, cursor=cursor)
+    return APIResponse(success=True, message=f"{len(page.items)} predictions", data=page)
 
 @router.get("/high-risk", response_model=APIResponse)
-async def high_risk_bins(user: UserInfo = Depends(require_municipal)):
-    """Return bins with High risk level from latest predictions."""
-    high_risk = query_collection("overflow_predictions",
-                                  filters=[("risk_level", "==", "High")],
-                                  order_by="predicted_at", order_desc=True, limit=50)
-    # Deduplicate by bin_id (latest prediction per bin)
-    seen = set()
-    unique = []
-    for p in high_risk:
-        if p["bin_id"] not in seen:
-            seen.add(p["bin_id"])
-            unique.append(p)
-    return APIResponse(success=True, message=f"{len(unique)} high-risk bins", data=unique)
+async def high_risk_bins(limit: int = 50, user: UserInfo = Depends(require_municipal)):
+    """Return bins whose latest prediction is High risk (bins_latest_risk view, one row per bin)."""
+    high_risk = await query_collection(LATEST_RISK_COLLECTION,
+                                       filters=[("risk_level", "==", "High")],
+                                       order_by="overflow_probability", order_desc=True,
+                                       limit=clamp_limit(limit))
+    return APIResponse(success=True, message=f"{len(high_risk)} high-risk bins", data=high_risk)
+
+@router.get("/model", response_model=APIResponse)
+async def overflow_model_info(request: Request, user: UserInfo = Depends(require_municipal)):
+    """Serving model version, size and offline evaluation metrics."""
+    model = request.app.state.overflow_model
+    if model is None:
+        raise HTTPException(status_code=503, detail="Overflow model not loaded")
+    return APIResponse(success=True, message=f"Serving {model.version}", data=model.info())
+
+@router.post("/model/reload", response_model=APIResponse)
+async def reload_overflow_model(request: Request, user: UserInfo = Depends(require_admin)):
+    """Admin: hot-swap this worker to the registry's LATEST version now (workers also poll)."""
+    model = request.app.state.overflow_model
+    if model is None:
+        raise HTTPException(status_code=503, detail="Overflow model not loaded")
+    info = await run_blocking(model.reload)
+    return APIResponse(success=True, message=f"Serving {info['version']}", data=info)
@@ -235,15 +235,26 @@ class RoutingService:
             "last_collected": now_iso,
             "driver_uid":     driver_uid,
         }
-        self.fc.update_doc("bins", bin_id, update)
-
-        # Log collection event
-        self.fc.add_doc("collection_logs", {
-            "bin_id":     bin_id,
-            "driver_uid": driver_uid,
-            "collected_at": now_iso,
-            "notes":      notes,
-        })
+        previous = self.fc.get_doc("bins", bin_id) or {}
+
+        # Bin update + collection log commit atomically: both or neither
+        self.fc.commit_atomic([
+            ("update", "bins", bin_id, update),
+            ("set", "collection_logs", None, {
+                "bin_id":     bin_id,
+                "driver_uid": driver_uid,
+                "collected_at": now_iso,
+                "notes":      notes,
+            }),
+        ])
+
+        from aggregates import record_bin_status
+        record_bin_status(previous.get("status"), "collected")
+        try:
+            from fill_series import record_collection
+            record_collection(bin_id)
+        except Exception:
+            pass
 
         # Award points (+5 per collection)
         try:
@@ -294,3 +305,5 @@ def _award_driver_points(uid: str, points: int, fc) -> None:
     else:
         fc.increment_field("gamification", uid, "total_points", points)
         fc.increment_field("gamification", uid, "weekly_points", points)
+    from leaderboard import schedule_refresh
+    schedule_refresh()
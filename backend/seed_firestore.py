@@ -10,6 +10,8 @@ from datetime import datetime, timezone, timedelta
 import firebase_admin
 from firebase_admin import credentials, firestore, auth as firebase_auth
 
+from firestore_client import bulk_set
+
 # ─────────────────────────────────────────────────────────────
 # Initialize Firebase using local JSON key
 # ─────────────────────────────────────────────────────────────
@@ -98,9 +100,10 @@ def seed_wards():
 
 def seed_bins(driver_uid):
     print("\nSeeding bins...")
+    docs = {}
     for b in BINS_DATA:
         bid = str(uuid.uuid4())
-        db.collection("bins").document(bid).set({
+        docs[bid] = {
             "bin_id": bid,
             "ward_id": b["ward_id"],
             "location": {
@@ -112,8 +115,15 @@ def seed_bins(driver_uid):
             "status": "overflow" if b["fill"] >= 80 else "active",
             "assigned_driver": driver_uid,
             "created_at": datetime.now(timezone.utc).isoformat(),
-        })
-        print(f"+ Bin at {b['address']}")
+        }
+
+    errors = bulk_set("bins", docs)
+    failed = {e["doc_id"] for e in errors}
+    for bid, doc in docs.items():
+        if bid in failed:
+            print(f"✗ Bin at {doc['location']['address']} failed")
+        else:
+            print(f"+ Bin at {doc['location']['address']}")
 
 
 # ─────────────────────────────────────────────────────────────
@@ -139,6 +149,10 @@ if __name__ == "__main__":
     seed_wards()
     seed_bins(uids.get("driver"))
 
+    from aggregates import rebuild
+    rebuild()
+    print("\n+ City counters rebuilt")
+
     print("\n✅ Seeding complete!\n")
     print("Login credentials:")
     print("Household : household@wasteiq.demo / demo1234")
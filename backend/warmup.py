@@ -0,0 +1,86 @@
+"""
+WASTE IQ – Model Warmup & Readiness
+Loads every model at startup and pushes one dummy input through each, so
+the first real request never pays for an import, a weights download or a
+cold cache. Runs in the background after startup: /health answers at once
+(liveness), /ready returns 503 until every stage has finished warm, and
+stays 503 with the per-stage errors if any stage failed (readiness).
+
+Stages and their load times are reported by /ready:
+    yolo      — YOLO weights loaded + dummy inference in each YOLO worker
+    matcher   — rapidfuzz import + exact/fuzzy/substring lookups
+    overflow  — overflow model loaded + one prediction
+
+WARMUP=0 skips warmup and reports ready immediately.
+"""
+
+import os
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict
+
+WARMUP_ENABLED = os.getenv("WARMUP", "1") not in ("0", "false", "no")
+
+_state: Dict = {
+    "ready":       False,
+    "started_at":  None,
+    "finished_at": None,
+    "models":      {},
+}
+
+
+def _stage(name: str, fn: Callable) -> None:
+    print(f"⏳ Warming {name}...")
+    t0 = time.perf_counter()
+    entry = _state["models"].setdefault(name, {})
+    entry["status"] = "loading"
+    try:
+        detail = fn()
+        entry.update(status="ok", load_ms=round((time.perf_counter() - t0) * 1000, 1))
+        if detail is not None:
+            entry["detail"] = detail
+        print(f"✅ {name} warm in {entry['load_ms']:.0f} ms")
+    except Exception as e:
+        entry.update(status="failed", load_ms=round((time.perf_counter() - t0) * 1000, 1),
+                     error=str(e)[:200])
+        print(f"⚠️  {name} warmup failed: {e}")
+
+
+def record_init(name: str, init_ms: float) -> None:
+    """Constructor time measured in startup_event, shown next to the warmup time."""
+    _state["models"].setdefault(name, {})["init_ms"] = round(init_ms, 1)
+
+
+def _warm_matcher() -> None:
+    from waste_classifier import _map_to_category
+    # exact hit, fuzzy hit, substring hit — touches every local branch, never Gemini
+    for name in ("plastic bottle", "plastik botle", "old cardboard box lid"):
+        _map_to_category(name)
+
+
+def _warm_overflow(model) -> None:
+    if model is None:
+        raise RuntimeError("OverflowModel not loaded")
+    model.predict(fill_level=50.0, hours_since_last=24.0, population_density=1000.0)
+
+
+def run(app) -> None:
+    """Blocking — call off the event loop. Never raises; failures are recorded per stage."""
+    _state["started_at"] = datetime.now(timezone.utc).isoformat()
+    if WARMUP_ENABLED:
+        from waste_classifier import warmup_yolo
+        if app.state.classifier is not None:
+            _stage("yolo", lambda: {"worker_ms": warmup_yolo()})
+            _stage("matcher", _warm_matcher)
+        _stage("overflow", lambda: _warm_overflow(app.state.overflow_model))
+    _state["finished_at"] = datetime.now(timezone.utc).isoformat()
+    failed = [name for name, m in _state["models"].items() if m.get("status", "ok") != "ok"]
+    if failed:
+        print(f"🔴 Warmup failed for {', '.join(failed)} — /ready stays 503")
+        return
+    _state["ready"] = True
+    print("🟢 Models warm — /ready is green")
+
+
+def status() -> Dict:
+    return {**_state, "models": {k: dict(v) for k, v in _state["models"].items()}}
@@ -1,6 +1,6 @@
 """
 WASTE IQ — Strict 2-Phase Vision Pipeline
-Phase 1: Gemini object detection (with retry on 429) OR HuggingFace CLIP fallback
+Phase 1: Gemini object detection (RPM-limited, circuit-broken) OR local YOLO fallback
 Phase 2: Deterministic Python waste mapping
 """
 
@@ -8,14 +8,45 @@ import io
 import os
 import json
 import time
+import sqlite3
+import hashlib
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime, timezone
-from typing import Dict, List, Optional
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 from pathlib import Path
 
+import numpy as np
 from PIL import Image
 
+import metrics
+from matcher import KeywordMatcher
+
 _ENV_FILE = Path(__file__).parent.parent / ".env"
 _YOLO_MODEL = None  # Lazy-loaded
+_YOLO_TABLE = None  # class index → category table, built with the model
+
+# YOLO is CPU-bound and holds the GIL — run it in worker processes so it
+# can't stall the API threads. 0 → run in the calling thread.
+YOLO_ENGINE    = os.getenv("YOLO_ENGINE", "torch").lower()   # torch | onnx (see yolo_onnx.py)
+YOLO_PROCESSES = int(os.getenv("YOLO_PROCESSES", "1"))
+YOLO_TIMEOUT_S = float(os.getenv("YOLO_TIMEOUT", "30"))
+
+# Uploads: refuse by header dimensions before decoding; decode once at ≤ this size
+MAX_IMAGE_PIXELS = int(os.getenv("MAX_IMAGE_PIXELS", str(40_000_000)))
+PREPARED_MAX_PX  = 1024
+# mass: pick the category with the most top-k probability; top1: category of the top class only
+YOLO_CATEGORY_MODE = os.getenv("YOLO_CATEGORY_MODE", "mass").lower()
+YOLO_TOPK          = int(os.getenv("YOLO_TOPK", "5"))
+
+# Batch classification
+BATCH_DECODE_THREADS     = int(os.getenv("CLASSIFY_BATCH_DECODE_THREADS", "4"))
+GEMINI_BATCH_CONCURRENCY = int(os.getenv("GEMINI_BATCH_CONCURRENCY", "4"))
+_YOLO_POOL: Optional[ProcessPoolExecutor] = None
+_YOLO_POOL_LOCK = threading.Lock()
 
 
 # ══════════════════════════════════════════════════════════════════════════════
@@ -140,6 +171,7 @@ WASTE_MAP: Dict[str, str] = {
     "textile": "Dry Waste", "clothing": "Dry Waste", "shoe": "Dry Waste",
     "toothbrush": "Dry Waste", "pen": "Dry Waste", "pencil": "Dry Waste",
 }
+_WASTE_MATCHER = KeywordMatcher(WASTE_MAP)   # compiled once; see matcher.py
 
 # Material/texture words → indicates bad detection response
 _MATERIAL_WORDS = {
@@ -150,20 +182,80 @@ _MATERIAL_WORDS = {
 }
 
 
-def _read_key() -> str:
+def _read_key(env_file: Path = _ENV_FILE) -> str:
     try:
         from dotenv import dotenv_values
-        return dotenv_values(_ENV_FILE).get("GEMINI_API_KEY", "").strip()
+        return dotenv_values(env_file).get("GEMINI_API_KEY", "").strip()
     except Exception:
         return os.getenv("GEMINI_API_KEY", "").strip()
 
 
-def _resize_image(img_bytes: bytes, max_px: int = 1024) -> bytes:
-    img = Image.open(io.BytesIO(img_bytes)).convert("RGB")
-    img.thumbnail((max_px, max_px), Image.LANCZOS)
-    buf = io.BytesIO()
-    img.save(buf, format="JPEG", quality=92)
-    return buf.getvalue()
+class ImageRejected(ValueError):
+    """Upload isn't a usable image (undecodable, or too many pixels)."""
+
+
+def _open_checked(img_bytes: bytes) -> Image.Image:
+    """Lazily open an upload (header only, no pixels) and enforce the pixel cap."""
+    try:
+        img = Image.open(io.BytesIO(img_bytes))
+    except Exception:
+        raise ImageRejected("Could not decode image")
+    w, h = img.size
+    if w * h > MAX_IMAGE_PIXELS:
+        raise ImageRejected(f"Image too large ({w}×{h}, max {MAX_IMAGE_PIXELS // 1_000_000} MP)")
+    return img
+
+
+def check_image_header(img_bytes: bytes) -> tuple:
+    """
+    (format, width, height) from the header alone, or ImageRejected — lets
+    callers refuse decompression bombs before anything is decoded.
+    """
+    img = _open_checked(img_bytes)
+    return (img.format, *img.size)
+
+
+class _PreparedImage:
+    """
+    An upload decoded exactly once. JPEGs are decoded straight at reduced
+    scale via Image.draft (DCT-domain downscaling), then capped at
+    PREPARED_MAX_PX. Every engine takes a view of this one RGB image:
+    Gemini gets `.jpeg`, YOLO gets `.image`, the result cache `.dhash`.
+    """
+
+    def __init__(self, img_bytes: bytes):
+        img = _open_checked(img_bytes)
+        self.raw = img_bytes
+        self.sha = hashlib.sha256(img_bytes).hexdigest()
+        self.format, self.original_size, original_mode = img.format, img.size, img.mode
+        img.draft("RGB", (PREPARED_MAX_PX, PREPARED_MAX_PX))   # no-op for non-JPEG
+        try:
+            img = img.convert("RGB")
+        except Exception:
+            raise ImageRejected("Could not decode image")
+        if max(img.size) > PREPARED_MAX_PX:
+            img.thumbnail((PREPARED_MAX_PX, PREPARED_MAX_PX), Image.LANCZOS)
+        self.image = img
+        self.dhash = _dhash(img)
+        # Small RGB JPEGs go to Gemini as uploaded — no re-encode
+        self._jpeg = img_bytes if (self.format == "JPEG" and original_mode == "RGB"
+                                   and img.size == self.original_size) else None
+
+    @property
+    def jpeg(self) -> bytes:
+        if self._jpeg is None:
+            buf = io.BytesIO()
+            self.image.save(buf, format="JPEG", quality=92)
+            self._jpeg = buf.getvalue()
+        return self._jpeg
+
+
+def _prepare(img_bytes: bytes):
+    """_PreparedImage, or the error message if the upload is unusable."""
+    try:
+        return _PreparedImage(img_bytes)
+    except ImageRejected as e:
+        return str(e)
 
 
 def _is_material_response(name: str) -> bool:
@@ -176,6 +268,204 @@ def _is_material_response(name: str) -> bool:
     return any(p in name_lower for p in reject)
 
 
+# ══════════════════════════════════════════════════════════════════════════════
+# GEMINI CLIENT (one long-lived client; key re-read only when .env changes)
+# ══════════════════════════════════════════════════════════════════════════════
+
+GEMINI_MODEL = "gemini-2.0-flash"
+
+GEMINI_RPM              = float(os.getenv("GEMINI_RPM", "15"))         # quota, requests/minute
+GEMINI_BURST            = float(os.getenv("GEMINI_BURST", "5"))
+GEMINI_BREAKER_FAILURES = int(os.getenv("GEMINI_BREAKER_FAILURES", "5"))
+GEMINI_BREAKER_COOLDOWN = float(os.getenv("GEMINI_BREAKER_COOLDOWN", "30"))  # seconds open
+
+
+class GeminiUnavailable(RuntimeError):
+    """Gemini was not attempted (quota exhausted locally or breaker open) — use YOLO."""
+
+
+class _TokenBucket:
+    """Non-blocking token bucket: try_acquire() never sleeps, it just says no."""
+
+    def __init__(self, rpm: float = GEMINI_RPM, burst: float = GEMINI_BURST):
+        self.rate = rpm / 60.0
+        self.capacity = max(1.0, min(burst, rpm))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+    def drain(self) -> None:
+        """Server said 429 — our view of the quota was optimistic; start from empty."""
+        with self._lock:
+            self._tokens = 0.0
+            self._last = time.monotonic()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            self._refill()
+            return {"rpm": round(self.rate * 60, 1), "burst": self.capacity, "tokens": round(self._tokens, 2)}
+
+
+class _CircuitBreaker:
+    """
+    closed → (N consecutive failures) → open → (cooldown) → half_open:
+    one probe call is let through; success closes, failure re-opens.
+    """
+
+    def __init__(self, threshold: int = GEMINI_BREAKER_FAILURES, cooldown: float = GEMINI_BREAKER_COOLDOWN):
+        self.threshold, self.cooldown = threshold, cooldown
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._opens = 0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.cooldown:
+                self.state, self._probing = "half_open", False
+            if self.state == "closed":
+                return True
+            if self.state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def cancel(self) -> None:
+        """An allowed call was not made after all — free the half-open probe slot."""
+        with self._lock:
+            self._probing = False
+
+    def record(self, ok: bool) -> None:
+        with self._lock:
+            if ok:
+                self.state, self._failures, self._probing = "closed", 0, False
+                return
+            self._failures += 1
+            if self.state == "half_open" or self._failures >= self.threshold:
+                if self.state != "open":
+                    self._opens += 1
+                    print(f"🔌 Gemini circuit OPEN after {self._failures} failure(s) — YOLO only for {self.cooldown:.0f}s")
+                self.state, self._opened_at, self._probing = "open", time.monotonic(), False
+
+    def stats(self) -> Dict:
+        with self._lock:
+            retry_in = self.cooldown - (time.monotonic() - self._opened_at) if self.state == "open" else 0
+            return {"state": self.state, "consecutive_failures": self._failures,
+                    "times_opened": self._opens, "retry_in_s": round(max(retry_in, 0), 1)}
+
+
+class _GeminiSession:
+    """
+    Holds one genai.Client for the process, so its HTTP connection pool
+    (keep-alive, TLS session) is reused across requests. The API key is
+    re-read from .env only when the file's mtime changes; a new key swaps
+    in a new client. Also keeps per-call latency stats.
+    """
+
+    def __init__(self, env_file: Path = _ENV_FILE):
+        self._env_file = env_file
+        self._lock = threading.Lock()
+        self._mtime: Optional[int] = None
+        self._key = ""
+        self._client = None
+        self._client_key = None
+        self._latency: Dict[str, Dict] = {}
+        self.limiter = _TokenBucket()
+        self.breaker = _CircuitBreaker()
+        self._shed = {"rate_limited": 0, "breaker_open": 0}
+
+    def api_key(self) -> str:
+        try:
+            mtime = self._env_file.stat().st_mtime_ns
+        except OSError:
+            mtime = -1
+        if mtime != self._mtime:
+            with self._lock:
+                if mtime != self._mtime:
+                    self._key = _read_key(self._env_file)
+                    self._mtime = mtime
+        return self._key
+
+    def client(self, api_key: str):
+        with self._lock:
+            if self._client is None or self._client_key != api_key:
+                from google import genai
+                self._client = genai.Client(api_key=api_key)
+                self._client_key = api_key
+            return self._client
+
+    def _shed_call(self, reason: str) -> None:
+        with self._lock:
+            self._shed[reason] += 1
+        raise GeminiUnavailable(f"Gemini skipped ({reason.replace('_', ' ')})")
+
+    def generate(self, call: str, api_key: str, **kwargs):
+        """
+        client.models.generate_content behind the breaker and the RPM bucket,
+        with latency recorded under `call`. Raises GeminiUnavailable instead
+        of calling when either says no.
+        """
+        if not self.breaker.allow():
+            self._shed_call("breaker_open")
+        if not self.limiter.try_acquire():
+            self.breaker.cancel()
+            self._shed_call("rate_limited")
+        client = self.client(api_key)
+        t0 = time.perf_counter()
+        ok = False
+        try:
+            resp = client.models.generate_content(model=GEMINI_MODEL, **kwargs)
+            ok = True
+            return resp
+        except Exception as e:
+            if _is_rate_limit(e):
+                self.limiter.drain()
+            raise
+        finally:
+            self.breaker.record(ok)
+            ms = (time.perf_counter() - t0) * 1000
+            with self._lock:
+                st = self._latency.setdefault(call, {"calls": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0})
+                st["calls"] += 1
+                st["errors"] += 0 if ok else 1
+                st["total_ms"] += ms
+                st["max_ms"] = max(st["max_ms"], ms)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            latency = {
+                call: {"calls": st["calls"], "errors": st["errors"],
+                       "avg_ms": round(st["total_ms"] / st["calls"], 1), "max_ms": round(st["max_ms"], 1)}
+                for call, st in self._latency.items()
+            }
+            shed = dict(self._shed)
+        return {"latency": latency, "limiter": self.limiter.stats(),
+                "breaker": self.breaker.stats(), "shed": shed}
+
+
+def _is_rate_limit(e: Exception) -> bool:
+    err = str(e)
+    return "429" in err or "resource exhausted" in err.lower()
+
+
+_GEMINI = _GeminiSession()
+
+
 # ══════════════════════════════════════════════════════════════════════════════
 # PHASE 1 — OBJECT DETECTION
 # ══════════════════════════════════════════════════════════════════════════════
@@ -206,46 +496,39 @@ Return ONLY JSON: {"object_name": "<specific name>", "confidence": <0-100>}"""
 
 
 def _gemini_detect(img_data: bytes, api_key: str, prompt: str) -> dict:
-    """Detect object via Gemini with exponential backoff on 429."""
-    from google import genai
+    """
+    Detect object via Gemini. No retry-with-sleep on 429: the limiter has
+    already been drained and the caller falls back to YOLO straight away.
+    """
     from google.genai import types
 
-    client = genai.Client(api_key=api_key)
-
-    for attempt in range(3):
-        try:
-            resp = client.models.generate_content(
-                model="gemini-2.0-flash",
-                contents=[
-                    types.Part.from_bytes(data=img_data, mime_type="image/jpeg"),
-                    prompt,
-                ],
-                config=types.GenerateContentConfig(
-                    response_mime_type="application/json",
-                    temperature=0.05,
-                ),
-            )
-            text = resp.text.strip()
-            if "```" in text:
-                for part in text.split("```"):
-                    p = part.strip().lstrip("json").strip()
-                    if p.startswith("{"):
-                        text = p
-                        break
-            return json.loads(text)
-
-        except Exception as e:
-            err_str = str(e)
-            if "429" in err_str or "Resource exhausted" in err_str.lower():
-                # For a live web UI, we can't wait 45 seconds.
-                # Just wait 1s, 2s. If it still fails, fall back to YOLO immediately.
-                wait = attempt + 1  # 1s, 2s
-                print(f"⏳ Gemini rate limited (attempt {attempt+1}/3) — waiting {wait}s...")
-                time.sleep(wait)
-                continue
-            raise  # Non-429 error → raise immediately
-
-    raise RuntimeError("Gemini rate limit exceeded after 3 retries. Please wait 1 minute.")
+    try:
+        resp = _GEMINI.generate(
+            "detect", api_key,
+            contents=[
+                types.Part.from_bytes(data=img_data, mime_type="image/jpeg"),
+                prompt,
+            ],
+            config=types.GenerateContentConfig(
+                response_mime_type="application/json",
+                temperature=0.05,
+            ),
+        )
+    except GeminiUnavailable:
+        raise
+    except Exception as e:
+        if _is_rate_limit(e):
+            raise RuntimeError(f"Gemini rate limited: {e}")
+        raise  # Non-429 error → raise immediately
+
+    text = resp.text.strip()
+    if "```" in text:
+        for part in text.split("```"):
+            p = part.strip().lstrip("json").strip()
+            if p.startswith("{"):
+                text = p
+                break
+    return json.loads(text)
 
 
 # ══════════════════════════════════════════════════════════════════════════════
@@ -337,86 +620,127 @@ _IMAGENET_WASTE: Dict[str, tuple] = {
     "pill bottle": ("Medicine", "Hazardous Waste"),
     "medicine cabinet": ("Medicine", "Hazardous Waste"),
 }
+_IMAGENET_MATCHER = KeywordMatcher(_IMAGENET_WASTE)
 
 
 def _get_yolo_model():
     """Lazy-load YOLOv8-nano classification model (cached after first load)."""
-    global _YOLO_MODEL
+    global _YOLO_MODEL, _YOLO_TABLE
     if _YOLO_MODEL is None:
         try:
-            from ultralytics import YOLO
-            _YOLO_MODEL = YOLO("yolov8n-cls.pt")  # 6MB, downloads once
-            print("🤖 YOLOv8-nano classification model loaded")
+            if YOLO_ENGINE == "onnx":
+                from yolo_onnx import OnnxClassifier   # no torch import on this path
+                _YOLO_MODEL = OnnxClassifier()
+                print(f"🤖 YOLOv8-nano ONNX model loaded ({_YOLO_MODEL.path.name})")
+            else:
+                from ultralytics import YOLO
+                _YOLO_MODEL = YOLO("yolov8n-cls.pt")  # 6MB, downloads once
+                print("🤖 YOLOv8-nano classification model loaded")
+            # ultralytics builds a new `names` dict per access — snapshot it once
+            _YOLO_TABLE = _ClassTable(dict(_YOLO_MODEL.names))
         except Exception as e:
             print(f"❌ Failed to load YOLO model: {e}")
             _YOLO_MODEL = False  # Mark as failed
     return _YOLO_MODEL if _YOLO_MODEL else None
 
 
-def _yolo_classify(img_bytes: bytes) -> dict:
+def _yolo_classify(img: Image.Image) -> dict:
     """
     Local YOLOv8-nano (1000 ImageNet classes) as offline fallback.
     No API call, no internet needed after first model download.
+    Takes the already-decoded image (see _PreparedImage).
+    """
+    model = _get_yolo_model()
+    if not model:
+        raise RuntimeError("YOLO model unavailable")
+
+    return _yolo_result(_yolo_probs(model, [img])[0], _YOLO_TABLE)
+
+
+def _yolo_classify_batch(imgs: List[Image.Image]) -> List[dict]:
+    """
+    YOLO over many decoded images in one forward pass (ultralytics stacks a
+    list source into one batch tensor; ONNX runs one stacked array).
     """
     model = _get_yolo_model()
     if not model:
         raise RuntimeError("YOLO model unavailable")
 
-    img = Image.open(io.BytesIO(img_bytes)).convert("RGB")
-    results = model(img, verbose=False)
-    result = results[0]
+    return [_yolo_result(p, _YOLO_TABLE) for p in _yolo_probs(model, imgs)]
 
-    # Get top-5 predictions
-    probs = result.probs
-    names = model.names
 
-    top5_idx   = probs.top5
-    top5_conf  = probs.top5conf.tolist()
+def _yolo_probs(model, imgs: List[Image.Image]) -> np.ndarray:
+    """Class probabilities, shape (N, num_classes), for either engine."""
+    if YOLO_ENGINE == "onnx":
+        return model.probs(imgs)
+    return np.stack([r.probs.data.cpu().numpy() for r in model(imgs, verbose=False)])
 
-    top_label = names[top5_idx[0]].lower()
-    top_conf  = round(top5_conf[0] * 100, 1)
 
-    alternatives = [
-        {"name": names[top5_idx[i]].replace("-", " ").title(), "confidence": round(top5_conf[i] * 100, 1)}
-        for i in range(1, min(4, len(top5_idx)))
-    ]
+_CATEGORIES = list(BIN_COLORS)                      # category index order for the table
+_GENERAL    = _CATEGORIES.index("General Waste")
 
-    # 1. Check ImageNet→waste map
-    for key, (display, cat) in _IMAGENET_WASTE.items():
-        if key in top_label or top_label in key:
-            instructions, tip = DISPOSAL[cat]
-            return {
-                "object_name":           display,
-                "waste_category":        cat,
-                "confidence":            top_conf,
-                "disposal_instructions": instructions,
-                "recycling_tip":         tip,
-                "alternatives":          alternatives,
-                "mode":                  "yolo_local",
-            }
 
+def _label_to_waste(label: str) -> tuple:
+    """One ImageNet label → (display name, category) — run once per class, not per request."""
+    # 1. ImageNet→waste map
+    i = _IMAGENET_MATCHER.related(label)
+    if i is not None:
+        return _IMAGENET_MATCHER.values[i]
     # 2. Keyword scan using waste map
-    for keyword, cat in WASTE_MAP.items():
-        if keyword in top_label:
-            instructions, tip = DISPOSAL[cat]
-            display = top_label.replace("-", " ").replace(",", "").title()
-            return {
-                "object_name":           display,
-                "waste_category":        cat,
-                "confidence":            top_conf,
-                "disposal_instructions": instructions,
-                "recycling_tip":         tip,
-                "alternatives":          alternatives,
-                "mode":                  "yolo_local",
-            }
+    i = _WASTE_MATCHER.contained_in(label)
+    if i is not None:
+        return label.replace("-", " ").replace(",", "").title(), _WASTE_MATCHER.values[i]
+    # 3. Use label as-is → General Waste
+    return label.split(",")[0].replace("-", " ").title(), "General Waste"
 
-    # 3. Use top label as-is → General Waste
-    display = top_label.split(",")[0].replace("-", " ").title()
-    instructions, tip = DISPOSAL["General Waste"]
+
+class _ClassTable:
+    """Model class index → (display name, category index), for the model's fixed vocabulary."""
+
+    def __init__(self, names: Dict[int, str]):
+        self.names = names
+        size = max(names) + 1
+        self.display = [""] * size
+        self.category = np.full(size, _GENERAL, dtype=np.intp)
+        for idx, name in names.items():
+            display, cat = _label_to_waste(name.lower())
+            self.display[idx] = display
+            self.category[idx] = _CATEGORIES.index(cat)
+
+
+def _yolo_result(probs: np.ndarray, table: _ClassTable) -> dict:
+    """
+    Turn one image's class probabilities into a waste result. In "mass"
+    mode the top-k probabilities are summed per category (np.bincount over
+    the lookup table) and the heaviest category wins — three bottle-ish
+    classes at 20% each beat one unrelated class at 30%. Confidence is
+    then that category's share of the probability mass.
+    """
+    names = table.names
+    k = max(1, min(YOLO_TOPK, probs.shape[0]))
+    top = np.argpartition(-probs, k - 1)[:k]
+    top = top[np.argsort(-probs[top])]
+
+    alternatives = [
+        {"name": names[int(i)].replace("-", " ").title(), "confidence": round(float(probs[i]) * 100, 1)}
+        for i in top[1:4]
+    ]
+
+    if YOLO_CATEGORY_MODE == "top1":
+        best = int(top[0])
+        cat_idx, conf = int(table.category[best]), float(probs[best])
+    else:
+        mass = np.bincount(table.category[top], weights=probs[top], minlength=len(_CATEGORIES))
+        cat_idx = int(np.argmax(mass))
+        conf = float(mass[cat_idx])
+        best = int(top[table.category[top] == cat_idx][0])   # likeliest class in that category
+
+    cat = _CATEGORIES[cat_idx]
+    instructions, tip = DISPOSAL[cat]
     return {
-        "object_name":           display,
-        "waste_category":        "General Waste",
-        "confidence":            top_conf,
+        "object_name":           table.display[best],
+        "waste_category":        cat,
+        "confidence":            round(conf * 100, 1),
         "disposal_instructions": instructions,
         "recycling_tip":         tip,
         "alternatives":          alternatives,
@@ -424,84 +748,138 @@ def _yolo_classify(img_bytes: bytes) -> dict:
     }
 
 
+def _yolo_pool() -> Optional[ProcessPoolExecutor]:
+    global _YOLO_POOL
+    if YOLO_PROCESSES <= 0:
+        return None
+    with _YOLO_POOL_LOCK:
+        if _YOLO_POOL is None:
+            # spawn: never fork a process that already holds threads / gRPC channels
+            _YOLO_POOL = ProcessPoolExecutor(max_workers=YOLO_PROCESSES,
+                                             mp_context=multiprocessing.get_context("spawn"))
+        return _YOLO_POOL
+
+
+def _in_yolo_process(fn, arg, timeout: float):
+    """Run fn(arg) in the YOLO worker process (model stays loaded there)."""
+    global _YOLO_POOL
+    pool = _yolo_pool()
+    if pool is None:
+        return fn(arg)
+    try:
+        return pool.submit(fn, arg).result(timeout=timeout)
+    except BrokenProcessPool:
+        # Worker died (OOM, segfault) — drop the pool so the next call respawns it,
+        # unless a concurrent caller already replaced it
+        with _YOLO_POOL_LOCK:
+            if _YOLO_POOL is pool:
+                _YOLO_POOL = None
+        raise RuntimeError("YOLO worker process crashed")
 
-# ══════════════════════════════════════════════════════════════════════════════
-# PHASE 2 — DETERMINISTIC WASTE MAPPING
-# ══════════════════════════════════════════════════════════════════════════════
 
-def _map_to_category(object_name: str, api_key: str = "") -> str:
-    """Map object name → waste category. Python-first, Gemini only for unknowns."""
-    from rapidfuzz import process, fuzz
+def _run_yolo(img: Image.Image) -> dict:
+    return _in_yolo_process(_yolo_classify, img, YOLO_TIMEOUT_S)
+
+
+def _run_yolo_batch(images: List[Image.Image]) -> List[dict]:
+    return _in_yolo_process(_yolo_classify_batch, images, YOLO_TIMEOUT_S * max(1, len(images) // 8))
+
+
+def _yolo_warmup(_=None) -> float:
+    """Load YOLO and run one dummy inference in this process; returns ms taken."""
+    t0 = time.perf_counter()
+    model = _get_yolo_model()
+    if not model:
+        raise RuntimeError("YOLO model unavailable")
+    # dummy forward pass through the full result path
+    _yolo_result(_yolo_probs(model, [Image.new("RGB", (224, 224), (127, 127, 127))])[0], _YOLO_TABLE)
+    return round((time.perf_counter() - t0) * 1000, 1)
+
+
+def warmup_yolo(timeout: float = 300) -> List[float]:
+    """
+    Warm every YOLO worker (or this process when YOLO_PROCESSES=0) so the
+    first fallback request doesn't pay model download + load. Returns ms per
+    call. Warmups are submitted together, one per worker, but the executor
+    does not pin tasks to workers: a worker that finishes first may take a
+    second one and leave another cold. A cold worker just loads on its
+    first request.
+    """
+    pool = _yolo_pool()
+    if pool is None:
+        return [_yolo_warmup()]
+    futures = [pool.submit(_yolo_warmup) for _ in range(YOLO_PROCESSES)]
+    return [f.result(timeout=timeout) for f in futures]
+
 
-    obj_lower = object_name.lower().strip()
+def shutdown_yolo_pool() -> None:
+    global _YOLO_POOL
+    with _YOLO_POOL_LOCK:
+        pool, _YOLO_POOL = _YOLO_POOL, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
 
-    if obj_lower in WASTE_MAP:
-        return WASTE_MAP[obj_lower]
 
-    match = process.extractOne(obj_lower, list(WASTE_MAP.keys()),
-                               scorer=fuzz.WRatio, score_cutoff=75)
-    if match:
-        return WASTE_MAP[match[0]]
 
-    for keyword, category in WASTE_MAP.items():
-        if keyword in obj_lower:
-            return category
+# ══════════════════════════════════════════════════════════════════════════════
+# PHASE 2 — DETERMINISTIC WASTE MAPPING
+# ══════════════════════════════════════════════════════════════════════════════
 
-    for keyword, category in WASTE_MAP.items():
-        if obj_lower in keyword:
-            return category
+def _map_to_category(object_name: str, api_key: str = "") -> str:
+    """Map object name → waste category. Python-first, Gemini only for unknowns."""
+    # exact → fuzzy → keyword-in-name → name-in-keyword, memoized per label
+    with metrics.span("category_map"):
+        category = _WASTE_MATCHER.lookup(object_name.lower().strip())
+    if category:
+        return category
 
     if api_key:
-        return _gemini_category_step(object_name, api_key)
+        with metrics.span("gemini_category"):
+            return _gemini_category_step(object_name, api_key)
 
     return "General Waste"
 
 
 def _gemini_category_step(object_name: str, api_key: str) -> str:
     """Text-only Gemini call — classify unknown object into waste category."""
-    from google import genai
     from google.genai import types
 
-    client = genai.Client(api_key=api_key)
     prompt = (
         f'Object: "{object_name}"\n'
         "Classify into exactly one: Wet Waste | Dry Waste | Recyclable | Hazardous Waste | E-Waste | General Waste\n"
         'Return JSON only: {"category": "<category>"}'
     )
-    for attempt in range(2):
-        try:
-            resp = client.models.generate_content(
-                model="gemini-2.0-flash",
-                contents=[prompt],
-                config=types.GenerateContentConfig(
-                    response_mime_type="application/json", temperature=0.0),
-            )
-            cat = json.loads(resp.text.strip()).get("category", "General Waste")
-            return cat if cat in VALID_CATEGORIES else "General Waste"
-        except Exception as e:
-            if "429" in str(e) and attempt == 0:
-                print("⏳ Gemini category rate limited — waiting 1s...")
-                time.sleep(1)
-                continue
-            return "General Waste"
-    return "General Waste"
+    try:
+        resp = _GEMINI.generate(
+            "category", api_key,
+            contents=[prompt],
+            config=types.GenerateContentConfig(
+                response_mime_type="application/json", temperature=0.0),
+        )
+        cat = json.loads(resp.text.strip()).get("category", "General Waste")
+        return cat if cat in VALID_CATEGORIES else "General Waste"
+    except Exception:
+        # Rate limited, breaker open or bad reply — don't stall the request
+        return "General Waste"
 
 
 # ══════════════════════════════════════════════════════════════════════════════
 # MAIN CLASSIFY
 # ══════════════════════════════════════════════════════════════════════════════
 
-def _classify_gemini(img_bytes: bytes, api_key: str) -> Dict:
+def _classify_gemini(prepared: "_PreparedImage", api_key: str) -> Dict:
     """Phase 1: Gemini detect → Phase 2: Python mapping."""
-    img_data = _resize_image(img_bytes)
+    img_data = prepared.jpeg
 
-    detected = _gemini_detect(img_data, api_key, _DETECT_PROMPT)
+    with metrics.span("gemini_detect"):
+        detected = _gemini_detect(img_data, api_key, _DETECT_PROMPT)
     obj = detected.get("object_name", "").strip()
     conf = float(detected.get("confidence", 0))
 
     if _is_material_response(obj) or conf < 60:
         print(f"⚠️  Vague result '{obj}' — retrying...")
-        retry = _gemini_detect(img_data, api_key, _RETRY_PROMPT)
+        with metrics.span("gemini_retry"):
+            retry = _gemini_detect(img_data, api_key, _RETRY_PROMPT)
         new_obj  = retry.get("object_name", "").strip()
         new_conf = float(retry.get("confidence", 0))
         if new_obj and not _is_material_response(new_obj):
@@ -521,23 +899,217 @@ def _classify_gemini(img_bytes: bytes, api_key: str) -> Dict:
             "recycling_tip": tip, "alternatives": [], "mode": "gemini"}
 
 
+# ══════════════════════════════════════════════════════════════════════════════
+# RESULT CACHE (exact SHA-256 + perceptual dHash, memory LRU + sqlite on disk)
+# ══════════════════════════════════════════════════════════════════════════════
+
+CLASSIFY_CACHE_PATH    = Path(os.getenv("CLASSIFY_CACHE_PATH", Path(__file__).parent / "classify_cache.sqlite3"))
+CLASSIFY_CACHE_SIZE    = int(os.getenv("CLASSIFY_CACHE_SIZE", "2048"))          # in-memory entries
+CLASSIFY_CACHE_TTL     = float(os.getenv("CLASSIFY_CACHE_TTL", str(7 * 86400)))  # seconds
+CLASSIFY_CACHE_HAMMING = int(os.getenv("CLASSIFY_CACHE_HAMMING", "3"))           # max differing dHash bits
+
+_HASH_BANDS = 4   # 64-bit hash split in 4×16-bit bands: distance ≤ 3 ⇒ some band matches exactly
+
+if CLASSIFY_CACHE_HAMMING > _HASH_BANDS - 1:
+    # Larger distances can differ in every band and would be silently missed
+    print(f"⚠️  CLASSIFY_CACHE_HAMMING={CLASSIFY_CACHE_HAMMING} exceeds what {_HASH_BANDS} hash bands "
+          f"can find — using {_HASH_BANDS - 1}")
+    CLASSIFY_CACHE_HAMMING = _HASH_BANDS - 1
+
+
+def _dhash(img: Image.Image) -> int:
+    """64-bit difference hash — stable across re-encoding, resizing and small crops."""
+    px = list(img.convert("L").resize((9, 8), Image.BILINEAR).getdata())
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (px[row * 9 + col] > px[row * 9 + col + 1])
+    return bits
+
+
+def _bands(h: int) -> List[int]:
+    return [(h >> (16 * i)) & 0xFFFF for i in range(_HASH_BANDS)]
+
+
+def _signed(h: int) -> int:
+    """sqlite INTEGER is signed 64-bit."""
+    return h - (1 << 64) if h >= (1 << 63) else h
+
+
+class _ResultCache:
+    def __init__(self, path: Path = CLASSIFY_CACHE_PATH, size: int = CLASSIFY_CACHE_SIZE,
+                 ttl: float = CLASSIFY_CACHE_TTL, max_distance: int = CLASSIFY_CACHE_HAMMING):
+        self.size, self.ttl = size, ttl
+        self.max_distance = min(max_distance, _HASH_BANDS - 1)
+        self._mem: "OrderedDict[str, tuple]" = OrderedDict()   # sha → (stored_at, result)
+        self._lock = threading.Lock()
+        self._stats = {"exact_hits": 0, "near_hits": 0, "misses": 0}
+        self._db = None
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(path), check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results (sha TEXT PRIMARY KEY, dhash INTEGER, "
+                "b0 INTEGER, b1 INTEGER, b2 INTEGER, b3 INTEGER, stored_at REAL, result TEXT)")
+            for i in range(_HASH_BANDS):
+                self._db.execute(f"CREATE INDEX IF NOT EXISTS idx_b{i} ON results (b{i})")
+            self._db.commit()
+        except Exception as e:
+            print(f"⚠️  Classification disk cache unavailable ({e}) — memory only")
+            self._db = None
+
+    def _remember(self, sha: str, stored_at: float, result: Dict) -> None:
+        self._mem[sha] = (stored_at, result)
+        self._mem.move_to_end(sha)
+        while len(self._mem) > self.size:
+            self._mem.popitem(last=False)
+
+    def get(self, sha: str, dhash: Optional[int]) -> Optional[Dict]:
+        now = time.time()
+        with self._lock:
+            hit = self._mem.get(sha)
+            if hit and now - hit[0] < self.ttl:
+                self._mem.move_to_end(sha)
+                self._stats["exact_hits"] += 1
+                return dict(hit[1])
+
+            if self._db is not None:
+                try:
+                    row = self._db.execute("SELECT stored_at, result FROM results WHERE sha = ?",
+                                           (sha,)).fetchone()
+                    if row and now - row[0] < self.ttl:
+                        result = json.loads(row[1])
+                        self._remember(sha, row[0], result)
+                        self._stats["exact_hits"] += 1
+                        return dict(result)
+
+                    if dhash is not None and self.max_distance >= 0:
+                        bands = _bands(dhash)
+                        rows = self._db.execute(
+                            "SELECT dhash, stored_at, result FROM results WHERE stored_at > ? AND "
+                            "(b0 = ? OR b1 = ? OR b2 = ? OR b3 = ?)",
+                            (now - self.ttl, *bands)).fetchall()
+                        best = min(rows, key=lambda r: bin((r[0] & 0xFFFFFFFFFFFFFFFF) ^ dhash).count("1"),
+                                   default=None)
+                        if best and bin((best[0] & 0xFFFFFFFFFFFFFFFF) ^ dhash).count("1") <= self.max_distance:
+                            result = json.loads(best[2])
+                            self._remember(sha, best[1], result)
+                            self._stats["near_hits"] += 1
+                            return dict(result)
+                except sqlite3.Error as e:
+                    print(f"⚠️  Classification cache read failed: {e}")
+
+            self._stats["misses"] += 1
+            return None
+
+    def put(self, sha: str, dhash: Optional[int], result: Dict) -> None:
+        now = time.time()
+        with self._lock:
+            self._remember(sha, now, result)
+            if self._db is None or dhash is None:
+                return
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (sha, _signed(dhash), *_bands(dhash), now, json.dumps(result)))
+                self._db.execute("DELETE FROM results WHERE stored_at < ?", (now - self.ttl,))
+                self._db.commit()
+            except sqlite3.Error as e:
+                print(f"⚠️  Classification cache write failed: {e}")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            hits = self._stats["exact_hits"] + self._stats["near_hits"]
+            lookups = hits + self._stats["misses"]
+            disk = None
+            if self._db is not None:
+                try:
+                    disk = self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+                except sqlite3.Error:
+                    pass
+            return {**self._stats, "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+                    "memory_entries": len(self._mem), "disk_entries": disk}
+
+
 # ══════════════════════════════════════════════════════════════════════════════
 # PUBLIC CLASSIFIER CLASS
 # ══════════════════════════════════════════════════════════════════════════════
 
+def _error_result(message: str) -> Dict:
+    instructions, tip = DISPOSAL["General Waste"]
+    return {
+        "object_name": "Classification unavailable",
+        "waste_category": "General Waste",
+        "confidence": 0.0,
+        "disposal_instructions": instructions,
+        "recycling_tip": tip,
+        "alternatives": [],
+        "mode": "error",
+        "error": message[:120],
+    }
+
+
+def _log_doc(uid: str, result: Dict, image_url: Optional[str]) -> Dict:
+    return {
+        "uid":                   uid,
+        "object_name":           result["object_name"],
+        "waste_category":        result["waste_category"],
+        "confidence":            result["confidence"],
+        "disposal_instructions": result["disposal_instructions"],
+        "recycling_tip":         result["recycling_tip"],
+        "image_url":             image_url,
+        "timestamp":             datetime.now(timezone.utc).isoformat(),
+        "mode":                  result.get("mode", "error"),
+    }
+
+
 class WasteClassifier:
     def __init__(self):
-        key = _read_key()
+        key = _GEMINI.api_key()
         status = f"Gemini active (...{key[-6:]})" if key else "No Gemini key → HuggingFace fallback"
         print(f"✅ WasteClassifier — {status}")
+        self._cache = _ResultCache()
+
+    def cache_stats(self) -> Dict:
+        return self._cache.stats()
+
+    def gemini_stats(self) -> Dict:
+        return _GEMINI.stats()
+
+    def _cached(self, prepared: _PreparedImage) -> Optional[Dict]:
+        cached = self._cache.get(prepared.sha, prepared.dhash)
+        if cached is not None:
+            cached["source_mode"] = cached.get("mode")
+            cached["mode"] = "cache"
+        return cached
+
+    def _remember(self, prepared: _PreparedImage, result: Dict) -> None:
+        # Don't pin errors, or YOLO fallbacks that Gemini would have done better
+        if result.get("mode") == "gemini" or (result.get("mode") == "yolo_local" and not _GEMINI.api_key()):
+            self._cache.put(prepared.sha, prepared.dhash, dict(result))
 
     def predict(self, img_bytes: bytes) -> Dict:
-        key = _read_key()
+        with metrics.span("prepare"):
+            prepared = _prepare(img_bytes)          # the only decode of this upload
+        if isinstance(prepared, str):
+            return _error_result(prepared)
+        with metrics.span("cache_lookup"):
+            cached = self._cached(prepared)
+        if cached is not None:
+            return cached
+
+        result = self._predict_uncached(prepared)
+        self._remember(prepared, result)
+        return result
+
+    def _predict_uncached(self, prepared: _PreparedImage) -> Dict:
+        key = _GEMINI.api_key()
 
         # Primary: Gemini 2-phase pipeline
         if key:
             try:
-                return _classify_gemini(img_bytes, key)
+                return _classify_gemini(prepared, key)
             except RuntimeError as e:
                 print(f"⚠️  Gemini rate-limited: {e} — falling back to local YOLO")
             except Exception as e:
@@ -546,50 +1118,141 @@ class WasteClassifier:
         # Fallback: Local YOLOv8-nano (offline, no API, 1000 ImageNet classes)
         try:
             print("🤖 Using YOLOv8-nano local classifier (Gemini unavailable)...")
-            return _yolo_classify(img_bytes)
+            with metrics.span("yolo"):
+                return _run_yolo(prepared.image)
         except Exception as e:
             print(f"❌ YOLO also failed: {e}")
-            instructions, tip = DISPOSAL["General Waste"]
-            return {
-                "object_name": "Classification unavailable",
-                "waste_category": "General Waste",
-                "confidence": 0.0,
-                "disposal_instructions": instructions,
-                "recycling_tip": tip,
-                "alternatives": [],
-                "mode": "error",
-                "error": str(e)[:120],
-            }
+            return _error_result(str(e))
+
+    def predict_batch(self, images: List[bytes]) -> Iterator[Tuple[int, Dict]]:
+        """
+        Classify many images, yielding (index, result) as each finishes:
+        cache hits first, then Gemini results (bounded fan-out), then every
+        image that needs YOLO in one batched forward pass.
+        """
+        # Decode + hash in parallel (PIL releases the GIL while decoding)
+        with metrics.span("prepare_batch"), \
+                ThreadPoolExecutor(max_workers=min(len(images), BATCH_DECODE_THREADS) or 1) as ex:
+            prepared = list(ex.map(_prepare, images))
+
+        pending = []
+        for i, prep in enumerate(prepared):
+            if isinstance(prep, str):
+                yield i, _error_result(prep)
+                continue
+            cached = self._cached(prep)
+            if cached is not None:
+                yield i, cached
+            else:
+                pending.append(i)
+
+        key = _GEMINI.api_key()
+        fallback = pending
+        if key and pending:
+            fallback = []
+            with ThreadPoolExecutor(max_workers=GEMINI_BATCH_CONCURRENCY) as ex:
+                futures = {ex.submit(_classify_gemini, prepared[i], key): i for i in pending}
+                for f in as_completed(futures):
+                    i = futures[f]
+                    try:
+                        result = f.result()
+                    except Exception as e:
+                        print(f"⚠️  Gemini error on batch image {i}: {e} — falling back to local YOLO")
+                        fallback.append(i)
+                        continue
+                    self._remember(prepared[i], result)
+                    yield i, result
+
+        if fallback:
+            print(f"🤖 YOLOv8-nano batch of {len(fallback)} image(s)...")
+            try:
+                with metrics.span("yolo_batch"):
+                    results = _run_yolo_batch([prepared[i].image for i in fallback])
+            except Exception as e:
+                print(f"❌ YOLO batch failed: {e}")
+                results = [_error_result(str(e))] * len(fallback)
+            for i, result in zip(fallback, results):
+                self._remember(prepared[i], result)
+                yield i, dict(result)
 
 
     def classify_and_save(self, img_bytes: bytes, uid: str,
-                          firestore_client, image_url: str = None) -> Dict:
+                          firestore_client, image_url: str = None,
+                          timings: bool = False) -> Dict:
+        """Classify, log to waste_logs and award points. `timings` adds per-stage ms to the result."""
+        with metrics.collect() as spans:
+            with metrics.span("total"):
+                log_doc = self._classify_and_save(img_bytes, uid, firestore_client, image_url)
+        if timings:
+            log_doc["timings"] = metrics.timings_ms(spans)
+        return log_doc
+
+    def _classify_and_save(self, img_bytes: bytes, uid: str,
+                           firestore_client, image_url: str = None) -> Dict:
         result = self.predict(img_bytes)
-        log_doc = {
-            "uid":                   uid,
-            "object_name":           result["object_name"],
-            "waste_category":        result["waste_category"],
-            "confidence":            result["confidence"],
-            "disposal_instructions": result["disposal_instructions"],
-            "recycling_tip":         result["recycling_tip"],
-            "image_url":             image_url,
-            "timestamp":             datetime.now(timezone.utc).isoformat(),
-            "mode":                  result.get("mode", "error"),
-        }
+        log_doc = _log_doc(uid, result, image_url)
         try:
-            log_id = firestore_client.add_doc("waste_logs", log_doc)
+            with metrics.span("firestore_log"):
+                log_id = firestore_client.add_doc("waste_logs", log_doc)
             log_doc["log_id"] = log_id
             print(f"✅ DB: Saved classification log {log_id}")
+            from aggregates import record_classification
+            with metrics.span("counters"):
+                record_classification(log_doc["waste_category"])
         except Exception as db_err:
             print(f"❌ DB Write Error for waste_logs: {db_err}")
             log_doc["log_id"] = None
         if result.get("mode") != "error":
             try:
-                _award_points(uid, 5, "Waste classification", firestore_client)
+                with metrics.span("points"):
+                    _award_points(uid, 5, "Waste classification", firestore_client)
             except Exception:
                 pass
         return log_doc
 
+    def classify_and_save_batch(self, images: List[bytes], uid: str, firestore_client,
+                                on_result: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """
+        Batch counterpart of classify_and_save. Log IDs are allocated up front
+        so each result can be emitted (on_result) as soon as it's ready; all
+        waste_logs go out in one batched write, then counters and points are
+        bumped once for the whole batch. Returns a summary.
+        """
+        writer = firestore_client.batch_writer()
+        emitted = {}
+        for i, result in self.predict_batch(images):
+            log_doc = _log_doc(uid, result, None)
+            log_doc["log_id"] = writer.add("waste_logs", dict(log_doc))
+            emitted[log_doc["log_id"]] = log_doc
+            if on_result:
+                on_result({"index": i, **log_doc})
+
+        with metrics.span("firestore_batch_log"):
+            errors = writer.close()
+        failed = {e["doc_id"] for e in errors}
+        if errors:
+            print(f"❌ DB Write Error for {len(failed)} batch waste_logs: {errors[0]['error']}")
+        saved = [d for log_id, d in emitted.items() if log_id not in failed]
+        print(f"✅ DB: Saved {len(saved)} classification logs in one batch")
+
+        try:
+            from aggregates import record_classifications
+            record_classifications([d["waste_category"] for d in saved])
+        except Exception:
+            pass
+        points = 5 * sum(1 for d in saved if d["mode"] != "error")
+        if points:
+            try:
+                _award_points(uid, points, "Batch waste classification", firestore_client)
+            except Exception:
+                pass
+        return {
+            "total":          len(images),
+            "saved":          len(saved),
+            "failed_log_ids": sorted(failed),
+            "points_awarded": points,
+        }
+
 
 def _award_points(uid: str, points: int, reason: str, fc) -> None:
     existing = fc.get_doc("gamification", uid)
@@ -601,3 +1264,5 @@ def _award_points(uid: str, points: int, reason: str, fc) -> None:
     else:
         fc.increment_field("gamification", uid, "total_points", points)
         fc.increment_field("gamification", uid, "weekly_points", points)
+    from leaderboard import schedule_refresh
+    schedule_refresh()
@@ -0,0 +1,115 @@
+"""
+WASTE IQ – YOLOv8-cls ONNX Engine
+Torch-free serving path for the local fallback classifier. The model is
+exported once to ONNX (optionally INT8 weight-quantized) and served with
+onnxruntime at a fixed thread count; preprocessing is plain NumPy/PIL, so
+neither torch nor ultralytics is imported at serve time.
+
+    python yolo_onnx.py export            # → yolov8n-cls.onnx
+    python yolo_onnx.py export --int8     # → yolov8n-cls.int8.onnx
+
+Then serve with YOLO_ENGINE=onnx (and YOLO_ONNX_PATH for the INT8 file).
+Parity against the torch model: benchmarks/yolo_onnx_parity.py
+"""
+
+import os
+import ast
+import argparse
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+from PIL import Image
+
+BASE_DIR       = Path(__file__).parent
+IMG_SIZE       = 224
+YOLO_ONNX_PATH = Path(os.getenv("YOLO_ONNX_PATH", BASE_DIR / "yolov8n-cls.onnx"))
+ONNX_THREADS   = int(os.getenv("ONNX_THREADS", "2"))
+
+
+# ── Preprocessing (mirrors ultralytics classify_transforms) ──
+
+def preprocess(img: Image.Image, size: int = IMG_SIZE) -> np.ndarray:
+    """Resize short side → `size`, center crop, scale to [0, 1], HWC → CHW float32."""
+    img = img.convert("RGB")
+    w, h = img.size
+    scale = size / min(w, h)
+    img = img.resize((max(size, round(w * scale)), max(size, round(h * scale))), Image.BILINEAR)
+    w, h = img.size
+    left, top = (w - size) // 2, (h - size) // 2
+    img = img.crop((left, top, left + size, top + size))
+    arr = np.asarray(img, dtype=np.float32) / 255.0
+    return arr.transpose(2, 0, 1)
+
+
+# ── Inference ────────────────────────────────────────────────
+
+class OnnxClassifier:
+    def __init__(self, path: Path = YOLO_ONNX_PATH, threads: int = ONNX_THREADS):
+        import onnxruntime as ort
+
+        if not Path(path).exists():
+            raise FileNotFoundError(f"{path} not found — run `python yolo_onnx.py export` first")
+        opts = ort.SessionOptions()
+        opts.intra_op_num_threads = threads
+        opts.inter_op_num_threads = 1
+        opts.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(str(path), sess_options=opts,
+                                            providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+        self.names = _names_from_metadata(self.session.get_modelmeta().custom_metadata_map)
+        self.path = Path(path)
+
+    def probs(self, imgs: List[Image.Image]) -> np.ndarray:
+        """Class probabilities, shape (N, num_classes). One forward pass for the batch."""
+        batch = np.stack([preprocess(im) for im in imgs])
+        out = self.session.run(None, {self.input_name: batch})[0]
+        return out.reshape(len(imgs), -1)
+
+
+def _names_from_metadata(meta: Dict[str, str]) -> Dict[int, str]:
+    """ultralytics stores `names` as a Python dict literal in the ONNX metadata."""
+    raw = meta.get("names")
+    if not raw:
+        raise ValueError("ONNX model has no 'names' metadata — re-export with yolo_onnx.py")
+    return {int(k): v for k, v in ast.literal_eval(raw).items()}
+
+
+# ── Export (offline; needs ultralytics + onnx) ───────────────
+
+def export(weights: str = "yolov8n-cls.pt", out: Path = None, int8: bool = False) -> Path:
+    from ultralytics import YOLO
+
+    out = Path(out) if out else BASE_DIR / ("yolov8n-cls.int8.onnx" if int8 else "yolov8n-cls.onnx")
+    exported = Path(YOLO(weights).export(format="onnx", imgsz=IMG_SIZE, dynamic=True, simplify=True))
+    if not int8:
+        exported.replace(out)
+        return out
+
+    import onnx
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    quantize_dynamic(str(exported), str(out), weight_type=QuantType.QUInt8)
+    # Quantization drops custom metadata — carry `names` etc. across
+    src, dst = onnx.load(str(exported)), onnx.load(str(out))
+    have = {p.key for p in dst.metadata_props}
+    for prop in src.metadata_props:
+        if prop.key not in have:
+            dst.metadata_props.add(key=prop.key, value=prop.value)
+    onnx.save(dst, str(out))
+    exported.unlink(missing_ok=True)
+    return out
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="YOLOv8-cls ONNX export")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("export")
+    p.add_argument("--weights", default="yolov8n-cls.pt")
+    p.add_argument("--out", default=None)
+    p.add_argument("--int8", action="store_true", help="dynamic INT8 weight quantization")
+    args = parser.parse_args()
+
+    path = export(args.weights, args.out, args.int8)
+    print(f"✅ Exported {path} ({path.stat().st_size / 1e6:.1f} MB)")
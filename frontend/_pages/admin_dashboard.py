@@ -7,7 +7,7 @@ import pandas as pd
 import folium
 from streamlit_folium import st_folium
 from utils import (
-    page_header, kpi_card, api_get, api_download, show_toast,
+    page_header, kpi_card, api_get, api_get_all, page_items, api_download, show_toast,
     BACKEND_URL, get_headers, time_greeting
 )
 import requests
@@ -21,13 +21,12 @@ def show():
 
     with st.spinner("Loading city-wide data..."):
         city_data      = api_get("/reports/city-summary")
-        bins_data      = api_get("/bins/")
+        bins           = api_get_all("/bins/")
         leaderboard    = api_get("/gamification/leaderboard", params={"limit": 10})
         overflow_data  = api_get("/overflow/high-risk")
 
     city       = city_data["data"]      if city_data      else {}
-    bins       = bins_data["data"]      if bins_data      else []
-    lb_entries = leaderboard["data"]    if leaderboard    else []
+    lb_entries = page_items(leaderboard)
     high_risk  = overflow_data["data"]  if overflow_data  else []
 
     # ── KPI Row ───────────────────────────────────────────────────────────
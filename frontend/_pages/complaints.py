@@ -2,7 +2,7 @@
 
 import streamlit as st
 import pandas as pd
-from utils import page_header, api_get, api_post, show_toast
+from utils import page_header, api_get, api_post, page_items, show_toast
 from languages import t
 
 
@@ -15,7 +15,7 @@ def show():
     with tab_list:
         with st.spinner("Loading complaints..."):
             data = api_get("/complaints/")
-        complaints = data["data"] if data else []
+        complaints = page_items(data)
 
         if complaints:
             statuses = ["All"] + list({c.get("status", "open") for c in complaints})
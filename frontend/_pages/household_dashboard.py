@@ -9,7 +9,7 @@ import pandas as pd
 from datetime import datetime, timezone
 from utils import (
     page_header, kpi_card, category_chip,
-    api_get, api_post, show_toast, time_greeting, card_start, card_end
+    api_get, api_post, page_items, show_toast, time_greeting, card_start, card_end
 )
 from languages import t
 
@@ -27,9 +27,9 @@ def show():
         gam_data  = api_get("/gamification/me")
         comp_data = api_get("/complaints", params={"status": None})
 
-    logs       = cls_data["data"]  if cls_data  else []
+    logs       = page_items(cls_data)
     gam        = gam_data["data"]  if gam_data  else {}
-    complaints = comp_data["data"] if comp_data else []
+    complaints = page_items(comp_data)
     cat_stats  = cls_stats["data"] if cls_stats else {"total_classifications": 0, "by_category": {}}
 
     total_cls   = cat_stats.get("total_classifications", 0)
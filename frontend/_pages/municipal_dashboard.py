@@ -4,7 +4,7 @@ import streamlit as st
 import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
-from utils import page_header, kpi_card, api_get, show_toast, time_greeting
+from utils import page_header, kpi_card, api_get, api_get_all, page_items, show_toast, time_greeting
 from languages import t
 
 
@@ -17,13 +17,12 @@ def show():
     ward_id = st.session_state.get("ward_id")
 
     with st.spinner("Loading ward data..."):
-        bins_data      = api_get("/bins/",       params={"ward_id": ward_id})
+        bins           = api_get_all("/bins/", params={"ward_id": ward_id})
         comp_data      = api_get("/complaints/", params={"ward_id": ward_id})
         overflow_data  = api_get("/overflow/high-risk")
         city_data      = api_get("/reports/city-summary")
 
-    bins       = bins_data["data"]   if bins_data      else []
-    complaints = comp_data["data"]   if comp_data      else []
+    complaints = page_items(comp_data)
     high_risk  = overflow_data["data"] if overflow_data else []
     city       = city_data["data"]   if city_data      else {}
 
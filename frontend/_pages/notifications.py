@@ -3,7 +3,7 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime, timezone
-from utils import page_header, api_get
+from utils import page_header, api_get, page_items
 
 
 def show():
@@ -15,7 +15,7 @@ def show():
         comp_data = api_get("/complaints/")
 
     high_risk  = overflow["data"]   if overflow   else []
-    complaints = comp_data["data"]  if comp_data  else []
+    complaints = page_items(comp_data)
     uid        = st.session_state.get("uid")
     role       = st.session_state.get("role","household")
 
@@ -2,7 +2,7 @@
 
 import streamlit as st
 import pandas as pd
-from utils import page_header, kpi_card, api_get, show_toast
+from utils import page_header, kpi_card, api_get, page_items, show_toast
 from languages import t
 
 
@@ -15,7 +15,7 @@ def show():
         rew_data  = api_get("/gamification/rewards")
 
     gam       = gam_data["data"]  if gam_data  else {}
-    lb        = lb_data["data"]   if lb_data   else []
+    lb        = page_items(lb_data)
     rewards   = rew_data["data"]  if rew_data  else {}
 
     total_pts  = gam.get("total_points", 0)
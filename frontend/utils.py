@@ -224,6 +224,28 @@ def api_get(path: str, params: dict = None) -> dict | None:
         return None
 
 
+def page_items(resp: dict | None) -> list:
+    """Items from a paginated list response ({"data": {"items": [...], "next_cursor": ...}})."""
+    if not resp:
+        return []
+    data = resp.get("data") or {}
+    return data.get("items", []) if isinstance(data, dict) else data
+
+
+def api_get_all(path: str, params: dict = None, max_pages: int = 20) -> list:
+    """Follow next_cursor across pages of a list endpoint and return all items."""
+    params = dict(params or {})
+    items = []
+    for _ in range(max_pages):
+        resp = api_get(path, params=params)
+        items += page_items(resp)
+        cursor = ((resp or {}).get("data") or {}).get("next_cursor") if resp else None
+        if not cursor:
+            break
+        params["cursor"] = cursor
+    return items
+
+
 def api_post(path: str, json_data: dict = None, files=None) -> dict | None:
     if not st.session_state.get("id_token"):
         return None